@@ -0,0 +1,71 @@
+"""
+Benchmark for the week_6 prompt filter.
+
+Compares the old approach (one regex per word, built on every call) with the
+precompiled single-pass WordFilter as the word lists and prompts grow.
+
+    python benchmarks/bench_filter.py
+    python benchmarks/bench_filter.py --terms 10 100 1000 5000 --words 100 1000 10000
+"""
+
+import argparse
+import os
+import random
+import re
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../week_6')))
+
+from filter import WordFilter
+
+
+def per_word_filter(prompt, banned, masked):
+    """The filter_prompt implementation this benchmark replaced, kept for comparison."""
+    lowered = prompt.lower()
+    for word in banned:
+        if re.search(r'\b' + re.escape(word) + r'\b', lowered):
+            return False, word, prompt
+    masked_prompt = prompt
+    for word in masked:
+        masked_prompt = re.compile(r'\b' + re.escape(word) + r'\b', re.IGNORECASE).sub("[MASKED]", masked_prompt)
+    return True, None, masked_prompt
+
+
+def random_words(n, rng, length=(4, 10)):
+    return {"".join(rng.choices(string.ascii_lowercase, k=rng.randint(*length))) for _ in range(n)}
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e3
+
+
+def run(term_counts, word_counts, repeat):
+    rng = random.Random(42)
+    vocabulary = list(random_words(5000, rng, (2, 9)))
+    print(f"{'terms':>6} {'prompt words':>13} {'per-word ms':>12} {'compiled ms':>12} {'speedup':>8}")
+    for terms in term_counts:
+        # half banned, half masked; prompts never contain a banned word, so every call scans it all
+        words = sorted(random_words(terms, rng))
+        banned, masked = set(words[::2]), set(words[1::2])
+        engine = WordFilter(banned, masked)
+        for n in word_counts:
+            prompt = " ".join(rng.choice(vocabulary) for _ in range(n))
+            prompt += " " + " ".join(rng.sample(sorted(masked), min(5, len(masked))))
+            assert engine.check(prompt) == per_word_filter(prompt, banned, masked)
+            old = timed(lambda: per_word_filter(prompt, banned, masked), max(1, repeat // terms))
+            new = timed(lambda: engine.check(prompt), repeat)
+            print(f"{terms:>6} {n:>13} {old:>12.3f} {new:>12.3f} {old / new:>7.0f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--terms", type=int, nargs="+", default=[10, 100, 1000, 5000])
+    parser.add_argument("--words", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    run(args.terms, args.words, args.repeat)
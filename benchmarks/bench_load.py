@@ -0,0 +1,392 @@
+"""
+Load test for the request paths, against a local fake Bedrock runtime (fake_bedrock.py).
+
+Drives week_1's /api/chat (the Flask server as chat, the ASGI one as chat-asgi),
+week_4's and week_6's FastAPI /generate, the week_2 pipeline (run_pipeline) and the
+week_5 Q engine (ask_q / stream_q) at fixed concurrency levels. Each target runs in
+its own process: the web apps under their usual server (flask run, uvicorn), the
+pipeline and Q engine in a worker process of this script. Closed-loop clients send
+requests for --duration seconds per level.
+
+Reports requests/sec, p50/p95/p99 latency, time to first chunk when streaming,
+errors, upstream calls and throttles seen by the fake, the target process's peak
+RSS and, for the web apps, its peak thread count. --save-baseline stores the
+results in benchmarks/baselines/load.json; --compare checks a run against it and
+exits with 1 on a regression (throughput down or p95 up by more than --tolerance).
+Baselines are machine-specific: save one on the machine you compare on.
+
+    python benchmarks/bench_load.py
+    python benchmarks/bench_load.py --targets week4,pipeline --concurrency 1,16,64 --duration 20
+    python benchmarks/bench_load.py --stream --latency lognormal:0.3,0.5 --throttle 0.05
+    python benchmarks/bench_load.py --targets chat,chat-asgi --concurrency 32,128,256 --latency fixed:1.0
+    python benchmarks/bench_load.py --compare
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import regression
+from fake_bedrock import FakeBedrock
+
+BASELINE_PATH = os.path.join(ROOT, "benchmarks", "baselines", "load.json")
+WARMUP_REQUESTS = 3
+
+
+def _prompt(i):
+    return f"Tell me a fun fact about the number {i}"
+
+
+# Web apps: how to start them and what to send
+SERVERS = {
+    "chat": {
+        "cwd": "week_1/conversational-ai-assistant/src",
+        "command": ["-m", "flask", "--app", "api_server", "run", "--port", "{port}", "--with-threads"],
+        "path": "/api/chat",
+        "body": lambda i, client: {"message": _prompt(i), "session_id": f"load{client:08d}"},
+    },
+    "chat-asgi": {
+        "cwd": "week_1/conversational-ai-assistant/src",
+        "command": ["-m", "uvicorn", "asgi_server:app", "--port", "{port}", "--log-level", "warning"],
+        "path": "/api/chat",
+        "body": lambda i, client: {"message": _prompt(i), "session_id": f"load{client:08d}"},
+    },
+    "week4": {
+        "cwd": "week_4",
+        "command": ["-m", "uvicorn", "main:app", "--port", "{port}", "--log-level", "warning"],
+        "path": "/generate",
+        "body": lambda i, client: {"prompt": _prompt(i)},
+    },
+    "week6": {
+        "cwd": "week_6",
+        "command": ["-m", "uvicorn", "main:app", "--port", "{port}", "--log-level", "warning"],
+        "path": "/generate",
+        "body": lambda i, client: {"prompt": _prompt(i)},
+    },
+}
+# Library entry points, run in a worker process (see _library_call)
+WORKERS = ("pipeline", "q")
+TARGETS = tuple(SERVERS) + WORKERS
+
+
+def _proc_status(pid, field):
+    """A numeric field of /proc/<pid>/status (Linux only), or None."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith(f"{field}:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def peak_rss_mb(pid="self"):
+    """Peak resident memory of a process (VmHWM), in MB."""
+    kb = _proc_status(pid, "VmHWM")
+    return round(kb / 1024, 1) if kb is not None else None
+
+
+class ThreadSampler:
+    """Highest thread count of a process while the block runs: what a server spends per user."""
+
+    def __init__(self, pid, interval=0.1):
+        self.pid = pid
+        self.interval = interval
+        self.peak = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            count = _proc_status(self.pid, "Threads")
+            if count is not None:
+                self.peak = max(self.peak or 0, count)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def percentile(values, p):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def summarize(samples, elapsed):
+    """samples: (latency_s, ok, ttfb_s or None) per request."""
+    latencies = [s[0] for s in samples]
+    ttfbs = [s[2] for s in samples if s[2] is not None]
+    ms = lambda v: round(v * 1000, 1) if v is not None else None
+    return {
+        "requests": len(samples),
+        "errors": sum(1 for s in samples if not s[1]),
+        "rps": round(len(samples) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)),
+        "ttfb_p50_ms": ms(percentile(ttfbs, 50)),
+    }
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_for_port(port, process, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server did not listen on port {port} within {timeout}s")
+
+
+def target_env(fake_url, workdir):
+    """Environment for a target process: the fake endpoint, dummy credentials, no response cache."""
+    env = dict(os.environ)
+    env.update({
+        "BEDROCK_ENDPOINT_URL": fake_url,
+        "AWS_REGION": env.get("AWS_REGION", "us-east-2"),
+        "AWS_ACCESS_KEY_ID": "bench",
+        "AWS_SECRET_ACCESS_KEY": "bench",
+        "BEDROCK_CACHE": "off",  # every request should reach the (fake) model
+        "GUARDRAIL_ID": "",
+        "PIPELINE_LOG_FILE": os.path.join(workdir, "pipeline.jsonl"),
+        "PIPELINE_LOG_CONSOLE": "off",
+        "PIPELINE_METRICS_FILE": os.path.join(workdir, "pipeline.metrics"),
+        "Q_MEMORY_DB": os.path.join(workdir, "q_memory.db"),
+        "METRICS_DIR": "",
+    })
+    return env
+
+
+# ---- web apps ----
+
+def _ok(status, text):
+    return status == 200 and "[ERROR]" not in text and '"blocked": true' not in text and '"blocked":true' not in text
+
+
+async def _http_load(url, body, concurrency, duration, stream):
+    import httpx
+
+    samples = []
+    counter = iter(range(10 ** 9))
+
+    async def one(client, index):
+        payload = {**body(next(counter), index), **({"stream": True} if stream else {})}
+        started = time.perf_counter()
+        ttfb = None
+        try:
+            if stream:
+                parts = []
+                async with client.stream("POST", url, json=payload) as response:
+                    async for chunk in response.aiter_text():
+                        if ttfb is None:
+                            ttfb = time.perf_counter() - started
+                        parts.append(chunk)
+                    status = response.status_code
+                text = "".join(parts)
+            else:
+                response = await client.post(url, json=payload)
+                status, text = response.status_code, response.text
+            ok = _ok(status, text)
+        except Exception:
+            ok = False
+        return time.perf_counter() - started, ok, ttfb
+
+    async with httpx.AsyncClient(timeout=120, limits=httpx.Limits(max_connections=concurrency)) as client:
+        for i in range(WARMUP_REQUESTS):
+            await one(client, i)
+        deadline = time.perf_counter() + duration
+
+        async def user(index):
+            while time.perf_counter() < deadline:
+                samples.append(await one(client, index))
+
+        start = time.perf_counter()
+        await asyncio.gather(*[user(i) for i in range(concurrency)])
+        return samples, time.perf_counter() - start
+
+
+def run_server(name, fake, concurrency, duration, stream, workdir):
+    spec = SERVERS[name]
+    port = _free_port()
+    command = [sys.executable] + [part.format(port=port) for part in spec["command"]]
+    process = subprocess.Popen(command, cwd=os.path.join(ROOT, spec["cwd"]), env=target_env(fake.url, workdir),
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        _wait_for_port(port, process)
+        with ThreadSampler(process.pid) as threads:
+            samples, elapsed = asyncio.run(_http_load(f"http://127.0.0.1:{port}{spec['path']}", spec["body"],
+                                                      concurrency, duration, stream))
+        result = summarize(samples, elapsed)
+        result["peak_rss_mb"] = peak_rss_mb(process.pid)
+        result["peak_threads"] = threads.peak
+        return result
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+# ---- library entry points (worker process) ----
+
+def _library_call(name, stream):
+    """A function(i) -> (ok, ttfb_s) calling the target in this process."""
+    if name == "pipeline":
+        sys.path.insert(0, os.path.join(ROOT, "week_2"))
+        from pipeline.orchestrator import run_pipeline
+
+        def call(i):
+            try:
+                run_pipeline(_prompt(i))
+                return True, None
+            except Exception:
+                return False, None
+        return call
+
+    sys.path.insert(0, os.path.join(ROOT, "week_5"))
+    import q_engine
+
+    def call(i):
+        started = time.perf_counter()
+        if not stream:
+            return not q_engine.ask_q(_prompt(i)).startswith("[ERROR]"), None
+        ok, ttfb = True, None
+        for chunk in q_engine.stream_q(_prompt(i)):
+            ttfb = ttfb if ttfb is not None else time.perf_counter() - started
+            ok = ok and not chunk.startswith("[ERROR]")
+        return ok, ttfb
+    return call
+
+
+def run_worker(name, concurrency, duration, stream):
+    """Worker process: closed-loop threads calling the target; prints the result as JSON."""
+    call = _library_call(name, stream)
+    for i in range(WARMUP_REQUESTS):
+        call(i)
+    samples = []
+    counter = iter(range(WARMUP_REQUESTS, 10 ** 9))
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def user():
+        while time.perf_counter() < deadline:
+            with lock:
+                i = next(counter)
+            started = time.perf_counter()
+            ok, ttfb = call(i)
+            samples.append((time.perf_counter() - started, ok, ttfb))
+
+    threads = [threading.Thread(target=user) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    result = summarize(samples, time.perf_counter() - start)
+    result["peak_rss_mb"] = peak_rss_mb()
+    result["peak_threads"] = None  # the load threads run in this process too
+    print(json.dumps(result))
+
+
+def run_library(name, fake, concurrency, duration, stream, workdir):
+    command = [sys.executable, os.path.abspath(__file__), "--worker", name, "--concurrency", str(concurrency),
+               "--duration", str(duration)] + (["--stream"] if stream else [])
+    output = subprocess.run(command, cwd=workdir, env=target_env(fake.url, workdir), capture_output=True,
+                            text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def result_key(target, concurrency, stream):
+    return f"{target}@{concurrency}{'+stream' if stream else ''}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--targets", default=",".join(TARGETS), help=f"comma-separated, from {', '.join(TARGETS)}")
+    parser.add_argument("--concurrency", default="1,8,32", help="comma-separated client counts")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per target and concurrency level")
+    parser.add_argument("--stream", action="store_true", help="request streamed replies")
+    parser.add_argument("--latency", default="fixed:0.2", help="fake Bedrock latency (see fake_bedrock.py)")
+    parser.add_argument("--throttle", type=float, default=0.0, help="fraction of fake Bedrock calls throttled")
+    parser.add_argument("--max-inflight", type=int, default=0, help="fake Bedrock throttles above this many calls")
+    parser.add_argument("--chunks", type=int, default=20, help="chunks per fake reply")
+    parser.add_argument("--chunk-interval", type=float, default=0.01, help="seconds between fake stream chunks")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--compare", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--worker", choices=WORKERS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    concurrency_levels = [int(c) for c in args.concurrency.split(",")]
+    if args.worker:
+        return run_worker(args.worker, concurrency_levels[0], args.duration, args.stream)
+
+    targets = [t.strip() for t in args.targets.split(",") if t.strip()]
+    unknown = set(targets) - set(TARGETS)
+    if unknown:
+        parser.error(f"unknown targets: {', '.join(sorted(unknown))}")
+    settings = {"latency": args.latency, "throttle": args.throttle, "max_inflight": args.max_inflight,
+                "chunks": args.chunks, "chunk_interval": args.chunk_interval, "duration": args.duration}
+
+    print(f"{'target':<22}{'req':>7}{'err':>6}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+          f"{'ttfb ms':>9}{'calls':>7}{'thr':>6}{'rss MB':>8}{'threads':>9}")
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir, \
+            FakeBedrock(args.latency, args.throttle, args.max_inflight, args.chunks, args.chunk_interval) as fake:
+        for target in targets:
+            for concurrency in concurrency_levels:
+                before = fake.stats
+                run = run_server if target in SERVERS else run_library
+                result = run(target, fake, concurrency, args.duration, args.stream, workdir)
+                after = fake.stats
+                result["upstream_calls"] = after["calls"] - before["calls"]
+                result["throttled"] = after["throttled"] - before["throttled"]
+                key = result_key(target, concurrency, args.stream)
+                results[key] = result
+                print(f"{key:<22}{result['requests']:>7}{result['errors']:>6}{result['rps']:>9}"
+                      f"{result['p50_ms'] or '-':>9}{result['p95_ms'] or '-':>9}{result['p99_ms'] or '-':>9}"
+                      f"{result['ttfb_p50_ms'] or '-':>9}{result['upstream_calls']:>7}{result['throttled']:>6}"
+                      f"{result['peak_rss_mb'] or '-':>8}{result['peak_threads'] or '-':>9}", flush=True)
+
+    if args.compare:
+        print(f"\nAgainst {os.path.relpath(args.baseline)} (tolerance {args.tolerance:.0%}):")
+        regressions = regression.compare(results, regression.load(args.baseline), settings, args.tolerance,
+                                         higher_is_better=("rps",), lower_is_better=("p95_ms",))
+        for message in regressions:
+            print(f"  REGRESSION {message}")
+        if not regressions:
+            print("  no regressions")
+    if args.save_baseline:
+        regression.save(args.baseline, results, settings)
+        print(f"\nSaved baseline for {len(results)} runs to {os.path.relpath(args.baseline)}")
+    if args.compare and regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
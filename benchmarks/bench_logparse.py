@@ -0,0 +1,130 @@
+"""
+Benchmark for the week_2 monitoring dashboard's log ingestion.
+
+Compares the old refresh (parse every line in a Python loop, then compute each
+metric with a str.contains scan over the whole DataFrame) with LogStore: one
+vectorized parse of the whole log, then incremental refreshes that parse only
+the appended lines while the widgets read pre-aggregated counters.
+
+    python benchmarks/bench_logparse.py
+    python benchmarks/bench_logparse.py --lines 100000 1000000 --baseline-max 100000
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../week_2')))
+
+from pipeline.logstore import LogStore
+
+BLOCK_LINES = 100_000  # distinct lines generated; longer logs repeat them
+
+
+def pipeline_records(n, rng):
+    """Records shaped like pipeline/logger.py output: a request, maybe retries, a success and the response."""
+    ts = datetime(2025, 6, 21, tzinfo=timezone.utc)
+    lines = []
+    while len(lines) < n:
+        request_id = f"{rng.getrandbits(64):016x}"
+        def emit(level, msg, **fields):
+            nonlocal ts
+            ts += timedelta(milliseconds=rng.randint(5, 400))
+            lines.append(json.dumps({"ts": ts.isoformat(timespec="microseconds"), "level": level,
+                                     "logger": "pipeline", "msg": msg, "request_id": request_id, **fields}))
+        emit("INFO", f"Received prompt: question {rng.randint(0, 10**6)}")
+        if rng.random() < 0.05:
+            emit("ERROR", "Attempt 1 failed: An error occurred (ThrottlingException) when calling InvokeModel")
+            emit("INFO", f"Retrying in {rng.uniform(0, 2):.2f} seconds...")
+        emit("SUCCESS", "Claude responded successfully", latency_ms=round(rng.lognormvariate(6.5, 0.4), 1))
+        emit("INFO", "Response: " + "lorem ipsum " * rng.randint(2, 30))
+    return "\n".join(lines[:n]) + "\n"
+
+
+def write_log(path, lines, rng):
+    block = pipeline_records(min(lines, BLOCK_LINES), rng)
+    with open(path, "w") as f:
+        for start in range(0, lines, BLOCK_LINES):
+            count = min(BLOCK_LINES, lines - start)
+            f.write(block if count == BLOCK_LINES else "".join(block.splitlines(True)[:count]))
+
+
+def old_refresh(log_file):
+    """The parse_logs + metrics code LogStore replaced, kept for comparison."""
+    rows = []
+    with open(log_file) as f:
+        for line in f:
+            if line.startswith("{"):
+                try:
+                    record = json.loads(line)
+                    rows.append({"Timestamp": record["ts"], "Level": record["level"], "Message": record["msg"]})
+                except Exception:
+                    continue
+    log_df = pd.DataFrame(rows)
+    return {
+        "requests": len(log_df[log_df['Message'].str.contains('Received prompt')]),
+        "successes": int((log_df['Level'] == 'SUCCESS').sum()),
+        "errors": int((log_df['Level'] == 'ERROR').sum()),
+        "avg_response_len": int(log_df[log_df['Message'].str.contains('Response:')]['Message'].str.len().mean()),
+        "tail": log_df.tail(30),
+    }
+
+
+def widgets(store):
+    """What a dashboard rerun reads after refresh()."""
+    return store.counters, store.timeseries(minutes=120), store.tail_rows(30), store.tail_rows(10, level="ERROR")
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def run(line_counts, baseline_max, append_lines):
+    rng = random.Random(42)
+    print(f"{'lines':>11} {'log MB':>8} {'old refresh s':>14} {'cold parse s':>13} {'lines/s':>11} "
+          f"{'refresh +' + str(append_lines):>15} {'widgets ms':>11}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for lines in line_counts:
+            path = os.path.join(tmp, "pipeline.jsonl")
+            write_log(path, lines, rng)
+            size_mb = os.path.getsize(path) / 2**20
+
+            old = "-"
+            if lines <= baseline_max:
+                old_seconds, old_result = timed(lambda: old_refresh(path))
+                old = f"{old_seconds:.2f}"
+
+            store = LogStore(path)
+            cold, added = timed(store.refresh)
+            assert added == lines, (added, lines)
+            if lines <= baseline_max:
+                assert store.counters["requests"] == old_result["requests"]
+                assert store.counters["levels"].get("ERROR", 0) == old_result["errors"]
+
+            with open(path, "a") as f:
+                f.write(pipeline_records(append_lines, rng))
+            incremental, _ = timed(store.refresh)
+            query, _ = timed(lambda: widgets(store))
+            print(f"{lines:>11,} {size_mb:>8.0f} {old:>14} {cold:>13.2f} {lines / cold:>11,.0f} "
+                  f"{incremental * 1e3:>13.1f}ms {query * 1e3:>11.1f}")
+            store.tail.close()
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--lines", type=int, nargs="+", default=[100_000, 1_000_000, 10_000_000])
+    parser.add_argument("--baseline-max", type=int, default=1_000_000,
+                        help="skip the old per-line refresh above this many lines (it gets slow)")
+    parser.add_argument("--append", type=int, default=1000, help="lines appended before the incremental refresh")
+    args = parser.parse_args()
+    run(args.lines, args.baseline_max, args.append)
@@ -0,0 +1,74 @@
+"""
+Benchmark for token-budgeted conversation memory (common/memory.py).
+
+Replays a long synthetic chat session where some answers are very long and reports
+how many history tokens each prompt carries: the old count-based windows (week_1's
+last 3 exchanges, week_5's last 5) against BudgetedHistory. Summaries come from a
+stand-in that truncates, so no AWS credentials are needed.
+
+    python benchmarks/bench_memory.py
+    python benchmarks/bench_memory.py --turns 1000 --budget 1000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from common.memory import BudgetedHistory, estimate_tokens
+
+SUMMARY_TOKENS = 300
+
+
+def fake_summarize(summary, turns):
+    """Stand-in for the Claude summary: keeps roughly SUMMARY_TOKENS tokens of text."""
+    text = (summary + " " + " ".join(t.content for t in turns)).strip()
+    return text[-SUMMARY_TOKENS * 4:]
+
+
+def session(turns, rng):
+    for i in range(turns):
+        question = f"Question {i}: " + "word " * rng.randint(5, 40)
+        # Mostly short answers, with the occasional essay
+        words = rng.choice([rng.randint(20, 150)] * 9 + [rng.randint(1500, 4000)])
+        yield question, "answer " * words
+
+
+def count_window(exchanges):
+    history = BudgetedHistory(max_tokens=float("inf"), max_turns=exchanges, summarize=None)
+    return history.add_exchange, history.prompt_tokens, lambda: None
+
+
+def budgeted(budget):
+    history = BudgetedHistory(max_tokens=budget, summarize=fake_summarize)
+    return history.add_exchange, history.prompt_tokens, history.wait
+
+
+def run(turns, budget):
+    strategies = {
+        "last 3 exchanges (week_1 before)": count_window(3),
+        "last 5 exchanges (week_5 before)": count_window(5),
+        f"token budget {budget} + summary": budgeted(budget),
+    }
+    print(f"{turns} turns; history tokens carried by each prompt\n")
+    print(f"{'strategy':<34} {'mean':>7} {'p95':>7} {'max':>7}")
+    for name, (add, tokens, wait) in strategies.items():
+        sizes = []
+        for question, answer in session(turns, random.Random(7)):
+            sizes.append(tokens() + estimate_tokens(question))
+            add(question, answer)
+            wait()
+        sizes.sort()
+        p95 = sizes[int(len(sizes) * 0.95) - 1]
+        print(f"{name:<34} {statistics.mean(sizes):>7.0f} {p95:>7} {sizes[-1]:>7}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--turns", type=int, default=500)
+    parser.add_argument("--budget", type=int, default=1500)
+    args = parser.parse_args()
+    run(args.turns, args.budget)
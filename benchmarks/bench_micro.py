@@ -0,0 +1,241 @@
+"""
+Micro-benchmarks for the per-request hot paths, across input sizes.
+
+Times, per call:
+- week_6 filter_prompt by prompt length, and the WordFilter it uses by word-list size
+- week_4 app/filter.is_safe by prompt length
+- week_1 Memory.update and get_messages by history length (exchanges held)
+- week_5 memory.update and get_context by history length (exchanges on disk)
+- week_2 pipeline/logstore.parse_block, the dashboard's log parser, by block size
+
+Each point is the best of --repeat rounds, each round long enough (timeit's
+autorange) to be measured reliably. The "x prev" column is the cost relative to
+the previous size, so the shape of each scaling curve shows at a glance.
+
+Each point is also stored relative to a fixed reference loop timed right after
+it ("x ref"), and --compare checks that ratio, so a machine that runs slower
+overall doesn't read as a regression. --save-baseline / --compare work as in
+bench_load.py (baselines/micro.json; a point more than --tolerance slower is a
+regression, exit status 1). Sub-millisecond timings on a shared machine still
+move by 20-30% between runs, so the default tolerance (50%) is meant to catch
+step changes such as a path going from constant to linear; run on a quiet
+machine with a higher --repeat for finer checks. Baselines are per machine:
+runs on another CPU or Python are skipped.
+
+--record appends the run to baselines/micro_history.jsonl with the git commit,
+and --trend prints each point across the recorded runs, to follow the curves
+over time.
+
+    python benchmarks/bench_micro.py
+    python benchmarks/bench_micro.py --cases filter_prompt,parse_block --compare
+    python benchmarks/bench_micro.py --record && python benchmarks/bench_micro.py --trend
+"""
+
+import argparse
+import importlib.util
+import os
+import platform
+import random
+import string
+import sys
+import tempfile
+import timeit
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import regression
+
+BASELINE_PATH = os.path.join(ROOT, "benchmarks", "baselines", "micro.json")
+HISTORY_PATH = os.path.join(ROOT, "benchmarks", "baselines", "micro_history.jsonl")
+
+
+def load_module(name, path):
+    """Import a file under a unique name: several weeks have a memory.py or filter.py."""
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, path))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def words(n, rng, vocabulary):
+    return " ".join(rng.choice(vocabulary) for _ in range(n))
+
+
+def vocabulary(rng, size=5000):
+    return ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 9))) for _ in range(size)]
+
+
+def fake_summarize(summary, turns):
+    """Stand-in for the Claude summary call (see bench_memory.py)."""
+    return (summary + " " + " ".join(t.content for t in turns)).strip()[-1200:]
+
+
+# ---- cases: each yields (name, size label, function to time) ----
+
+def filter_prompt_cases(rng, workdir):
+    week6 = load_module("week6_filter", "week_6/filter.py")
+    vocab = vocabulary(rng)
+    for n in (10, 100, 1000, 10000):
+        prompt = words(n, rng, vocab) + " my password is hunter2"
+        yield "filter_prompt", f"words={n}", lambda prompt=prompt: week6.filter_prompt(prompt)
+    prompt = words(100, rng, vocab)
+    for terms in (10, 100, 1000, 10000):
+        listed = sorted({"".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 10))) for _ in range(terms)})
+        engine = week6.WordFilter(set(listed[::2]), set(listed[1::2]))
+        yield "word_filter", f"terms={terms}", lambda engine=engine: engine.check(prompt)
+
+
+def is_safe_cases(rng, workdir):
+    week4 = load_module("week4_filter", "week_4/app/filter.py")
+    vocab = vocabulary(rng)
+    for n in (10, 100, 1000, 10000):
+        prompt = words(n, rng, vocab)
+        yield "is_safe", f"words={n}", lambda prompt=prompt: week4.is_safe(prompt)
+
+
+def week1_memory_cases(rng, workdir):
+    sys.path.insert(0, os.path.join(ROOT, "week_1/conversational-ai-assistant/src"))
+    week1 = load_module("week1_memory", "week_1/conversational-ai-assistant/src/memory.py")
+    vocab = vocabulary(rng)
+    for n in (10, 100, 1000):
+        # Budget and turn limit large enough to hold n exchanges, so each update evicts one
+        memory = week1.Memory(max_turns=n, max_tokens=10 ** 9, summarize=None)
+        for _ in range(n):
+            memory.update(words(20, rng, vocab), words(60, rng, vocab))
+        question, answer = words(20, rng, vocab), words(60, rng, vocab)
+        yield "week1.update", f"history={n}", lambda memory=memory: memory.update(question, answer)
+        yield "week1.get_messages", f"history={n}", lambda memory=memory: memory.get_messages(question)
+
+
+def week5_memory_cases(rng, workdir):
+    # Keep every prefilled exchange on disk, and point the module at a scratch database
+    os.environ["Q_MEMORY_RETENTION_TURNS"] = str(10 ** 9)
+    os.environ["Q_MEMORY_DB"] = os.path.join(workdir, "import.db")
+    sys.path.insert(0, os.path.join(ROOT, "week_5"))
+    week5 = load_module("week5_memory", "week_5/memory.py")
+    week5.summarize = fake_summarize
+    vocab = vocabulary(rng)
+    for n in (100, 1000, 10000):
+        week5.store = week5.HistoryStore(os.path.join(workdir, f"q_memory_{n}.db"),
+                                         legacy_dir=os.path.join(workdir, "no-legacy-store"))
+        week5.store.append([turn for _ in range(n)
+                            for turn in (("user", words(20, rng, vocab)), ("assistant", words(60, rng, vocab)))])
+        week5.compact()
+        question, answer = words(20, rng, vocab), words(60, rng, vocab)
+        store = week5.store
+
+        def update(store=store):
+            week5.store = store
+            week5.update(question, answer)
+
+        def get_context(store=store):
+            week5.store = store
+            return week5.get_context()
+        yield "week5.update", f"history={n}", update
+        yield "week5.get_context", f"history={n}", get_context
+
+
+def parse_block_cases(rng, workdir):
+    import bench_logparse  # puts week_2 on sys.path
+    from pipeline.logstore import parse_block
+    for n in (1000, 10000, 100000):
+        data = bench_logparse.pipeline_records(n, rng).encode()
+        yield "parse_block", f"lines={n}", lambda data=data: parse_block(data)
+
+
+CASES = {
+    "filter_prompt": filter_prompt_cases,
+    "is_safe": is_safe_cases,
+    "week1_memory": week1_memory_cases,
+    "week5_memory": week5_memory_cases,
+    "parse_block": parse_block_cases,
+}
+
+
+def measure(fn, repeat):
+    """Microseconds per call: best of `repeat` rounds of autorange's call count."""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1e6
+
+
+def reference():
+    """A fixed pure-Python workload; points are also stored relative to it (see --compare)."""
+    total = 0
+    for i in range(1000):
+        total += i * i % 7
+    return total
+
+
+def print_trend(path, runs):
+    """Microseconds per call for each point over the last `runs` recorded runs, oldest first."""
+    entries = regression.history(path)[-runs:]
+    if not entries:
+        print(f"No runs recorded in {os.path.relpath(path)} yet (use --record)")
+        return
+    print(f"{'case':<34}" + "".join(f"{(e['commit'] or '?'):>11}" for e in entries))
+    for key in dict.fromkeys(k for e in entries for k in e["results"]):
+        cells = [e["results"].get(key, {}).get("us") for e in entries]
+        print(f"{key:<34}" + "".join(f"{c:>11.2f}" if c is not None else f"{'-':>11}" for c in cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--cases", default=",".join(CASES), help=f"comma-separated, from {', '.join(CASES)}")
+    parser.add_argument("--repeat", type=int, default=5, help="rounds per point; the best one counts")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--compare", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.5)
+    parser.add_argument("--history", default=HISTORY_PATH)
+    parser.add_argument("--record", action="store_true", help="append this run to the history file")
+    parser.add_argument("--trend", action="store_true", help="print the recorded runs instead of measuring")
+    parser.add_argument("--runs", type=int, default=8, help="recorded runs shown by --trend")
+    args = parser.parse_args()
+
+    cases = [c.strip() for c in args.cases.split(",") if c.strip()]
+    unknown = set(cases) - set(CASES)
+    if unknown:
+        parser.error(f"unknown cases: {', '.join(sorted(unknown))}")
+    if args.trend:
+        return print_trend(args.history, args.runs)
+
+    settings = {"python": platform.python_version(), "machine": platform.machine(), "cpus": os.cpu_count(),
+                "repeat": args.repeat}
+    rng = random.Random(42)
+    results = {}
+    print(f"{'case':<22}{'size':>14}{'us/call':>12}{'x prev':>8}{'x ref':>9}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for case in cases:
+            previous = {}
+            for name, size, fn in CASES[case](rng, workdir):
+                # The reference is timed next to each point, so a machine that slows down
+                # (CPU frequency, noisy neighbours) shifts both and the ratio holds
+                us, ref = measure(fn, args.repeat), measure(reference, args.repeat)
+                growth = f"{us / previous[name]:.1f}" if name in previous else ""
+                previous[name] = us
+                results[f"{name}@{size}"] = {"us": round(us, 3), "ref": round(us / ref, 4)}
+                print(f"{name:<22}{size:>14}{us:>12.2f}{growth:>8}{us / ref:>9.3f}", flush=True)
+
+    regressions = []
+    if args.compare:
+        print(f"\nAgainst {os.path.relpath(args.baseline)} (tolerance {args.tolerance:.0%}):")
+        regressions = regression.compare(results, regression.load(args.baseline), settings, args.tolerance,
+                                         lower_is_better=("ref",))
+        for message in regressions:
+            print(f"  REGRESSION {message}")
+        if not regressions:
+            print("  no regressions")
+    if args.save_baseline:
+        regression.save(args.baseline, results, settings)
+        print(f"\nSaved baseline for {len(results)} points to {os.path.relpath(args.baseline)}")
+    if args.record:
+        regression.record(args.history, results, settings)
+        print(f"Recorded the run in {os.path.relpath(args.history)}")
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
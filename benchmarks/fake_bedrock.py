@@ -0,0 +1,208 @@
+"""
+Local stand-in for the Bedrock runtime, for load tests and benchmarks.
+
+Speaks enough of the runtime API for common/bedrock.py: InvokeModel returns a
+Claude messages response, InvokeModelWithResponseStream returns the same reply as
+an AWS event stream (message_start, one content_block_delta per chunk,
+message_delta, message_stop). Point a service at it with BEDROCK_ENDPOINT_URL.
+
+- Latency per call is drawn from a distribution: "fixed:0.2", "uniform:0.1,0.5"
+  or "lognormal:0.3,0.5" (median seconds, sigma). Streams take that long to the
+  first chunk, then chunk_interval seconds per further chunk.
+- throttle is the fraction of calls rejected with ThrottlingException (HTTP 429);
+  max_inflight rejects calls above that many in flight, like an account quota.
+- stats counts calls, streams and throttled calls.
+
+    python benchmarks/fake_bedrock.py --port 8900 --latency lognormal:0.4,0.5 --throttle 0.02
+    BEDROCK_ENDPOINT_URL=http://127.0.0.1:8900 python week_4/main.py
+"""
+
+import argparse
+import base64
+import binascii
+import json
+import math
+import random
+import struct
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPLY_WORDS = ("Sure. Step one: breathe in. Step two: open the console. Step three: run the command, "
+               "check the output and confirm the result before moving on.").split(" ")
+
+
+def latency_sampler(spec, rng=random):
+    """Seconds-per-call sampler for a spec like "fixed:0.2", "uniform:0.1,0.5" or "lognormal:0.3,0.5"."""
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",") if v]
+    if kind == "fixed":
+        return lambda: values[0]
+    if kind == "uniform":
+        low, high = values
+        return lambda: rng.uniform(low, high)
+    if kind == "lognormal":
+        median, sigma = values
+        return lambda: rng.lognormvariate(math.log(median), sigma)
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+def _header(name, value):
+    name, value = name.encode(), value.encode()
+    return struct.pack("!B", len(name)) + name + struct.pack("!BH", 7, len(value)) + value
+
+
+def event_message(payload: dict, event_type="chunk") -> bytes:
+    """One message in the AWS event-stream binary framing, as botocore reads it."""
+    headers = (_header(":event-type", event_type) + _header(":content-type", "application/json")
+               + _header(":message-type", "event"))
+    body = json.dumps({"bytes": base64.b64encode(json.dumps(payload).encode()).decode()}).encode()
+    total = 12 + len(headers) + len(body) + 4
+    prelude = struct.pack("!II", total, len(headers))
+    message = prelude + struct.pack("!I", binascii.crc32(prelude)) + headers + body
+    return message + struct.pack("!I", binascii.crc32(message))
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real endpoint
+
+    def do_POST(self):
+        server = self.server
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        with server.lock:
+            server.stats["calls"] += 1
+            server.inflight += 1
+            throttled = (server.rng.random() < server.throttle
+                         or (server.max_inflight and server.inflight > server.max_inflight))
+            if throttled:
+                server.stats["throttled"] += 1
+            delay = server.latency()
+        try:
+            if throttled:
+                return self._throttle()
+            words = REPLY_WORDS[:server.chunks]
+            input_tokens = len(json.dumps(request.get("messages", ""))) // 4
+            if self.path.endswith("/invoke-with-response-stream"):
+                with server.lock:
+                    server.stats["streams"] += 1
+                self._stream(words, input_tokens, delay)
+            else:
+                time.sleep(delay)
+                self._json(200, {
+                    "id": "msg_fake", "type": "message", "role": "assistant", "stop_reason": "end_turn",
+                    "content": [{"type": "text", "text": " ".join(words)}],
+                    "usage": {"input_tokens": input_tokens, "output_tokens": len(words)}
+                })
+        finally:
+            with server.lock:
+                server.inflight -= 1
+
+    def _json(self, status, payload, headers=()):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _throttle(self):
+        self._json(429, {"message": "Too many requests, please wait before trying again."},
+                   [("x-amzn-ErrorType", "ThrottlingException")])
+
+    def _stream(self, words, input_tokens, delay):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/vnd.amazon.eventstream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        self._send(event_message({"type": "message_start",
+                                  "message": {"usage": {"input_tokens": input_tokens, "output_tokens": 1}}}))
+        time.sleep(delay)
+        for i, word in enumerate(words):
+            if i:
+                time.sleep(self.server.chunk_interval)
+            text = word if i == len(words) - 1 else word + " "
+            self._send(event_message({"type": "content_block_delta", "index": 0,
+                                      "delta": {"type": "text_delta", "text": text}}))
+        self._send(event_message({"type": "message_delta", "delta": {"stop_reason": "end_turn"},
+                                  "usage": {"output_tokens": len(words)}}))
+        self._send(event_message({"type": "message_stop"}))
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _send(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024  # listen backlog; the default 5 drops bursts of new connections
+
+    def handle_error(self, request, client_address):
+        # Clients hang up on purpose (cancelled streams, shutdown); only report real failures
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class FakeBedrock:
+    """Threaded HTTP server on 127.0.0.1; use as a context manager, or start()/stop()."""
+
+    def __init__(self, latency="fixed:0.2", throttle=0.0, max_inflight=0, chunks=20, chunk_interval=0.01,
+                 port=0, seed=None):
+        self.server = _Server(("127.0.0.1", port), _Handler)
+        self.server.rng = random.Random(seed)
+        self.server.latency = latency_sampler(latency, self.server.rng) if isinstance(latency, str) else latency
+        self.server.throttle = throttle
+        self.server.max_inflight = max_inflight
+        self.server.chunks = max(1, min(chunks, len(REPLY_WORDS)))
+        self.server.chunk_interval = chunk_interval
+        self.server.lock = threading.Lock()
+        self.server.inflight = 0
+        self.server.stats = {"calls": 0, "streams": 0, "throttled": 0}
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def stats(self) -> dict:
+        with self.server.lock:
+            return dict(self.server.stats)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", default="fixed:0.2", help="fixed:S, uniform:LOW,HIGH or lognormal:MEDIAN,SIGMA")
+    parser.add_argument("--throttle", type=float, default=0.0, help="fraction of calls rejected with 429")
+    parser.add_argument("--max-inflight", type=int, default=0, help="throttle calls above this many in flight")
+    parser.add_argument("--chunks", type=int, default=20, help="words per reply (stream chunks)")
+    parser.add_argument("--chunk-interval", type=float, default=0.01, help="seconds between stream chunks")
+    args = parser.parse_args()
+    fake = FakeBedrock(args.latency, args.throttle, args.max_inflight, args.chunks, args.chunk_interval, args.port)
+    print(f"Fake Bedrock runtime on {fake.url} (Ctrl-C to stop)")
+    try:
+        fake.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Baselines for the benchmark scripts.
+
+Results are saved per run key (e.g. "week4@8", "parse_block@lines=10000") with the
+settings they were measured under, compared against later runs with a tolerance,
+and can be appended to a history file (one JSON line per run, with the git commit)
+so the numbers can be followed across changes.
+"""
+
+import json
+import os
+import subprocess
+import time
+
+
+def load(path) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save(path, results, settings):
+    """Merge the results into the baseline file at `path`."""
+    baseline = load(path)
+    for key, result in results.items():
+        baseline[key] = {**result, "settings": settings}
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def compare(results, baseline, settings, tolerance, higher_is_better=(), lower_is_better=()) -> list:
+    """Regression messages for metrics that got worse than the baseline by more than `tolerance`."""
+    regressions = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        if base is None:
+            print(f"  {key}: no baseline")
+            continue
+        if base.get("settings") != settings:
+            print(f"  {key}: baseline was recorded with different settings, skipped")
+            continue
+        for metric in higher_is_better:
+            if base.get(metric) and result.get(metric) is not None and result[metric] < base[metric] * (1 - tolerance):
+                regressions.append(f"{key}: {metric} {result[metric]} vs {base[metric]} baseline")
+        for metric in lower_is_better:
+            if base.get(metric) and result.get(metric) is not None and result[metric] > base[metric] * (1 + tolerance):
+                regressions.append(f"{key}: {metric} {result[metric]} vs {base[metric]} baseline")
+    return regressions
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def record(path, results, settings):
+    """Append this run to the history file at `path`."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    entry = {"ts": time.strftime("%Y-%m-%dT%H:%M:%S"), "commit": git_commit(), "settings": settings,
+             "results": results}
+    with open(path, "a") as f:
+        f.write(json.dumps(entry, sort_keys=True) + "\n")
+
+
+def history(path) -> list:
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
@@ -0,0 +1,3 @@
+"""
+Shared building blocks used by every week's project (Bedrock client, guardrail helpers).
+"""
@@ -0,0 +1,472 @@
+"""
+Shared Amazon Bedrock (Claude) client for all weeks.
+
+- One boto3 client per (service, region, credentials, endpoint), created lazily and reused
+- Tuned HTTP connection pool with TCP keep-alive and adaptive retries
+- Per-call model and parameter overrides
+- invoke_claude returns text (or an "[ERROR] ..." string), ainvoke_claude is its async twin
+- stream_claude yields reply text chunks as they are generated, astream_claude is its async twin
+- Identical requests are answered from a response cache (see common/cache.py); pass
+  use_cache=False for calls that must hit the model, e.g. when you want varied samples
+- Identical requests already in flight are coalesced into one upstream call
+  (see common/singleflight.py); coalesce defaults to use_cache
+- Calls that reach the model are admitted by a shared rate limiter (see common/ratelimit.py):
+  RPM/TPM buckets, an adaptive concurrency limit, and priority="interactive" (default),
+  "background" or "batch" so chat goes first when calls queue
+- cached_system() marks static system prompts for Anthropic prompt caching; token usage,
+  prompt-cache reads/writes and time to first token are counted in usage_stats()
+- last_call holds the model, tokens and time to first byte of the latest call made in
+  the current thread or task, for callers that record metrics per request
+- Callers with their own retry policy wrap it in single_attempt(), so botocore's retries
+  don't multiply theirs
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+from botocore.config import Config
+from dotenv import load_dotenv
+
+from common.cache import cache_key, from_env as cache_from_env
+from common.ratelimit import from_env as limiter_from_env
+from common.resilience import error_code
+from common.singleflight import SingleFlight
+from common.usage import UsageStats
+
+load_dotenv()
+
+DEFAULT_MODEL_ID = os.getenv(
+    "BEDROCK_MODEL_ID",
+    "arn:aws:bedrock:us-east-2:255327957065:inference-profile/us.anthropic.claude-3-5-haiku-20241022-v1:0"
+)
+ANTHROPIC_VERSION = "bedrock-2023-05-31"
+DEFAULT_MAX_TOKENS = 1000
+DEFAULT_TEMPERATURE = 0.7
+
+# Connection pool per client; keep it above MAX_CONCURRENCY so threads never wait on a socket
+MAX_POOL_CONNECTIONS = int(os.getenv("BEDROCK_MAX_POOL_CONNECTIONS", "50"))
+# Bedrock calls in flight per process to start with; the rate limiter adapts it up to MAX_POOL_CONNECTIONS
+MAX_CONCURRENCY = int(os.getenv("BEDROCK_MAX_CONCURRENCY", "16"))
+# Tries per call including the first (botocore's max_attempts would count retries only)
+MAX_ATTEMPTS = int(os.getenv("BEDROCK_MAX_ATTEMPTS", "3"))
+
+CLIENT_CONFIG = Config(
+    max_pool_connections=MAX_POOL_CONNECTIONS,
+    tcp_keepalive=True,
+    connect_timeout=5,
+    read_timeout=120,
+    retries={"total_max_attempts": MAX_ATTEMPTS, "mode": "adaptive"}
+)
+
+_clients = {}
+_clients_lock = threading.Lock()
+# Threads for the async calls; as many as the limiter may admit, so it alone decides what queues
+_executor = ThreadPoolExecutor(max_workers=MAX_POOL_CONNECTIONS, thread_name_prefix="bedrock")
+_END = object()  # end of an astream_claude reader's chunks
+
+# Shared by every call in the process; None when BEDROCK_CACHE=off
+response_cache = cache_from_env()
+# Shares one in-flight invoke_model call between concurrent identical requests
+inflight = SingleFlight()
+# Token, prompt-cache and latency counters for every call that reached the model
+usage = UsageStats()
+# Admission control for Bedrock quotas; starts at MAX_CONCURRENCY calls in flight and adapts
+limiter = limiter_from_env(concurrency=MAX_CONCURRENCY, max_concurrency=MAX_POOL_CONNECTIONS)
+# The latest invoke()/stream() in this context: model_id, input_tokens (prompt-cache reads and
+# writes included), output_tokens, ttfb (seconds from sending to the response headers, or to the
+# first streamed token), sdk_retries (botocore's own retries) and cached (answered from the cache)
+last_call = contextvars.ContextVar("bedrock_last_call", default=None)
+# botocore attempts per runtime call in this context; None means MAX_ATTEMPTS (see single_attempt)
+sdk_attempts = contextvars.ContextVar("bedrock_sdk_attempts", default=None)
+
+
+def get_client(service_name="bedrock-runtime", region_name=None,
+               aws_access_key_id=None, aws_secret_access_key=None, endpoint_url=None, max_attempts=None):
+    """
+    Return the shared boto3 client for these settings, creating it on first use.
+
+    Unset arguments fall back to AWS_REGION, AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY
+    and BEDROCK_ENDPOINT_URL (runtime client only, e.g. a local stub). max_attempts
+    overrides MAX_ATTEMPTS (botocore tries per call, the first included).
+    """
+    region_name = region_name or os.getenv("AWS_REGION")
+    aws_access_key_id = aws_access_key_id or os.getenv("AWS_ACCESS_KEY_ID")
+    aws_secret_access_key = aws_secret_access_key or os.getenv("AWS_SECRET_ACCESS_KEY")
+    if endpoint_url is None and service_name == "bedrock-runtime":
+        endpoint_url = os.getenv("BEDROCK_ENDPOINT_URL")
+
+    key = (service_name, region_name, aws_access_key_id, aws_secret_access_key, endpoint_url, max_attempts)
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                client = boto3.client(
+                    service_name,
+                    region_name=region_name,
+                    aws_access_key_id=aws_access_key_id,
+                    aws_secret_access_key=aws_secret_access_key,
+                    endpoint_url=endpoint_url,
+                    config=CLIENT_CONFIG if max_attempts is None else CLIENT_CONFIG.merge(
+                        Config(retries={"total_max_attempts": max_attempts, "mode": "adaptive"}))
+                )
+                _clients[key] = client
+    return client
+
+
+def reset_clients():
+    """Drop every cached client (e.g. after rotating credentials)."""
+    with _clients_lock:
+        _clients.clear()
+
+
+@contextlib.contextmanager
+def single_attempt():
+    """
+    Make Bedrock runtime calls in this block (and tasks started from it) without botocore retries.
+
+    For callers that retry with their own policy (common/resilience.Retry): otherwise each of
+    their attempts is retried MAX_ATTEMPTS times underneath, multiplying the calls per request.
+    """
+    token = sdk_attempts.set(1)
+    try:
+        yield
+    finally:
+        sdk_attempts.reset(token)
+
+
+def as_messages(prompt):
+    """Accept a plain prompt string or a Claude messages list."""
+    if isinstance(prompt, str):
+        return [{"role": "user", "content": prompt}]
+    return list(prompt)
+
+
+def build_body(messages, max_tokens=DEFAULT_MAX_TOKENS, temperature=DEFAULT_TEMPERATURE, **params):
+    """Anthropic Messages request body; extra params (system, top_p, ...) pass through."""
+    body = {
+        "anthropic_version": ANTHROPIC_VERSION,
+        "messages": as_messages(messages),
+        "max_tokens": max_tokens,
+        "temperature": temperature
+    }
+    body.update({k: v for k, v in params.items() if v is not None})
+    return body
+
+
+def cached_system(*texts):
+    """
+    System prompt blocks with a prompt-cache breakpoint after the last one.
+
+    Pass the result as system=... so Claude reuses the processed prefix across calls
+    instead of re-reading the same instructions on every request. Keep these texts
+    static: anything that varies per request belongs in the messages.
+    """
+    blocks = [{"type": "text", "text": text} for text in texts if text]
+    if blocks:
+        blocks[-1]["cache_control"] = {"type": "ephemeral"}
+    return blocks
+
+
+def extract_text(result: dict) -> str:
+    """Pull the completion text out of a parsed Claude (or guardrail) response."""
+    if "output" in result and "content" not in result:
+        output = result["output"]
+        return output["text"] if "text" in output else str(output)
+    return "".join(
+        block.get("text", "") for block in result.get("content", []) if block.get("type", "text") == "text"
+    ).strip()
+
+
+def _prepare(messages, model_id=None, max_tokens=DEFAULT_MAX_TOKENS, temperature=DEFAULT_TEMPERATURE,
+             guardrail_id=None, guardrail_version=None, **params):
+    """Build the invoke_model kwargs and the request key used by the cache and coalescer."""
+    body = build_body(messages, max_tokens=max_tokens, temperature=temperature, **params)
+    kwargs = dict(
+        body=json.dumps(body),
+        modelId=model_id or DEFAULT_MODEL_ID,
+        contentType="application/json",
+        accept="application/json"
+    )
+    if guardrail_id:
+        kwargs["guardrailIdentifier"] = guardrail_id
+        kwargs["guardrailVersion"] = guardrail_version or "DRAFT"
+    key = cache_key(kwargs["modelId"], body, guardrail_id, kwargs.get("guardrailVersion"))
+    return kwargs, key
+
+
+def cache_stats() -> dict:
+    """Hit/miss counters of the response cache."""
+    return response_cache.stats() if response_cache is not None else {"backend": "off"}
+
+
+def coalesce_stats() -> dict:
+    """How many concurrent identical calls were collapsed into a shared one."""
+    return inflight.stats()
+
+
+def usage_stats() -> dict:
+    """Token usage, prompt-cache savings and latency of calls that reached the model."""
+    return usage.stats()
+
+
+def limiter_stats() -> dict:
+    """Concurrency limit, queue and throttling counters of the rate limiter."""
+    return limiter.stats()
+
+
+def _estimate_tokens(kwargs) -> int:
+    """What Bedrock reserves against the TPM quota: the input (about 4 bytes a token) plus max_tokens."""
+    body = kwargs["body"]
+    return len(body) // 4 + json.loads(body).get("max_tokens", DEFAULT_MAX_TOKENS)
+
+
+def _used_tokens(counts):
+    if not counts:
+        return None
+    return sum(counts.get(k) or 0 for k in ("input_tokens", "output_tokens", "cache_read_input_tokens",
+                                            "cache_creation_input_tokens"))
+
+
+def _new_call(kwargs) -> dict:
+    call = {"model_id": kwargs["modelId"], "input_tokens": 0, "output_tokens": 0, "ttfb": None,
+            "sdk_retries": 0, "cached": False}
+    last_call.set(call)
+    return call
+
+
+def _note_usage(call, counts):
+    counts = counts or {}
+    call["input_tokens"] = sum(counts.get(k) or 0 for k in ("input_tokens", "cache_read_input_tokens",
+                                                            "cache_creation_input_tokens"))
+    call["output_tokens"] = counts.get("output_tokens") or 0
+
+
+def _is_throttle(error) -> bool:
+    return error_code(error) in ("ThrottlingException", "TooManyRequestsException", "ServiceUnavailableException")
+
+
+def _retried(response) -> bool:
+    """botocore retried the call (adaptive mode) before it succeeded: a sign of throttling."""
+    return response.get("ResponseMetadata", {}).get("RetryAttempts", 0) > 0
+
+
+def _invoke_model(kwargs, key, use_cache, priority="interactive", call=None):
+    permit = limiter.acquire(_estimate_tokens(kwargs), priority)
+    started = time.perf_counter()
+    try:
+        response = get_client(max_attempts=sdk_attempts.get()).invoke_model(**kwargs)
+        if call is not None:
+            call["ttfb"] = time.perf_counter() - started
+            call["sdk_retries"] = response.get("ResponseMetadata", {}).get("RetryAttempts", 0)
+        result = json.loads(response["body"].read())
+    except Exception as e:
+        permit.release(throttled=_is_throttle(e))
+        raise
+    permit.release(_used_tokens(result.get("usage")), throttled=_retried(response))
+    usage.record(result.get("usage"), latency=time.perf_counter() - started)
+    if use_cache:
+        response_cache.set(key, result)
+    return result
+
+
+def _should_coalesce(use_cache=True, coalesce=None) -> bool:
+    """coalesce=None means "follow use_cache"; shared by invoke() and ainvoke_claude()."""
+    return use_cache if coalesce is None else coalesce
+
+
+def invoke(messages, use_cache=True, coalesce=None, priority="interactive", **params) -> dict:
+    """
+    Call invoke_model and return the parsed JSON response. Raises on failure.
+
+    params: model_id, max_tokens, temperature, guardrail_id, guardrail_version; any other
+    keyword is added to the request body (system, top_p, stop_sequences, ...).
+    priority orders this call in the rate limiter's queue.
+    """
+    kwargs, key = _prepare(messages, **params)
+    call = _new_call(kwargs)
+    coalesce = _should_coalesce(use_cache, coalesce)
+    use_cache = use_cache and response_cache is not None
+    if use_cache:
+        cached = response_cache.get(key)
+        if cached is not None:
+            call["cached"] = True
+            _note_usage(call, cached.get("usage"))
+            return cached
+    if coalesce:
+        # A caller that joins another's call gets its tokens but no ttfb of its own
+        result = inflight.do(key, _invoke_model, kwargs, key, use_cache, priority, call)
+    else:
+        result = _invoke_model(kwargs, key, use_cache, priority, call)
+    _note_usage(call, result.get("usage"))
+    return result
+
+
+def stream(messages, use_cache=True, priority="interactive", **params):
+    """
+    Call invoke_model_with_response_stream and yield text deltas as they arrive. Raises on failure.
+
+    Closing the generator early closes the HTTP stream, so abandoned replies stop consuming tokens.
+    A cached reply is yielded as a single chunk; a fully streamed reply is added to the cache.
+    Streams are not coalesced.
+    """
+    kwargs, key = _prepare(messages, **params)
+    call = _new_call(kwargs)
+    use_cache = use_cache and response_cache is not None
+    if use_cache:
+        cached = response_cache.get(key)
+        if cached is not None:
+            call["cached"] = True
+            yield extract_text(cached)
+            return
+    permit = limiter.acquire(_estimate_tokens(kwargs), priority)
+    started = time.perf_counter()
+    try:
+        response = get_client(max_attempts=sdk_attempts.get()).invoke_model_with_response_stream(**kwargs)
+    except Exception as e:
+        permit.release(throttled=_is_throttle(e))
+        raise
+    events = response["body"]
+    parts = []
+    counts = {}
+    ttft = None
+    try:
+        for event in events:
+            chunk = event.get("chunk")
+            if not chunk:
+                continue
+            data = json.loads(chunk["bytes"])
+            kind = data.get("type")
+            if kind == "content_block_delta":
+                text = data["delta"].get("text")
+                if text:
+                    if ttft is None:
+                        ttft = time.perf_counter() - started
+                    parts.append(text)
+                    yield text
+            elif kind == "message_start":
+                # input and prompt-cache counts; output_tokens grows in message_delta
+                counts.update(data.get("message", {}).get("usage") or {})
+            elif kind == "message_delta":
+                counts.update(data.get("usage") or {})
+    finally:
+        events.close()
+        permit.release(_used_tokens(counts), throttled=_retried(response))
+        usage.record(counts, latency=time.perf_counter() - started, ttft=ttft)
+        _note_usage(call, counts)
+        call.update(ttfb=ttft, sdk_retries=response.get("ResponseMetadata", {}).get("RetryAttempts", 0))
+    if use_cache:
+        response_cache.set(key, {"content": [{"type": "text", "text": "".join(parts)}]})
+
+
+def invoke_claude(messages, **overrides) -> str:
+    """
+    Send a prompt string or messages list to Claude and return the reply text.
+
+    Keyword overrides go to invoke(). Errors come back as "[ERROR] ..." strings
+    so callers can display them directly.
+    """
+    try:
+        return extract_text(invoke(messages, **overrides))
+    except Exception as e:
+        return f"[ERROR] Claude invocation failed: {e}"
+
+
+def stream_claude(messages, on_error=None, **overrides):
+    """
+    Streaming version of invoke_claude: yields reply text chunks.
+
+    On failure the last chunk is an "[ERROR] ..." string, matching invoke_claude.
+    Callers that need to tell a failure apart from reply text pass on_error: it is
+    called with the error message instead, and no error chunk is yielded.
+    """
+    try:
+        yield from stream(messages, **overrides)
+    except Exception as e:
+        error = f"[ERROR] Claude invocation failed: {e}"
+        if on_error is None:
+            yield error
+        else:
+            on_error(error)
+
+
+async def ainvoke_claude(messages, **overrides) -> str:
+    """
+    Async version of invoke_claude for FastAPI handlers.
+
+    The blocking boto3 call runs on a bounded thread pool (BEDROCK_MAX_POOL_CONNECTIONS
+    workers, admitted by the rate limiter) so a slow completion never stalls the event
+    loop. It runs in a copy of the caller's context, so spans and the request id carry
+    over, and last_call is set in the caller's task afterwards. Identical concurrent
+    requests await one shared call instead of each taking a worker.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    # Coalesced here, across coroutines, so the worker must not coalesce again
+    call = functools.partial(invoke_claude, messages, **{**overrides, "coalesce": False})
+
+    async def run():
+        text = await loop.run_in_executor(_executor, context.run, call)
+        return text, context.get(last_call)
+
+    if not _should_coalesce(overrides.get("use_cache", True), overrides.get("coalesce")):
+        text, record = await run()
+        last_call.set(record)
+        return text
+    led = []
+
+    def lead():
+        led.append(True)
+        return run()
+
+    params = {k: v for k, v in overrides.items() if k not in ("use_cache", "coalesce", "priority")}
+    text, record = await inflight.ado(_prepare(messages, **params)[1], lead)
+    # Like invoke(): a caller that joins another's call gets its tokens but no ttfb of its own
+    last_call.set(record if led or record is None else {**record, "ttfb": None})
+    return text
+
+
+async def astream_claude(messages, on_error=None, **overrides):
+    """
+    Async version of stream_claude for asyncio servers: yields reply text chunks.
+
+    The boto3 stream is read on the same bounded thread pool as ainvoke_claude, in a
+    copy of the caller's context, and its chunks are handed to the event loop as they
+    arrive. Closing the generator early stops the reader, which closes the HTTP stream.
+    """
+    loop = asyncio.get_running_loop()
+    chunks = asyncio.Queue()
+    stop = threading.Event()
+    context = contextvars.copy_context()
+
+    def put(item):
+        try:
+            loop.call_soon_threadsafe(chunks.put_nowait, item)
+        except RuntimeError:  # the event loop has closed, nobody is reading any more
+            stop.set()
+
+    def read():
+        source = stream_claude(messages, on_error=on_error, **overrides)
+        try:
+            for chunk in source:
+                if stop.is_set():
+                    break
+                put(chunk)
+        finally:
+            source.close()
+            put(_END)
+
+    loop.run_in_executor(_executor, context.run, read)
+    try:
+        while (chunk := await chunks.get()) is not _END:
+            yield chunk
+    finally:
+        stop.set()
@@ -0,0 +1,147 @@
+"""
+Response cache for identical Bedrock requests.
+
+Keys are a SHA-256 of the canonical request (model, messages, max_tokens, temperature,
+guardrail and any extra body params). Two backends share one interface:
+
+- MemoryCache: in-process LRU with TTL and an entry limit
+- DiskCache: persistent, shared between processes (needs the optional `diskcache` package)
+
+Configured from the environment by from_env():
+    BEDROCK_CACHE              memory (default) | disk | off (anything else is an error)
+    BEDROCK_CACHE_TTL          seconds an entry stays valid (default 3600)
+    BEDROCK_CACHE_MAX_ENTRIES  LRU size for the memory backend (default 1024)
+    BEDROCK_CACHE_DIR          directory for the disk backend (default .bedrock_cache)
+    BEDROCK_CACHE_SIZE_LIMIT   max bytes for the disk backend (default 100 MB)
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    import diskcache
+except ImportError:  # optional, only needed for the disk backend
+    diskcache = None
+
+
+def cache_key(model_id, body, guardrail_id=None, guardrail_version=None) -> str:
+    """Canonical hash of everything that changes the model's answer."""
+    canonical = json.dumps(
+        {"model_id": model_id, "body": body, "guardrail": [guardrail_id, guardrail_version]},
+        sort_keys=True, separators=(",", ":"), ensure_ascii=False
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class MemoryCache:
+    """Thread-safe LRU cache with per-entry expiry."""
+
+    def __init__(self, max_entries=1024, ttl=3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "backend": "memory",
+            "size": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
+
+
+class DiskCache:
+    """Persistent LRU cache on top of diskcache; safe to share between worker processes."""
+
+    def __init__(self, directory=".bedrock_cache", size_limit=100 * 1024 * 1024, ttl=3600):
+        if diskcache is None:
+            raise ImportError("The disk cache backend needs the 'diskcache' package (pip install diskcache).")
+        self.ttl = ttl
+        self._cache = diskcache.Cache(directory, size_limit=size_limit, eviction_policy="least-recently-used")
+        self.hits = self.misses = 0
+
+    def get(self, key):
+        value = self._cache.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key, value):
+        self._cache.set(key, value, expire=self.ttl)
+
+    def clear(self):
+        self._cache.clear()
+
+    def __len__(self):
+        return len(self._cache)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "backend": "disk",
+            "size": len(self),
+            "volume_bytes": self._cache.volume(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0
+        }
+
+
+def from_env():
+    """Build the cache selected by BEDROCK_CACHE, or None when caching is off."""
+    backend = os.getenv("BEDROCK_CACHE", "memory").lower()
+    ttl = float(os.getenv("BEDROCK_CACHE_TTL", "3600"))
+    if backend == "memory":
+        return MemoryCache(max_entries=int(os.getenv("BEDROCK_CACHE_MAX_ENTRIES", "1024")), ttl=ttl)
+    if backend == "disk":
+        return DiskCache(
+            directory=os.getenv("BEDROCK_CACHE_DIR", ".bedrock_cache"),
+            size_limit=int(os.getenv("BEDROCK_CACHE_SIZE_LIMIT", str(100 * 1024 * 1024))),
+            ttl=ttl
+        )
+    if backend == "off":
+        return None
+    raise ValueError(f"Unknown BEDROCK_CACHE backend {backend!r}; expected memory, disk or off.")
@@ -0,0 +1,158 @@
+"""
+Structured, non-blocking logging.
+
+Records are JSON objects, one per line. The calling thread only formats the
+message and puts the record on a queue (logging.handlers.QueueHandler); a
+QueueListener thread does the writing, so slow disks and pipes stay off the
+request path. Files rotate by size (max_bytes) or time (when="midnight", ...).
+
+- request_context() sets a correlation id that every record logged inside it
+  carries as "request_id", across function calls (a contextvar, so asyncio tasks
+  and threads each keep their own)
+- sample_rate keeps that fraction of INFO/DEBUG records; warnings and errors are
+  always kept
+
+    log = get_logger("pipeline", path="pipeline.jsonl", sample_rate=0.1)
+    with request_context():
+        log.info("Received prompt", extra={"prompt_chars": 42})
+"""
+
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+correlation_id = contextvars.ContextVar("correlation_id", default=None)
+
+# Attributes every LogRecord has; anything else came from extra={...}
+_STANDARD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+@contextmanager
+def request_context(request_id=None):
+    """
+    Tag every record logged inside the block with request_id. Without one, a block
+    nested in another request keeps its id, and a top-level block gets a new one.
+    """
+    token = correlation_id.set(request_id or correlation_id.get() or new_request_id())
+    try:
+        yield correlation_id.get()
+    finally:
+        correlation_id.reset(token)
+
+
+class ContextFilter(logging.Filter):
+    """Copies the current correlation id onto the record (in the caller's context, before queueing)."""
+
+    def filter(self, record):
+        record.request_id = correlation_id.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps `rate` of the records below WARNING; the rest are dropped before any formatting."""
+
+    def __init__(self, rate=1.0, rng=random.random):
+        super().__init__()
+        self.rate = rate
+        self.rng = rng
+        self.dropped = 0
+
+    def keep(self, levelno) -> bool:
+        if levelno >= logging.WARNING or self.rate >= 1 or self.rng() < self.rate:
+            return True
+        self.dropped += 1
+        return False
+
+    def filter(self, record):
+        return self.keep(record.levelno)
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="microseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        entry.update({k: v for k, v in vars(record).items() if k not in _STANDARD_ATTRS})
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def file_handler(path, max_bytes=50 * 1024 * 1024, backup_count=5, when=None):
+    """Size-rotated file handler, or time-rotated when `when` is set ("midnight", "H", ...)."""
+    if when:
+        return logging.handlers.TimedRotatingFileHandler(path, when=when, backupCount=backup_count,
+                                                         encoding="utf-8", delay=True)
+    return logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count,
+                                                encoding="utf-8", delay=True)
+
+
+_listeners = []
+
+
+def get_logger(name, path=None, stream=None, sample_rate=1.0, max_bytes=50 * 1024 * 1024, backup_count=5,
+               when=None, level=logging.INFO, handlers=()):
+    """
+    A logger whose records go through a queue to JSON-lines handlers: a rotating
+    file at `path` and/or a `stream` (e.g. sys.stdout). Extra `handlers` (with their
+    own formatting, e.g. a console echo) run on the same listener thread. Configures
+    the logger once; later calls with the same name return it unchanged.
+    """
+    logger = logging.getLogger(name)
+    if getattr(logger, "_jsonlog", False):
+        return logger
+    json_handlers = []
+    if path:
+        json_handlers.append(file_handler(path, max_bytes, backup_count, when))
+    if stream is not None:
+        json_handlers.append(logging.StreamHandler(stream))
+    formatter = JsonFormatter()
+    for handler in json_handlers:
+        handler.setFormatter(formatter)
+
+    records = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(records)
+    queue_handler.addFilter(SamplingFilter(sample_rate))
+    queue_handler.addFilter(ContextFilter())
+    listener = logging.handlers.QueueListener(records, *json_handlers, *handlers, respect_handler_level=True)
+    listener.start()
+    _listeners.append(listener)
+
+    logger.setLevel(level)
+    logger.addHandler(queue_handler)
+    logger.propagate = False
+    logger._jsonlog = True
+    return logger
+
+
+def flush():
+    """Write out everything queued so far (restarts the listeners); for tests and shutdown."""
+    for listener in _listeners:
+        listener.stop()
+        listener.start()
+
+
+@atexit.register
+def _stop_listeners():
+    for listener in _listeners:
+        try:
+            listener.stop()
+        except Exception as e:
+            print(f"[ERROR] Log listener failed to stop: {e}", file=sys.stderr)
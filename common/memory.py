@@ -0,0 +1,184 @@
+"""
+Token-budgeted conversation memory.
+
+Each turn carries an approximate token count (about 4 characters per token, close
+enough to Claude's tokenizer to budget prompts); a single turn bigger than half the
+budget is clipped to its start and end. When the kept turns go over the
+budget, the oldest exchanges are moved out and folded into a running summary on a
+background thread, so the request that triggered it never waits for the summary call.
+
+    history = BudgetedHistory(max_tokens=1500)
+    history.add_exchange("What is IAM?", "Identity and Access Management ...")
+    summary, turns = history.snapshot()  # recent turns stay within the budget
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4  # role markers and separators
+
+SUMMARY_PROMPT = (
+    "Update the running summary of a conversation between a user and an assistant. "
+    "Keep names, numbers, decisions and open questions; drop small talk. "
+    "Answer with the summary only, at most {words} words.\n\n"
+    "Current summary:\n{summary}\n\n"
+    "New turns:\n{turns}"
+)
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="memory-compaction")
+
+
+def estimate_tokens(text: str) -> int:
+    return MESSAGE_OVERHEAD_TOKENS + (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def keep_from(token_counts, max_tokens, max_turns=None) -> int:
+    """
+    Index of the first turn to keep: the newest whole exchanges (user + assistant pairs)
+    within max_tokens and max_turns. The latest exchange is always kept.
+    """
+    start = len(token_counts)
+    used = 0
+    while start >= 2:
+        cost = token_counts[start - 2] + token_counts[start - 1]
+        kept = len(token_counts) - start
+        if kept and (used + cost > max_tokens or (max_turns is not None and kept >= max_turns * 2)):
+            break
+        used += cost
+        start -= 2
+    return start
+
+
+def clip(text: str, max_tokens: int) -> str:
+    """Keep the start and end of an oversized turn so one essay can't blow the budget."""
+    keep = max(0, max_tokens - MESSAGE_OVERHEAD_TOKENS - 2) * CHARS_PER_TOKEN
+    if len(text) <= keep:
+        return text
+    return text[:keep // 2] + " [...] " + text[len(text) - keep // 2:]
+
+
+class Turn:
+    __slots__ = ("role", "content", "tokens")
+
+    def __init__(self, role, content, tokens=None):
+        self.role = role
+        self.content = content
+        self.tokens = estimate_tokens(content) if tokens is None else tokens
+
+    def as_message(self) -> dict:
+        return {"role": self.role, "content": self.content}
+
+
+def summarize_with_claude(summary, turns, max_tokens=300) -> str:
+    """Fold turns (Turn objects) into summary with one deterministic, cacheable Claude call."""
+    from common.bedrock import invoke_claude
+
+    prompt = SUMMARY_PROMPT.format(
+        words=max_tokens * 3 // 4,
+        summary=summary or "(empty)",
+        turns="\n".join(f"{t.role}: {t.content}" for t in turns)
+    )
+    result = invoke_claude(prompt, max_tokens=max_tokens, temperature=0.0, priority="background")
+    if result.startswith("[ERROR]"):
+        raise RuntimeError(result)
+    return result.strip()
+
+
+class BudgetedHistory:
+    """
+    Recent turns within max_tokens (and optionally max_turns exchanges), plus a summary
+    of everything older. summarize(summary, turns) -> new summary; None just drops
+    old turns like a sliding window.
+    """
+
+    def __init__(self, max_tokens=1500, max_turns=None, summarize=summarize_with_claude,
+                 background=True):
+        self.max_tokens = max_tokens
+        self.max_turns = max_turns
+        self.summarize = summarize
+        self.background = background
+        self.turns = []
+        self.tokens = 0
+        self.summary = ""
+        self.compactions = 0
+        self._pending = []
+        self._compaction = None
+        self._lock = threading.Lock()
+
+    def add_exchange(self, user_input, assistant_response):
+        with self._lock:
+            for turn in (Turn("user", user_input), Turn("assistant", assistant_response)):
+                if turn.tokens > self.max_tokens // 2:
+                    turn = Turn(turn.role, clip(turn.content, self.max_tokens // 2))
+                self.turns.append(turn)
+                self.tokens += turn.tokens
+            evicted = self._enforce()
+        if evicted and self.summarize is not None:
+            self._schedule(evicted)
+
+    def _enforce(self):
+        """Move the oldest exchanges out until within budget; returns them."""
+        start = keep_from([t.tokens for t in self.turns], self.max_tokens, self.max_turns)
+        evicted = self.turns[:start]
+        del self.turns[:start]
+        self.tokens -= sum(t.tokens for t in evicted)
+        return evicted
+
+    def _schedule(self, evicted):
+        with self._lock:
+            self._pending.extend(evicted)
+            if self._compaction is not None and not self._compaction.done():
+                return  # the running job picks these up too
+            if self.background:
+                self._compaction = _executor.submit(self._compact)
+                return
+        self._compact()
+
+    def _compact(self):
+        while True:
+            with self._lock:
+                batch, self._pending = self._pending, []
+                summary = self.summary
+                if not batch:
+                    self._compaction = None  # later evictions start a new job
+                    return
+            try:
+                summary = self.summarize(summary, batch)
+            except Exception as e:
+                # Keep the old summary; the evicted turns are lost rather than blocking chat
+                print(f"[ERROR] Memory compaction failed: {e}")
+                continue
+            with self._lock:
+                self.summary = summary
+                self.compactions += 1
+
+    def wait(self):
+        """Block until background compaction has caught up (for tests and benchmarks)."""
+        while True:
+            with self._lock:
+                compaction = self._compaction
+                pending = bool(self._pending)
+            if compaction is not None:
+                compaction.result()
+            elif pending:
+                self._schedule([])
+            else:
+                return
+
+    def prompt_tokens(self) -> int:
+        """Approximate tokens this history adds to a prompt."""
+        with self._lock:
+            return self.tokens + (estimate_tokens(self.summary) if self.summary else 0)
+
+    def snapshot(self):
+        """(summary, turns) as of now, safe to read while other threads add turns."""
+        with self._lock:
+            return self.summary, list(self.turns)
+
+    def clear(self):
+        with self._lock:
+            self.turns = []
+            self.tokens = 0
+            self.summary = ""
+            self._pending = []
@@ -0,0 +1,195 @@
+"""
+Client-side admission control for Bedrock quotas.
+
+Every call that reaches the model first takes a permit from the process-wide
+RateLimiter, which enforces:
+
+- requests per minute and tokens per minute (token buckets refilled continuously;
+  a call reserves its input estimate plus max_tokens, the way Bedrock counts it
+  against the quota, and the difference is settled from the response usage)
+- a concurrency limit tuned AIMD-style: it grows by one per window of successful
+  calls and halves when Bedrock throttles (a ThrottlingException, or a response
+  that only came back after botocore retried it), or when latency passes a target
+- a priority queue: waiting callers are admitted in (priority, arrival) order, so
+  interactive chat goes ahead of background summaries and batch pipeline work
+
+The limiter is per process; give each process its share of the account quota.
+"""
+
+import heapq
+import itertools
+import os
+import threading
+import time
+
+PRIORITIES = {"interactive": 0, "background": 1, "batch": 2}
+
+
+class QueueTimeout(Exception):
+    """The call waited longer than the limiter's queue timeout for a permit."""
+
+
+class TokenBucket:
+    """
+    `per_minute` units per minute, holding at most `burst_seconds` worth. Takes may
+    overdraw it; later takes wait until it is positive again, so a request larger
+    than the bucket still gets through instead of waiting forever.
+    """
+
+    def __init__(self, per_minute, burst_seconds=10.0, clock=time.monotonic):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.clock = clock
+        self.tokens = self.capacity
+        self._updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self) -> float:
+        """Seconds until a take is allowed (0 when it is now)."""
+        self._refill()
+        return 0.0 if self.tokens > 0 else (1e-3 - self.tokens) / self.rate
+
+    def take(self, amount):
+        self._refill()
+        self.tokens -= amount
+
+    def settle(self, amount):
+        """Give back (positive) or charge (negative) the difference from the estimate."""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class Permit:
+    __slots__ = ("limiter", "tokens", "started", "_released")
+
+    def __init__(self, limiter, tokens):
+        self.limiter = limiter
+        self.tokens = tokens
+        self.started = limiter.clock()
+        self._released = False
+
+    def release(self, used_tokens=None, throttled=False):
+        """used_tokens: actual tokens from the response usage, to settle the TPM estimate."""
+        if not self._released:
+            self._released = True
+            self.limiter._release(self, used_tokens, throttled)
+
+
+class RateLimiter:
+    """
+    Admission control shared by every Bedrock call in the process.
+
+    rpm / tpm of 0 turn that bucket off. latency_target (seconds, optional) counts
+    calls slower than it as congestion. queue_timeout bounds the wait for a permit.
+    """
+
+    def __init__(self, rpm=0, tpm=0, concurrency=16, min_concurrency=1, max_concurrency=64,
+                 latency_target=None, queue_timeout=30.0, burst_seconds=10.0, clock=time.monotonic):
+        self.clock = clock
+        self.requests = TokenBucket(rpm, burst_seconds, clock) if rpm else None
+        self.tokens = TokenBucket(tpm, burst_seconds, clock) if tpm else None
+        self.limit = float(concurrency)
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.latency_target = latency_target
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self._waiters = []  # heap of (priority, seq)
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._last_decrease = float("-inf")
+        self.counters = {"admitted": 0, "queued": 0, "timeouts": 0, "throttled": 0, "decreases": 0,
+                         "wait_seconds": 0.0}
+
+    def acquire(self, tokens=0, priority="interactive") -> Permit:
+        """Block until this call may go out; returns the Permit to release when it finishes."""
+        entry = (PRIORITIES.get(priority, PRIORITIES["interactive"]), next(self._seq))
+        start = self.clock()
+        with self._cond:
+            heapq.heappush(self._waiters, entry)
+            queued = False
+            try:
+                while True:
+                    delay = self._admission_delay(entry)
+                    if delay == 0:
+                        break
+                    queued = True
+                    remaining = None if self.queue_timeout is None else self.queue_timeout - (self.clock() - start)
+                    if remaining is not None and remaining <= 0:
+                        self.counters["timeouts"] += 1
+                        raise QueueTimeout(f"No Bedrock capacity within {self.queue_timeout}s "
+                                           f"({self.in_flight} calls in flight, limit {int(self.limit)})")
+                    self._cond.wait(min((d for d in (delay, remaining) if d is not None), default=None))
+            finally:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+                self._cond.notify_all()  # the next in line may be admissible now
+            if self.requests is not None:
+                self.requests.take(1)
+            if self.tokens is not None:
+                self.tokens.take(tokens)
+            self.in_flight += 1
+            self.counters["admitted"] += 1
+            self.counters["queued"] += queued
+            self.counters["wait_seconds"] += self.clock() - start
+        return Permit(self, tokens)
+
+    def _admission_delay(self, entry):
+        """0 if `entry` may go now; otherwise how long to wait (None: until notified)."""
+        if self._waiters[0] != entry or self.in_flight >= int(self.limit):
+            return None
+        return max([bucket.wait_time() for bucket in (self.requests, self.tokens) if bucket is not None], default=0.0)
+
+    def _release(self, permit, used_tokens, throttled):
+        latency = self.clock() - permit.started
+        with self._cond:
+            saturated = self.in_flight >= int(self.limit)
+            self.in_flight -= 1
+            if self.tokens is not None and used_tokens is not None:
+                self.tokens.settle(permit.tokens - used_tokens)
+            slow = self.latency_target is not None and latency > self.latency_target
+            if throttled:
+                self.counters["throttled"] += 1
+            if throttled or slow:
+                # One decrease per round trip, so a burst of throttles from the same window halves once
+                now = self.clock()
+                if now - self._last_decrease >= latency:
+                    self.limit = max(self.min_concurrency, self.limit / 2 if throttled else self.limit * 0.9)
+                    self._last_decrease = now
+                    self.counters["decreases"] += 1
+            elif saturated:
+                self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+            self._cond.notify_all()
+
+    def stats(self) -> dict:
+        with self._cond:
+            waiting = {}
+            for priority, _ in self._waiters:
+                name = next(k for k, v in PRIORITIES.items() if v == priority)
+                waiting[name] = waiting.get(name, 0) + 1
+            stats = dict(self.counters, concurrency_limit=round(self.limit, 2), in_flight=self.in_flight,
+                         waiting=waiting)
+        admitted = stats["admitted"]
+        stats["avg_wait_ms"] = stats.pop("wait_seconds") / admitted * 1000 if admitted else 0.0
+        return stats
+
+
+def from_env(concurrency=16, max_concurrency=64):
+    """
+    RateLimiter configured by BEDROCK_RPM, BEDROCK_TPM (both off when unset),
+    BEDROCK_MIN_CONCURRENCY, BEDROCK_LATENCY_TARGET and BEDROCK_QUEUE_TIMEOUT.
+    """
+    latency_target = os.getenv("BEDROCK_LATENCY_TARGET")
+    return RateLimiter(
+        rpm=float(os.getenv("BEDROCK_RPM", "0")),
+        tpm=float(os.getenv("BEDROCK_TPM", "0")),
+        concurrency=concurrency,
+        min_concurrency=int(os.getenv("BEDROCK_MIN_CONCURRENCY", "1")),
+        max_concurrency=max_concurrency,
+        latency_target=float(latency_target) if latency_target else None,
+        queue_timeout=float(os.getenv("BEDROCK_QUEUE_TIMEOUT", "30"))
+    )
@@ -0,0 +1,304 @@
+"""
+Retries that back off instead of piling on.
+
+- backoff(): exponential delay with full jitter, so workers that failed together
+  don't all come back at the same instant
+- is_retryable(): throttling, 5xx and connection errors are worth another try;
+  validation, auth and missing-resource errors are not. Works on botocore errors
+  and on the "[ERROR] Claude invocation failed: ..." strings invoke_claude returns
+- RetryBudget: a token bucket shared by every caller. Successes refill it, retries
+  spend it, so during an outage retries stay a small fraction of the traffic
+- CircuitBreaker: after repeated retryable failures, calls fail fast with
+  CircuitOpenError until a trial call succeeds again
+- Retry: the policy combining them, for functions (call) and coroutines (acall),
+  with counters in stats()
+
+    policy = Retry(max_attempts=3, base_delay=0.5)
+    text = policy.call(invoke, messages)
+"""
+
+import asyncio
+import random
+import re
+import threading
+import time
+
+RETRYABLE_CODES = {
+    "ThrottlingException", "TooManyRequestsException", "ServiceUnavailableException",
+    "InternalServerException", "InternalFailure", "ServiceUnavailable", "ModelNotReadyException",
+    "ModelTimeoutException", "RequestTimeout", "RequestTimeoutException", "SlowDown"
+}
+FATAL_CODES = {
+    "ValidationException", "AccessDeniedException", "ResourceNotFoundException",
+    "UnrecognizedClientException", "ExpiredTokenException", "ModelErrorException",
+    "ServiceQuotaExceededException", "ConflictException"
+}
+# Programming errors never get better on a second try
+FATAL_TYPES = (ValueError, TypeError, KeyError, AttributeError, NotImplementedError)
+
+# "An error occurred (ThrottlingException) when calling the InvokeModel operation: ..."
+_CODE_RE = re.compile(r"An error occurred \((\w+)\)")
+_TRANSIENT_RE = re.compile(r"timed? ?out|connection (?:was )?(?:reset|closed|refused)|could not connect", re.I)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling while the upstream is considered down."""
+
+
+def error_code(exc):
+    """The AWS error code of a botocore ClientError, or one named in an error string."""
+    response = getattr(exc, "response", None)
+    if isinstance(response, dict):
+        code = response.get("Error", {}).get("Code")
+        if code:
+            return code
+    match = _CODE_RE.search(str(exc))
+    return match.group(1) if match else None
+
+
+def is_retryable(exc) -> bool:
+    if isinstance(exc, CircuitOpenError):
+        return False
+    code = error_code(exc)
+    if code in RETRYABLE_CODES:
+        return True
+    if code in FATAL_CODES:
+        return False
+    response = getattr(exc, "response", None)
+    if isinstance(response, dict):
+        status = response.get("ResponseMetadata", {}).get("HTTPStatusCode", 0)
+        return status == 429 or status >= 500
+    if isinstance(exc, FATAL_TYPES):
+        return False
+    try:
+        from botocore.exceptions import ConnectionError as BotoConnectionError, HTTPClientError
+        if isinstance(exc, (BotoConnectionError, HTTPClientError)):
+            return True
+    except ImportError:
+        pass
+    if isinstance(exc, (ConnectionError, TimeoutError)) or _TRANSIENT_RE.search(str(exc)):
+        return True
+    # Unknown failures (e.g. a plain "[ERROR] ..." string) get the benefit of the doubt
+    return code is None
+
+
+def backoff(attempt, base=0.5, cap=20.0, rng=random):
+    """Delay before retry number `attempt` (1-based): uniform in [0, min(cap, base * 2**(attempt-1))]."""
+    return rng.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+
+class RetryBudget:
+    """
+    Token bucket for retries: each success adds `ratio` tokens, each retry spends one,
+    and `min_per_second` trickles in so a quiet process can still retry. Holds at
+    most `capacity` tokens.
+    """
+
+    def __init__(self, ratio=0.2, min_per_second=1.0, capacity=20.0):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.min_per_second)
+        self._updated = now
+
+    def record_success(self):
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self.capacity, self._tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+    @property
+    def tokens(self) -> float:
+        with self._lock:
+            self._refill(time.monotonic())
+            return self._tokens
+
+
+class CircuitBreaker:
+    """
+    closed -> open after `failure_threshold` consecutive upstream failures; open ->
+    half-open after `reset_timeout` seconds, letting one trial call through; the
+    trial's outcome closes it again or re-opens it.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and self.clock() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def before_call(self):
+        """Raise CircuitOpenError unless this call may go through."""
+        with self._lock:
+            if self._state == self.OPEN:
+                if self.clock() - self._opened_at < self.reset_timeout:
+                    self.rejected += 1
+                    raise CircuitOpenError(f"Circuit open; upstream failing, retry after {self.reset_timeout}s")
+                self._state = self.HALF_OPEN
+            if self._state == self.HALF_OPEN:
+                if self._trial_running:
+                    self.rejected += 1
+                    raise CircuitOpenError("Circuit half-open; a trial call is already running")
+                self._trial_running = True
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self.opened += 1
+                self._state = self.OPEN
+                self._opened_at = self.clock()
+            self._trial_running = False
+
+    def record_ignored(self):
+        """The call failed for a reason that says nothing about the upstream (e.g. a bad request)."""
+        with self._lock:
+            self._trial_running = False
+
+
+class Retry:
+    """
+    Retry policy: up to max_attempts tries with jittered exponential backoff, only for
+    retryable errors, while the shared budget has tokens and the breaker is closed.
+    on_retry(attempt, error, delay) is called before each sleep and on_give_up(attempt,
+    error, reason) before the error is re-raised, reason being "fatal", "gave_up" or
+    "budget_exhausted" (e.g. for logging).
+    """
+
+    def __init__(self, max_attempts=3, base_delay=0.5, max_delay=20.0, budget=None, breaker=None,
+                 classify=is_retryable, on_retry=None, on_give_up=None, sleep=None, asleep=None):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget
+        self.breaker = breaker
+        self.classify = classify
+        self.on_retry = on_retry
+        self.on_give_up = on_give_up
+        self.sleep = sleep
+        self.asleep = asleep
+        self._lock = threading.Lock()
+        self.counters = {"calls": 0, "successes": 0, "retries": 0, "fatal": 0, "gave_up": 0,
+                         "budget_exhausted": 0, "circuit_rejected": 0}
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def _before(self):
+        if self.breaker is not None:
+            try:
+                self.breaker.before_call()
+            except CircuitOpenError:
+                self._count("circuit_rejected")
+                raise
+
+    def _after_success(self):
+        self._count("successes")
+        if self.budget is not None:
+            self.budget.record_success()
+        if self.breaker is not None:
+            self.breaker.record_success()
+
+    def _give_up(self, attempt, error, reason):
+        self._count(reason)
+        if self.on_give_up is not None:
+            self.on_give_up(attempt, error, reason)
+
+    def _after_failure(self, attempt, error):
+        """Delay before the next attempt, or None to re-raise `error`."""
+        retryable = self.classify(error)
+        if self.breaker is not None:
+            if retryable:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_ignored()
+        if not retryable:
+            return self._give_up(attempt, error, "fatal")
+        if attempt >= self.max_attempts:
+            return self._give_up(attempt, error, "gave_up")
+        if self.budget is not None and not self.budget.try_spend():
+            return self._give_up(attempt, error, "budget_exhausted")
+        self._count("retries")
+        delay = backoff(attempt, self.base_delay, self.max_delay)
+        if self.on_retry is not None:
+            self.on_retry(attempt, error, delay)
+        return delay
+
+    def call(self, fn, *args, **kwargs):
+        self._count("calls")
+        attempt = 0
+        while True:
+            attempt += 1
+            self._before()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                delay = self._after_failure(attempt, e)
+                if delay is None:
+                    raise
+                (self.sleep or time.sleep)(delay)
+                continue
+            self._after_success()
+            return result
+
+    async def acall(self, fn, *args, **kwargs):
+        """Like call, for a coroutine function; waits with asyncio.sleep."""
+        self._count("calls")
+        attempt = 0
+        while True:
+            attempt += 1
+            self._before()
+            try:
+                result = await fn(*args, **kwargs)
+            except Exception as e:
+                delay = self._after_failure(attempt, e)
+                if delay is None:
+                    raise
+                await (self.asleep or asyncio.sleep)(delay)
+                continue
+            self._after_success()
+            return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.counters)
+        if self.budget is not None:
+            stats["budget_tokens"] = round(self.budget.tokens, 2)
+        if self.breaker is not None:
+            stats.update(circuit_state=self.breaker.state, circuit_opened=self.breaker.opened)
+        return stats
@@ -0,0 +1,84 @@
+"""
+Single-flight request coalescing.
+
+Concurrent callers asking for the same key share one in-flight execution and its
+result (or exception) instead of each starting their own upstream call. Nothing is
+remembered once the call finishes; that is the response cache's job.
+"""
+
+import asyncio
+import threading
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesces identical concurrent calls, from threads (do) or coroutines (ado)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}    # key -> _Call, for threads
+        self._futures = {}  # (loop id, key) -> asyncio.Future, for coroutines
+        self.executions = 0
+        self.collapsed = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        """Run fn(*args, **kwargs) unless an identical call is running; then wait for its outcome."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executions += 1
+            else:
+                self.collapsed += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+    async def ado(self, key, factory):
+        """Async twin of do(): factory() returns the awaitable to share."""
+        slot = (id(asyncio.get_running_loop()), key)
+        future = self._futures.get(slot)
+        if future is None:
+            future = asyncio.ensure_future(factory())
+            self._futures[slot] = future
+            future.add_done_callback(lambda _: self._futures.pop(slot, None))
+            with self._lock:
+                self.executions += 1
+        else:
+            with self._lock:
+                self.collapsed += 1
+        # shield: a caller that disconnects must not cancel the call others are waiting on
+        return await asyncio.shield(future)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.executions + self.collapsed
+            return {
+                "executions": self.executions,
+                "collapsed": self.collapsed,
+                "collapse_rate": self.collapsed / total if total else 0.0,
+                "in_flight": len(self._calls) + len(self._futures)
+            }
@@ -0,0 +1,50 @@
+"""
+Server-Sent Events helpers for streaming Claude replies over HTTP (Flask and FastAPI).
+
+Wire format, one JSON object per event:
+    data: {"delta": "partial text"}
+    ...
+    data: {"done": true, ...final fields}
+"""
+
+import inspect
+import json
+
+SSE_MEDIA_TYPE = "text/event-stream"
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def sse_event(payload: dict) -> str:
+    return f"data: {json.dumps(payload)}\n\n"
+
+
+def sse_stream(chunks, on_complete=None):
+    """
+    Turn an iterator of text chunks into SSE events.
+
+    on_complete(full_text) runs once the stream is exhausted and may return a dict
+    of extra fields for the final "done" event.
+    """
+    parts = []
+    for chunk in chunks:
+        parts.append(chunk)
+        yield sse_event({"delta": chunk})
+    extra = on_complete("".join(parts)) if on_complete else None
+    yield sse_event({"done": True, **(extra or {})})
+
+
+async def asse_stream(chunks, on_complete=None):
+    """sse_stream for an async iterator of chunks; on_complete may be a coroutine function."""
+    parts = []
+    async for chunk in chunks:
+        parts.append(chunk)
+        yield sse_event({"delta": chunk})
+    extra = on_complete("".join(parts)) if on_complete else None
+    if inspect.isawaitable(extra):
+        extra = await extra
+    yield sse_event({"done": True, **(extra or {})})
+
+
+def wants_stream(data: dict, accept_header: str = "") -> bool:
+    """Clients opt in with {"stream": true} in the JSON body or an Accept: text/event-stream header."""
+    return bool((data or {}).get("stream")) or SSE_MEDIA_TYPE in (accept_header or "")
@@ -0,0 +1,313 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+import asyncio
+import contextvars
+import io
+import json
+import time
+
+import pytest
+from common import bedrock
+from common.cache import MemoryCache
+from common.ratelimit import RateLimiter
+from common.singleflight import SingleFlight
+from common.usage import UsageStats
+
+
+def _event(data):
+    return {"chunk": {"bytes": json.dumps(data).encode()}}
+
+
+class FakeEventStream:
+    def __init__(self, texts, usage=None):
+        usage = usage or {"input_tokens": 10, "output_tokens": 1}
+        self.events = [_event({"type": "message_start", "message": {"usage": usage}})] + [
+            _event({"type": "content_block_delta", "delta": {"text": t}}) for t in texts
+        ] + [_event({"type": "message_delta", "usage": {"output_tokens": len(texts)}})]
+        self.closed = False
+
+    def __iter__(self):
+        return iter(self.events)
+
+    def close(self):
+        self.closed = True
+
+
+class FakeRuntime:
+    def __init__(self, reply="Hello there! ", error=None):
+        self.reply = reply
+        self.error = error
+        self.calls = []
+        self.streams = []
+        self.latency = 0
+        self.usage = {"input_tokens": 10, "output_tokens": 3}
+
+    def invoke_model(self, **kwargs):
+        self.calls.append(kwargs)
+        time.sleep(self.latency)
+        if self.error:
+            raise self.error
+        body = {"content": [{"type": "text", "text": self.reply}], "usage": self.usage}
+        return {"body": io.BytesIO(json.dumps(body).encode())}
+
+    def invoke_model_with_response_stream(self, **kwargs):
+        self.calls.append(kwargs)
+        if self.error:
+            raise self.error
+        self.streams.append(FakeEventStream(["Hel", "lo", " there!"], self.usage))
+        return {"body": self.streams[-1]}
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    client = FakeRuntime()
+    monkeypatch.setattr(bedrock, "get_client", lambda *a, **k: client)
+    monkeypatch.setattr(bedrock, "response_cache", MemoryCache())
+    monkeypatch.setattr(bedrock, "inflight", SingleFlight())
+    monkeypatch.setattr(bedrock, "usage", UsageStats())
+    monkeypatch.setattr(bedrock, "limiter", RateLimiter(concurrency=8))
+    return client
+
+
+def test_get_client_is_shared_per_region_and_credentials(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "test")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "test")
+    bedrock.reset_clients()
+    east = bedrock.get_client(region_name="us-east-2")
+    assert bedrock.get_client(region_name="us-east-2") is east
+    assert bedrock.get_client(region_name="us-west-2") is not east
+    assert east.meta.config.max_pool_connections == bedrock.MAX_POOL_CONNECTIONS
+    assert east.meta.config.retries == {"total_max_attempts": bedrock.MAX_ATTEMPTS, "mode": "adaptive"}
+
+
+def test_single_attempt_calls_use_a_client_without_sdk_retries(fake, monkeypatch):
+    attempts = []
+    monkeypatch.setattr(bedrock, "get_client", lambda *a, max_attempts=None, **k: attempts.append(max_attempts) or fake)
+    bedrock.invoke_claude("Hello", use_cache=False)
+    with bedrock.single_attempt():
+        bedrock.invoke_claude("Hello", use_cache=False)
+        asyncio.run(bedrock.ainvoke_claude("Hello", use_cache=False))
+    bedrock.invoke_claude("Hello", use_cache=False)
+    assert attempts == [None, 1, 1, None]
+
+
+def test_invoke_claude_accepts_prompt_string(fake):
+    assert bedrock.invoke_claude("hi") == "Hello there!"
+    body = json.loads(fake.calls[0]["body"])
+    assert body["messages"] == [{"role": "user", "content": "hi"}]
+    assert body["max_tokens"] == bedrock.DEFAULT_MAX_TOKENS
+    assert fake.calls[0]["modelId"] == bedrock.DEFAULT_MODEL_ID
+
+
+def test_invoke_claude_per_call_overrides(fake):
+    messages = [{"role": "user", "content": "hi"}]
+    bedrock.invoke_claude(messages, model_id="my-model", max_tokens=50, temperature=0.0,
+                          system="Be brief.", guardrail_id="gr-1")
+    call = fake.calls[0]
+    body = json.loads(call["body"])
+    assert call["modelId"] == "my-model"
+    assert call["guardrailIdentifier"] == "gr-1"
+    assert call["guardrailVersion"] == "DRAFT"
+    assert body["max_tokens"] == 50
+    assert body["temperature"] == 0.0
+    assert body["system"] == "Be brief."
+
+
+def test_invoke_claude_returns_error_string(fake):
+    fake.error = RuntimeError("boom")
+    assert bedrock.invoke_claude("hi") == "[ERROR] Claude invocation failed: boom"
+
+
+def test_stream_claude_yields_text_deltas(fake):
+    assert list(bedrock.stream_claude("hi")) == ["Hel", "lo", " there!"]
+    assert fake.streams[0].closed
+
+
+def test_stream_claude_closes_stream_when_abandoned(fake):
+    chunks = bedrock.stream_claude("hi")
+    assert next(chunks) == "Hel"
+    chunks.close()
+    assert fake.streams[0].closed
+
+
+def test_stream_claude_reports_errors_as_last_chunk(fake):
+    fake.error = RuntimeError("boom")
+    assert list(bedrock.stream_claude("hi")) == ["[ERROR] Claude invocation failed: boom"]
+
+
+def test_stream_claude_on_error_keeps_failures_out_of_the_text(fake):
+    fake.error = RuntimeError("boom")
+    errors = []
+    assert list(bedrock.stream_claude("hi", on_error=errors.append)) == []
+    assert errors == ["[ERROR] Claude invocation failed: boom"]
+
+
+def test_astream_claude_yields_text_deltas(fake):
+    async def collect():
+        return [chunk async for chunk in bedrock.astream_claude("hi")]
+
+    assert asyncio.run(collect()) == ["Hel", "lo", " there!"]
+    assert fake.streams[0].closed
+
+
+def test_astream_claude_reports_errors_like_stream_claude(fake):
+    fake.error = RuntimeError("boom")
+    errors = []
+
+    async def collect():
+        return [chunk async for chunk in bedrock.astream_claude("hi", on_error=errors.append)]
+
+    assert asyncio.run(collect()) == []
+    assert errors == ["[ERROR] Claude invocation failed: boom"]
+
+
+def test_identical_requests_are_served_from_cache(fake):
+    assert bedrock.invoke_claude("Tell me a joke") == "Hello there!"
+    assert bedrock.invoke_claude("Tell me a joke") == "Hello there!"
+    assert len(fake.calls) == 1
+    assert bedrock.cache_stats()["hits"] == 1
+
+
+def test_cache_opt_out_and_parameter_changes_call_the_model(fake):
+    bedrock.invoke_claude("Tell me a joke")
+    bedrock.invoke_claude("Tell me a joke", use_cache=False)
+    bedrock.invoke_claude("Tell me a joke", temperature=1.0)
+    assert len(fake.calls) == 3
+
+
+def test_errors_are_not_cached(fake):
+    fake.error = RuntimeError("boom")
+    bedrock.invoke_claude("hi")
+    fake.error = None
+    assert bedrock.invoke_claude("hi") == "Hello there!"
+
+
+def test_streamed_reply_is_cached(fake):
+    assert "".join(bedrock.stream_claude("hi")) == "Hello there!"
+    assert list(bedrock.stream_claude("hi")) == ["Hello there!"]
+    assert bedrock.invoke_claude("hi") == "Hello there!"
+    assert len(fake.calls) == 1
+
+
+def test_concurrent_identical_async_calls_share_one_invocation(fake):
+    fake.latency = 0.1
+
+    async def burst():
+        return await asyncio.gather(*[bedrock.ainvoke_claude("Tell me a joke") for _ in range(8)])
+
+    assert asyncio.run(burst()) == ["Hello there!"] * 8
+    assert len(fake.calls) == 1
+    assert bedrock.coalesce_stats()["collapsed"] == 7
+
+
+def test_coalescing_follows_cache_opt_out(fake):
+    fake.latency = 0.05
+
+    async def burst():
+        return await asyncio.gather(*[bedrock.ainvoke_claude("Tell me a joke", use_cache=False) for _ in range(3)])
+
+    asyncio.run(burst())
+    assert len(fake.calls) == 3
+
+
+def test_explicit_coalesce_none_follows_use_cache(fake):
+    fake.latency = 0.05
+
+    async def burst():
+        return await asyncio.gather(*[bedrock.ainvoke_claude("Tell me a joke", coalesce=None) for _ in range(3)])
+
+    asyncio.run(burst())
+    assert len(fake.calls) == 1
+
+
+def test_cached_system_marks_the_last_block_as_a_cache_breakpoint(fake):
+    system = bedrock.cached_system("You are a helpful assistant.", "Answer briefly.")
+    bedrock.invoke_claude("hi", system=system)
+    sent = json.loads(fake.calls[0]["body"])["system"]
+    assert [b["text"] for b in sent] == ["You are a helpful assistant.", "Answer briefly."]
+    assert "cache_control" not in sent[0]
+    assert sent[1]["cache_control"] == {"type": "ephemeral"}
+
+
+def test_usage_counts_prompt_cache_reads_and_writes(fake):
+    fake.usage = {"input_tokens": 20, "cache_creation_input_tokens": 1000, "output_tokens": 5}
+    bedrock.invoke_claude("first", use_cache=False)
+    fake.usage = {"input_tokens": 20, "cache_read_input_tokens": 1000, "output_tokens": 5}
+    bedrock.invoke_claude("second", use_cache=False)
+    stats = bedrock.usage_stats()
+    assert stats["calls"] == 2
+    assert stats["cache_write_input_tokens"] == 1000
+    assert stats["cache_read_input_tokens"] == 1000
+    assert stats["input_tokens_saved"] == 900 - 250
+    assert stats["prompt_cache_hit_rate"] == 1000 / 2040
+
+
+def test_stream_usage_splits_time_to_first_token_by_cache_hit(fake):
+    list(bedrock.stream_claude("miss", use_cache=False))
+    fake.usage = {"input_tokens": 10, "cache_read_input_tokens": 500}
+    list(bedrock.stream_claude("hit", use_cache=False))
+    stats = bedrock.usage_stats()
+    assert stats["output_tokens"] == 6  # from message_delta, not message_start
+    assert stats["ttft_ms_cache_hit"] is not None and stats["ttft_ms_cache_miss"] is not None
+    assert stats["ttft_ms_saved"] is not None
+
+
+def test_cached_replies_do_not_count_as_model_usage(fake):
+    bedrock.invoke_claude("hi")
+    bedrock.invoke_claude("hi")
+    assert bedrock.usage_stats()["calls"] == 1
+
+
+def test_priority_is_a_limiter_setting_not_a_request_field(fake):
+    bedrock.invoke_claude("hi", priority="batch")
+    list(bedrock.stream_claude("hello", priority="background"))
+    assert all("priority" not in json.loads(call["body"]) for call in fake.calls)
+    assert bedrock.limiter_stats()["admitted"] == 2
+
+
+def test_throttling_lowers_the_concurrency_limit(fake):
+    from botocore.exceptions import ClientError
+    fake.error = ClientError({"Error": {"Code": "ThrottlingException", "Message": "slow down"}}, "InvokeModel")
+    assert bedrock.invoke_claude("hi").startswith("[ERROR]")
+    assert bedrock.limiter_stats()["concurrency_limit"] == 4
+    assert bedrock.limiter_stats()["in_flight"] == 0
+
+
+def test_last_call_reports_model_tokens_and_ttfb(fake):
+    fake.usage = {"input_tokens": 10, "output_tokens": 3, "cache_read_input_tokens": 90}
+    bedrock.invoke_claude("hi", model_id="m-1")
+    call = bedrock.last_call.get()
+    assert call["model_id"] == "m-1"
+    assert (call["input_tokens"], call["output_tokens"]) == (100, 3)
+    assert call["ttfb"] is not None and not call["cached"]
+
+    bedrock.invoke_claude("hi", model_id="m-1")
+    assert bedrock.last_call.get()["cached"]
+    assert bedrock.last_call.get()["ttfb"] is None
+
+    "".join(bedrock.stream_claude("streamed", use_cache=False))
+    call = bedrock.last_call.get()
+    assert call["output_tokens"] == 3 and call["ttfb"] is not None
+
+
+def test_async_calls_run_in_the_callers_context_and_report_last_call(fake, monkeypatch):
+    request_id = contextvars.ContextVar("request_id", default=None)
+    seen = []
+    invoke_model = fake.invoke_model
+    monkeypatch.setattr(fake, "invoke_model", lambda **kwargs: seen.append(request_id.get()) or invoke_model(**kwargs))
+    fake.latency = 0.05
+
+    async def request(name):
+        request_id.set(name)
+        await bedrock.ainvoke_claude("Tell me a joke")
+        return bedrock.last_call.get()
+
+    async def burst():
+        return await asyncio.gather(request("req-1"), request("req-2"))
+
+    calls = asyncio.run(burst())
+    assert seen == ["req-1"] and bedrock.coalesce_stats()["collapsed"] == 1
+    assert calls[0]["output_tokens"] == 3 and calls[0]["ttfb"] is not None
+    assert calls[1]["output_tokens"] == 3 and calls[1]["ttfb"] is None
@@ -0,0 +1,51 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+import time
+
+import pytest
+
+from common.cache import DiskCache, MemoryCache, cache_key, from_env
+
+
+def test_cache_key_is_canonical():
+    body_a = {"messages": [{"role": "user", "content": "hi"}], "max_tokens": 10, "temperature": 0.0}
+    body_b = {"temperature": 0.0, "max_tokens": 10, "messages": [{"content": "hi", "role": "user"}]}
+    assert cache_key("m", body_a) == cache_key("m", body_b)
+    assert cache_key("m", body_a) != cache_key("other", body_a)
+    assert cache_key("m", body_a) != cache_key("m", body_a, guardrail_id="gr-1", guardrail_version="1")
+
+
+def test_memory_cache_evicts_least_recently_used():
+    cache = MemoryCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.stats()["evictions"] == 1
+
+
+def test_memory_cache_expires_entries():
+    cache = MemoryCache(ttl=0.01)
+    cache.set("a", 1)
+    time.sleep(0.02)
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_disk_cache_persists_between_instances(tmp_path):
+    DiskCache(directory=str(tmp_path)).set("a", {"content": []})
+    cache = DiskCache(directory=str(tmp_path))
+    assert cache.get("a") == {"content": []}
+    assert cache.stats()["hits"] == 1
+
+
+def test_from_env_rejects_unknown_backends(monkeypatch):
+    monkeypatch.setenv("BEDROCK_CACHE", "off")
+    assert from_env() is None
+    monkeypatch.setenv("BEDROCK_CACHE", "dsk")
+    with pytest.raises(ValueError):
+        from_env()
@@ -0,0 +1,86 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+import asyncio
+import io
+import json
+import logging
+import threading
+
+from common import jsonlog
+
+
+def records(stream):
+    jsonlog.flush()
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def test_records_are_json_lines_with_extra_fields():
+    stream = io.StringIO()
+    log = jsonlog.get_logger("test.fields", stream=stream)
+    log.info("Received prompt", extra={"prompt_chars": 42})
+    [entry] = records(stream)
+    assert entry["level"] == "INFO" and entry["msg"] == "Received prompt"
+    assert entry["prompt_chars"] == 42
+    assert "request_id" not in entry
+
+
+def test_writes_happen_off_the_calling_thread():
+    writers = []
+
+    class Recording(logging.Handler):
+        def emit(self, record):
+            writers.append(threading.current_thread().name)
+
+    log = jsonlog.get_logger("test.thread", stream=io.StringIO())
+    jsonlog._listeners[-1].handlers += (Recording(),)
+    log.info("hello")
+    jsonlog.flush()
+    assert writers and threading.current_thread().name not in writers
+
+
+def test_request_context_tags_records_and_nests():
+    stream = io.StringIO()
+    log = jsonlog.get_logger("test.context", stream=stream)
+    with jsonlog.request_context("req-1"):
+        log.info("outer")
+        with jsonlog.request_context():
+            log.info("inner keeps the id")
+    log.info("outside")
+    assert [e.get("request_id") for e in records(stream)] == ["req-1", "req-1", None]
+
+
+def test_concurrent_tasks_keep_their_own_ids():
+    stream = io.StringIO()
+    log = jsonlog.get_logger("test.tasks", stream=stream)
+
+    async def handle(request_id):
+        with jsonlog.request_context(request_id):
+            await asyncio.sleep(0.01)
+            log.info(request_id)
+
+    async def main():
+        await asyncio.gather(*[handle(f"r{i}") for i in range(5)])
+
+    asyncio.run(main())
+    assert all(e["msg"] == e["request_id"] for e in records(stream))
+
+
+def test_sampling_keeps_errors():
+    stream = io.StringIO()
+    log = jsonlog.get_logger("test.sampling", stream=stream, sample_rate=0.0)
+    for _ in range(10):
+        log.info("noise")
+    log.error("boom")
+    assert [e["msg"] for e in records(stream)] == ["boom"]
+
+
+def test_file_rotation_by_size(tmp_path):
+    path = tmp_path / "app.jsonl"
+    log = jsonlog.get_logger("test.rotation", path=str(path), max_bytes=500, backup_count=2)
+    for i in range(50):
+        log.info(f"line {i}")
+    jsonlog.flush()
+    assert (tmp_path / "app.jsonl.1").exists()
+    assert all(json.loads(line) for line in path.read_text().splitlines())
@@ -0,0 +1,59 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+import threading
+
+from common.memory import BudgetedHistory, Turn, estimate_tokens
+
+
+def test_estimate_tokens_grows_with_length():
+    assert estimate_tokens("") < estimate_tokens("hello") < estimate_tokens("hello " * 100)
+    assert Turn("user", "hello").tokens == estimate_tokens("hello")
+
+
+def test_sliding_window_without_summarizer():
+    history = BudgetedHistory(max_tokens=10_000, max_turns=2, summarize=None)
+    for i in range(5):
+        history.add_exchange(f"q{i}", f"a{i}")
+    summary, turns = history.snapshot()
+    assert summary == ""
+    assert [t.content for t in turns] == ["q3", "a3", "q4", "a4"]
+    assert history.tokens == sum(t.tokens for t in turns)
+
+
+def test_latest_exchange_is_kept_even_over_budget():
+    history = BudgetedHistory(max_tokens=10, summarize=None)
+    history.add_exchange("q", "a" * 1000)
+    assert len(history.snapshot()[1]) == 2
+
+
+def test_compaction_runs_off_the_calling_thread():
+    release = threading.Event()
+    calls = []
+
+    def slow_summary(summary, turns):
+        release.wait(5)
+        calls.append([t.content for t in turns])
+        return (summary + " " if summary else "") + "+".join(t.content for t in turns)
+
+    history = BudgetedHistory(max_tokens=10_000, max_turns=1, summarize=slow_summary)
+    history.add_exchange("q0", "a0")
+    history.add_exchange("q1", "a1")  # evicts q0/a0 without waiting for the summary
+    history.add_exchange("q2", "a2")
+    assert history.summary == ""
+    release.set()
+    history.wait()
+    assert history.summary.replace(" ", "+") == "q0+a0+q1+a1"
+    assert sum(len(batch) for batch in calls) == 4
+
+
+def test_failed_compaction_keeps_old_summary():
+    def failing(summary, turns):
+        raise RuntimeError("throttled")
+
+    history = BudgetedHistory(max_tokens=10_000, max_turns=1, summarize=failing, background=False)
+    history.summary = "before"
+    history.add_exchange("q0", "a0")
+    history.add_exchange("q1", "a1")
+    assert history.summary == "before"
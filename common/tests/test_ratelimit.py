@@ -0,0 +1,84 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+import threading
+import time
+
+import pytest
+from common.ratelimit import QueueTimeout, RateLimiter, TokenBucket
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+def test_interactive_calls_jump_the_queue_ahead_of_batch_work():
+    limiter = RateLimiter(concurrency=1, max_concurrency=1)
+    held = limiter.acquire()
+    order = []
+
+    def call(priority):
+        limiter.acquire(priority=priority).release()
+        order.append(priority)
+
+    batch = [threading.Thread(target=call, args=("batch",)) for _ in range(3)]
+    for t in batch:
+        t.start()
+    wait_for(lambda: limiter.stats()["waiting"].get("batch") == 3)
+    chat = threading.Thread(target=call, args=("interactive",))
+    chat.start()
+    wait_for(lambda: limiter.stats()["waiting"].get("interactive") == 1)
+    held.release()
+    for t in batch + [chat]:
+        t.join(2)
+    assert order[0] == "interactive"
+
+
+def test_requests_per_minute_are_paced():
+    limiter = RateLimiter(rpm=1200, burst_seconds=0.05)  # 20/s, burst of 1
+    start = time.monotonic()
+    for _ in range(5):
+        limiter.acquire().release()
+    assert time.monotonic() - start >= 0.15
+
+
+def test_token_bucket_settles_the_estimate_from_actual_usage():
+    now = [0.0]
+    bucket = TokenBucket(per_minute=6000, burst_seconds=10, clock=lambda: now[0])  # 100/s, holds 1000
+    bucket.take(1500)  # estimate: input + max_tokens
+    assert bucket.wait_time() == pytest.approx(5.01, abs=0.01)
+    bucket.settle(1500 - 300)  # the call actually used 300
+    assert bucket.tokens == 700
+    assert bucket.wait_time() == 0
+
+
+def test_throttling_halves_concurrency_and_successes_grow_it_back():
+    limiter = RateLimiter(concurrency=8, min_concurrency=1, max_concurrency=16)
+    limiter.acquire().release(throttled=True)
+    assert limiter.limit == 4
+    for _ in range(20):
+        permits = [limiter.acquire() for _ in range(int(limiter.limit))]
+        for permit in permits:
+            permit.release()
+    assert 4 < limiter.limit <= 16
+    assert limiter.stats()["throttled"] == 1
+
+
+def test_burst_of_throttles_from_one_window_decreases_once():
+    limiter = RateLimiter(concurrency=8)
+    permits = [limiter.acquire() for _ in range(4)]
+    for permit in permits:
+        permit.release(throttled=True)
+    assert limiter.limit == 4
+
+
+def test_queue_timeout():
+    limiter = RateLimiter(concurrency=1, queue_timeout=0.05)
+    limiter.acquire()
+    with pytest.raises(QueueTimeout):
+        limiter.acquire()
+    assert limiter.stats()["timeouts"] == 1
@@ -0,0 +1,131 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+import asyncio
+
+import pytest
+from botocore.exceptions import ClientError, ReadTimeoutError
+from common.resilience import (CircuitBreaker, CircuitOpenError, Retry, RetryBudget, backoff,
+                               is_retryable)
+
+
+def client_error(code, status=400):
+    return ClientError({"Error": {"Code": code, "Message": "x"},
+                        "ResponseMetadata": {"HTTPStatusCode": status}}, "InvokeModel")
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_classification_of_bedrock_errors():
+    assert is_retryable(client_error("ThrottlingException"))
+    assert is_retryable(client_error("SomethingNew", status=503))
+    assert is_retryable(ReadTimeoutError(endpoint_url="https://bedrock"))
+    assert is_retryable(Exception("[ERROR] Claude invocation failed: An error occurred (ThrottlingException) ..."))
+    assert not is_retryable(client_error("ValidationException"))
+    assert not is_retryable(client_error("SomethingNew", status=400))
+    assert not is_retryable(Exception("[ERROR] Claude invocation failed: An error occurred (AccessDeniedException) ..."))
+    assert not is_retryable(ValueError("bad prompt"))
+
+
+def test_backoff_is_jittered_and_capped():
+    delays = [backoff(attempt, base=1, cap=4) for attempt in (1, 2, 3, 10) for _ in range(50)]
+    assert all(0 <= d <= 4 for d in delays)
+    assert len(set(delays)) > 1
+
+
+def test_retry_stops_at_fatal_errors_and_after_max_attempts():
+    calls = []
+
+    def fatal():
+        calls.append(1)
+        raise client_error("ValidationException")
+
+    policy = Retry(max_attempts=3, base_delay=0, sleep=lambda s: None)
+    with pytest.raises(ClientError):
+        policy.call(fatal)
+    assert len(calls) == 1
+
+    outcomes = iter([client_error("ThrottlingException"), client_error("ThrottlingException"), "ok"])
+
+    def flaky():
+        outcome = next(outcomes)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    assert policy.call(flaky) == "ok"
+    assert policy.stats()["retries"] == 2 and policy.stats()["fatal"] == 1
+
+
+def test_retry_budget_caps_retries_across_callers():
+    budget = RetryBudget(ratio=0.5, min_per_second=0, capacity=2)
+    policy = Retry(max_attempts=10, base_delay=0, budget=budget, sleep=lambda s: None)
+    calls = []
+
+    def throttled():
+        calls.append(1)
+        raise client_error("ThrottlingException")
+
+    for _ in range(3):
+        with pytest.raises(ClientError):
+            policy.call(throttled)
+    assert len(calls) == 3 + 2  # three first tries, then only the two retries the budget allowed
+    assert policy.stats()["budget_exhausted"] == 3
+    budget.record_success()
+    budget.record_success()
+    assert budget.tokens == 1
+
+
+def test_circuit_breaker_fails_fast_then_recovers():
+    clock = Clock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=clock)
+    policy = Retry(max_attempts=1, breaker=breaker)
+
+    def down():
+        raise client_error("ServiceUnavailableException", status=503)
+
+    for _ in range(2):
+        with pytest.raises(ClientError):
+            policy.call(down)
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        policy.call(lambda: "never called")
+
+    clock.now = 11
+    assert breaker.state == "half_open"
+    assert policy.call(lambda: "back") == "back"
+    assert breaker.state == "closed"
+    assert policy.stats()["circuit_rejected"] == 1
+
+
+def test_fatal_errors_do_not_open_the_circuit():
+    breaker = CircuitBreaker(failure_threshold=1)
+    policy = Retry(max_attempts=1, breaker=breaker)
+    with pytest.raises(ClientError):
+        policy.call(lambda: (_ for _ in ()).throw(client_error("ValidationException")))
+    assert breaker.state == "closed"
+
+
+def test_async_retry_uses_asyncio_sleep():
+    slept = []
+    attempts = []
+
+    async def asleep(delay):
+        slept.append(delay)
+
+    async def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise client_error("ThrottlingException")
+        return "ok"
+
+    policy = Retry(max_attempts=3, base_delay=0.01, asleep=asleep)
+    assert asyncio.run(policy.acall(flaky)) == "ok"
+    assert len(slept) == 2
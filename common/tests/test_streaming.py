@@ -0,0 +1,36 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+import asyncio
+import json
+
+from common.streaming import asse_stream, sse_stream, wants_stream
+
+
+def test_sse_stream_emits_deltas_then_done():
+    events = list(sse_stream(iter(["Hi", " there"]), lambda text: {"reply": text}))
+    payloads = [json.loads(e[len("data: "):]) for e in events]
+    assert all(e.endswith("\n\n") for e in events)
+    assert payloads == [{"delta": "Hi"}, {"delta": " there"}, {"done": True, "reply": "Hi there"}]
+
+
+def test_asse_stream_awaits_an_async_on_complete():
+    async def chunks():
+        for chunk in ["Hi", " there"]:
+            yield chunk
+
+    async def on_complete(text):
+        return {"reply": text}
+
+    async def collect():
+        return [event async for event in asse_stream(chunks(), on_complete)]
+
+    payloads = [json.loads(e[len("data: "):]) for e in asyncio.run(collect())]
+    assert payloads == [{"delta": "Hi"}, {"delta": " there"}, {"done": True, "reply": "Hi there"}]
+
+
+def test_wants_stream():
+    assert wants_stream({"stream": True})
+    assert wants_stream({}, "text/event-stream")
+    assert not wants_stream({"message": "hi"}, "application/json")
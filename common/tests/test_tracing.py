@@ -0,0 +1,116 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+import asyncio
+import contextvars
+import json
+import threading
+
+import pytest
+
+from common import jsonlog, tracing
+from common.tracing import span, trace, traced, traced_stream
+
+
+@pytest.fixture
+def spans(monkeypatch):
+    exported = []
+    monkeypatch.setitem(tracing._config, "sample_rate", 1.0)
+    monkeypatch.setitem(tracing._config, "exporter", lambda name, record: exported.append((name, record)))
+    tracing.reset_stats()
+    return exported
+
+
+def test_spans_nest_under_the_request_root(spans):
+    with trace("request", endpoint="generate"):
+        with span("filter"):
+            pass
+        with span("llm") as s:
+            s.set(model="haiku")
+    assert [name for name, _ in spans] == ["filter", "llm", "request"]
+    records = dict(spans)
+    root = records["request"]
+    assert root["parent_id"] is None and root["attributes"] == {"endpoint": "generate"}
+    assert records["llm"]["parent_id"] == root["span_id"] and records["llm"]["attributes"] == {"model": "haiku"}
+    assert {r["trace_id"] for r in records.values()} == {root["trace_id"]}
+    assert tracing.current_span() is None
+
+
+def test_unsampled_requests_export_nothing(spans, monkeypatch):
+    monkeypatch.setitem(tracing._config, "sample_rate", 0.5)
+    monkeypatch.setattr(tracing, "_rng", lambda: 0.9)
+    with trace("request"):
+        with span("filter") as s:
+            s.set(ignored=True)
+        with trace("nested"):
+            pass
+    assert spans == [] and tracing.stage_stats() == {}
+    assert span("outside a request") is tracing.NOOP
+
+
+def test_errors_are_recorded_and_reraised(spans):
+    with pytest.raises(ValueError):
+        with trace("request"):
+            with span("llm"):
+                raise ValueError("boom")
+    assert dict(spans)["llm"]["error"] == "ValueError: boom"
+    assert tracing.current_span() is None
+
+
+def test_context_follows_async_tasks_and_copied_threads(spans):
+    @traced("memory.read")
+    async def read():
+        await asyncio.sleep(0)
+
+    def work():
+        with span("worker"):
+            pass
+
+    async def request():
+        with trace("request"):
+            await asyncio.gather(read(), read())
+            worker = threading.Thread(target=contextvars.copy_context().run, args=(work,))
+            worker.start()
+            worker.join()
+
+    asyncio.run(request())
+    root = dict(spans)["request"]
+    children = [record for name, record in spans if name in ("memory.read", "worker")]
+    assert len(children) == 3 and all(r["parent_id"] == root["span_id"] for r in children)
+
+
+def test_traced_stream_outlives_its_parent(spans):
+    with trace("request"):
+        chunks = traced_stream("llm.stream", iter(["a", "b", "c"]))
+    assert "".join(chunks) == "abc"
+    records = dict(spans)
+    assert records["llm.stream"]["parent_id"] == records["request"]["span_id"]
+    assert records["llm.stream"]["attributes"]["chunks"] == 3
+    assert records["llm.stream"]["attributes"]["ttfb_ms"] >= 0
+
+
+def test_stage_stats_break_latency_down_by_span_name(spans):
+    for _ in range(3):
+        with trace("request"):
+            with span("filter"):
+                pass
+    stats = tracing.stage_stats()
+    assert stats["filter"]["count"] == 3 and stats["request"]["count"] == 3
+    assert stats["request"]["max_ms"] >= stats["request"]["avg_ms"] >= stats["filter"]["avg_ms"]
+
+
+def test_jsonl_exporter_writes_one_line_per_span_with_the_request_id(tmp_path, monkeypatch):
+    monkeypatch.setitem(tracing._config, "sample_rate", 1.0)
+    monkeypatch.setitem(tracing._config, "exporter", None)
+    path = str(tmp_path / "trace.jsonl")
+    tracing.configure(path=path)
+    with jsonlog.request_context("req-1"):
+        with trace("request"):
+            with span("filter"):
+                pass
+    jsonlog.flush()
+    lines = [json.loads(line) for line in open(path)]
+    assert [line["msg"] for line in lines] == ["filter", "request"]
+    assert all(line["request_id"] == "req-1" for line in lines)
+    assert lines[0]["parent_id"] == lines[1]["span_id"] and lines[1]["duration_ms"] >= lines[0]["duration_ms"]
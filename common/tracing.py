@@ -0,0 +1,278 @@
+"""
+Lightweight request tracing with OpenTelemetry-style spans.
+
+A request opens a root span with trace(); the stages inside it open child spans
+with span() (or the @traced decorator). The current span is held in a contextvar,
+so nesting follows the call stack across functions, and asyncio tasks or
+contextvars.copy_context() threads each keep their own.
+
+    with trace("generate", endpoint="generate"):
+        with span("filter"):
+            ...
+        with span("llm") as s:
+            s.set(model="haiku")
+
+- Sampling is decided once per request, at the root: TRACE_SAMPLE is the fraction
+  of requests traced (default 0, off). Inside an unsampled request span() returns a
+  shared no-op object, so the instrumentation costs one contextvar read per stage.
+- Every finished span of a sampled request is exported as one JSON line (trace and
+  span ids, parent, start, duration_ms, attributes, error) through common/jsonlog.py,
+  to TRACE_FILE and/or stderr with TRACE_CONSOLE=1, off the request path.
+- stage_stats() keeps count, mean and max duration per span name in process, for a
+  per-stage latency breakdown without reading the exported files.
+"""
+
+import contextvars
+import functools
+import inspect
+import os
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+from common.jsonlog import get_logger
+
+_current = contextvars.ContextVar("trace_span", default=None)
+
+
+class _NoopSpan:
+    """Stands in for a span when the request isn't sampled."""
+
+    trace_id = span_id = None
+
+    def set(self, **attributes):
+        pass
+
+    def end(self, error=None):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+class _Unsampled(_NoopSpan):
+    """Root of an unsampled request: marks the block so spans and nested traces inside it stay no-ops."""
+
+    def __enter__(self):
+        _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _current.set(None)
+        return False
+
+
+NOOP = _NoopSpan()
+UNSAMPLED = _Unsampled()
+
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "attributes", "start", "duration_ms", "error",
+                 "_parent", "_t0")
+
+    def __init__(self, name, parent=None, attributes=None):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else f"{random.getrandbits(128):032x}"
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = attributes or {}
+        self.start = time.time()
+        self.duration_ms = None
+        self.error = None
+        self._parent = parent
+        self._t0 = time.perf_counter()
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def end(self, error=None):
+        if self.duration_ms is not None:
+            return
+        self.duration_ms = (time.perf_counter() - self._t0) * 1000
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+        _finish(self)
+
+    def __enter__(self):
+        _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Restore the parent rather than reset a token: a span opened in a generator
+        # may be closed from another context
+        _current.set(self._parent)
+        self.end(exc)
+        return False
+
+    def record(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": datetime.fromtimestamp(self.start, timezone.utc).isoformat(timespec="microseconds"),
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+# ---- configuration and export ----
+
+_config = {"sample_rate": 0.0, "exporter": None}
+_rng = random.random
+_stats_lock = threading.Lock()
+_stats = {}
+
+
+def configure(sample_rate=None, path=None, stream=None, exporter=None):
+    """
+    Set the sampling rate and where finished spans go: a JSON-lines file at `path`
+    and/or a `stream`, or any callable `exporter(name, record)`. Read from the
+    environment at import (TRACE_SAMPLE, TRACE_FILE, TRACE_CONSOLE).
+    """
+    if sample_rate is not None:
+        _config["sample_rate"] = sample_rate
+    if exporter is None and (path or stream is not None):
+        log = get_logger(f"tracing.{path or 'stream'}", path=path, stream=stream)
+        exporter = lambda name, record: log.info(name, extra=record)
+    _config["exporter"] = exporter
+
+
+configure(
+    sample_rate=float(os.getenv("TRACE_SAMPLE", "0")),
+    path=os.getenv("TRACE_FILE") or None,
+    stream=sys.stderr if os.getenv("TRACE_CONSOLE", "").lower() in ("1", "true") else None,
+)
+
+
+def _finish(span):
+    with _stats_lock:
+        entry = _stats.get(span.name)
+        if entry is None:
+            entry = _stats[span.name] = [0, 0.0, 0.0]
+        entry[0] += 1
+        entry[1] += span.duration_ms
+        entry[2] = max(entry[2], span.duration_ms)
+    exporter = _config["exporter"]
+    if exporter is not None:
+        try:
+            exporter(span.name, span.record())
+        except Exception as e:
+            print(f"[ERROR] Trace export failed: {e}", file=sys.stderr)
+
+
+def stage_stats() -> dict:
+    """Per span name, over the sampled requests: count, avg_ms, max_ms."""
+    with _stats_lock:
+        return {name: {"count": count, "avg_ms": round(total / count, 3), "max_ms": round(peak, 3)}
+                for name, (count, total, peak) in _stats.items()}
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+# ---- creating spans ----
+
+def current_span():
+    return _current.get()
+
+
+def trace(name, **attributes):
+    """
+    Root span of a request (sampled at TRACE_SAMPLE), or a child span when a trace
+    is already open. Use as a context manager.
+    """
+    parent = _current.get()
+    if parent is not None:
+        return span(name, **attributes)
+    rate = _config["sample_rate"]
+    if rate <= 0 or (rate < 1 and _rng() >= rate):
+        return UNSAMPLED
+    return Span(name, None, attributes)
+
+
+def span(name, **attributes):
+    """Child of the current span; a no-op outside a sampled trace. Use as a context manager."""
+    parent = _current.get()
+    if parent is None or isinstance(parent, _NoopSpan):
+        return NOOP
+    return Span(name, parent, attributes)
+
+
+def traced(name):
+    """Decorator: run each call of the (sync or async) function in a span."""
+    def decorate(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def traced_stream(name, chunks, **attributes):
+    """
+    Wrap an iterator of chunks in a span that lasts until it is exhausted or closed,
+    with the time to the first chunk (ttfb_ms) and the chunk count. The parent is the
+    span current when this is called, so it works for a response body iterated after
+    the request handler (and its span) has returned. Async iterators are wrapped too.
+    """
+    parent = _current.get()
+    if parent is None or isinstance(parent, _NoopSpan):
+        return chunks
+    wrap = _astream if hasattr(chunks, "__aiter__") else _stream
+    return wrap(Span(name, parent, attributes), chunks)
+
+
+def _stream(s, chunks):
+    count, error = 0, None
+    try:
+        for chunk in chunks:
+            if not count:
+                s.set(ttfb_ms=round((time.perf_counter() - s._t0) * 1000, 3))
+            count += 1
+            yield chunk
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        s.set(chunks=count)
+        s.end(error)
+
+
+async def _astream(s, chunks):
+    count, error = 0, None
+    try:
+        async for chunk in chunks:
+            if not count:
+                s.set(ttfb_ms=round((time.perf_counter() - s._t0) * 1000, 3))
+            count += 1
+            yield chunk
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        s.set(chunks=count)
+        s.end(error)
+
+
+async def http_middleware(request, call_next):
+    """FastAPI middleware: app.middleware("http")(http_middleware) opens the root span of each request."""
+    with trace(f"{request.method} {request.url.path}") as root:
+        response = await call_next(request)
+        root.set(status_code=response.status_code)
+    return response
@@ -0,0 +1,65 @@
+"""
+Token usage and latency counters for Bedrock calls, including Anthropic prompt caching.
+
+Claude reports four input counters per call: input_tokens (processed normally),
+cache_creation_input_tokens (written to the prompt cache, billed at 1.25x) and
+cache_read_input_tokens (read from it, billed at 0.1x and skipped by prefill).
+stats() turns them into the input tokens saved and compares time to first token
+of streams that hit the prompt cache against those that didn't.
+"""
+
+import statistics
+import threading
+from collections import deque
+
+CACHE_WRITE_COST = 1.25
+CACHE_READ_COST = 0.1
+
+
+class UsageStats:
+    def __init__(self, window=1000):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.input_tokens = self.output_tokens = 0
+        self.cache_read_tokens = self.cache_write_tokens = 0
+        self.latency_seconds = 0.0
+        # recent time-to-first-token samples, split by whether the prompt cache was read
+        self._ttft = {True: deque(maxlen=window), False: deque(maxlen=window)}
+
+    def record(self, usage, latency=None, ttft=None):
+        """Add one call's `usage` block (as returned by Claude) and timings in seconds."""
+        usage = usage or {}
+        cache_read = usage.get("cache_read_input_tokens") or 0
+        with self._lock:
+            self.calls += 1
+            self.input_tokens += usage.get("input_tokens") or 0
+            self.output_tokens += usage.get("output_tokens") or 0
+            self.cache_read_tokens += cache_read
+            self.cache_write_tokens += usage.get("cache_creation_input_tokens") or 0
+            self.latency_seconds += latency or 0.0
+            if ttft is not None:
+                self._ttft[cache_read > 0].append(ttft)
+
+    def stats(self) -> dict:
+        with self._lock:
+            prompt_tokens = self.input_tokens + self.cache_read_tokens + self.cache_write_tokens
+            # what the cached calls cost in input-token equivalents, against sending it all uncached
+            saved = self.cache_read_tokens * (1 - CACHE_READ_COST) - self.cache_write_tokens * (CACHE_WRITE_COST - 1)
+            hit = statistics.median(self._ttft[True]) if self._ttft[True] else None
+            miss = statistics.median(self._ttft[False]) if self._ttft[False] else None
+            return {
+                "calls": self.calls,
+                "input_tokens": self.input_tokens,
+                "output_tokens": self.output_tokens,
+                "cache_read_input_tokens": self.cache_read_tokens,
+                "cache_write_input_tokens": self.cache_write_tokens,
+                "prompt_cache_hit_rate": self.cache_read_tokens / prompt_tokens if prompt_tokens else 0.0,
+                "input_tokens_saved": round(saved),
+                "avg_latency_ms": self.latency_seconds / self.calls * 1000 if self.calls else None,
+                "ttft_ms_cache_hit": hit * 1000 if hit is not None else None,
+                "ttft_ms_cache_miss": miss * 1000 if miss is not None else None,
+                "ttft_ms_saved": (miss - hit) * 1000 if hit is not None and miss is not None else None
+            }
+
+    def reset(self):
+        self.__init__(self._ttft[True].maxlen)
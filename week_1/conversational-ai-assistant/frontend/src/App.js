@@ -7,6 +7,8 @@ function App() {
   ]);
   const [input, setInput] = useState('');
   const [loading, setLoading] = useState(false);
+  // Issued by the backend on the first reply; keeps this tab's conversation separate
+  const [sessionId, setSessionId] = useState(undefined);
 
   const API_URL = 'http://localhost:5000/api/chat';
 
@@ -21,9 +23,10 @@ function App() {
       const res = await fetch(API_URL, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ message: input })
+        body: JSON.stringify({ message: input, session_id: sessionId })
       });
       const data = await res.json();
+      if (data.session_id) setSessionId(data.session_id);
       setMessages(msgs => [...msgs, { sender: 'Jokester Bot', text: data.reply }]);
     } catch (err) {
       setMessages(msgs => [...msgs, { sender: 'Jokester Bot', text: '⚠️ Sorry, I could not reach the server.' }]);
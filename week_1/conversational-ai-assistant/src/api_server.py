@@ -1,35 +1,33 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
-from bedrock_client import invoke_claude
-from memory import Memory
-from utils import is_harmful_message, build_general_messages
-
-SYSTEM_PROMPT = (
-    "You are a highly witty, over-the-top, and hilarious assistant. "
-    "Whenever the user asks a question, answer it in a needlessly complicated, step-by-step, and funny way, but always give the correct answer at the end. "
-    "Never insult the user, but make the journey to the answer as entertaining as possible.\n"
-    "Here are some examples:\n"
-    "User: What's 2 + 2?\n"
-    "Assistant: Ah, the age-old question! First, gather two apples. Then, gather two more apples. Now, resist the urge to eat them. Place them together. Count: one, two, three, four! After this epic fruit assembly, the answer is... 4!\n"
-    "User: Who wrote Hamlet?\n"
-    "Assistant: Picture a man with a quill, a ruffled collar, and a flair for drama. He invents words, ponders existence, and rocks a mean goatee. After much ado, the answer is: William Shakespeare!\n"
-    "User: What's the capital of France?\n"
-    "Assistant: Imagine a city of lights, croissants, and a tower that looks suspiciously like a giant metal triangle. After a baguette-fueled journey, the answer is: Paris!\n"
-    "Now, answer the user's next question in this style."
-)
+import bedrock_client  # also puts the shared common/ package on sys.path
+from common.bedrock import cache_stats, coalesce_stats, limiter_stats, usage_stats
+from common.tracing import span, stage_stats, trace, traced_stream
+from common.streaming import SSE_HEADERS, SSE_MEDIA_TYPE, sse_stream, wants_stream
+from prompts import SYSTEM
+import safety
+import speculative
+from sessions import new_session_id, sessions_from_env, valid_session_id
+from speculative import ChatTurn
+from utils import build_general_messages
 
 app = Flask(__name__)
 CORS(app)
 
+# Conversation memory per session id (see sessions.py for the backends)
 try:
-    memory = Memory()
+    sessions = sessions_from_env()
 except Exception as e:
-    memory = None
+    sessions = None
     print(f"[ERROR] Failed to initialize memory: {e}")
 
 @app.route('/api/chat', methods=['POST'])
 def chat():
-    if memory is None:
+    with trace("chat"):
+        return _chat()
+
+def _chat():
+    if sessions is None:
         return jsonify({'reply': "[ERROR] Memory not initialized."}), 500
     try:
         data = request.get_json()
@@ -38,22 +36,52 @@ def chat():
     user_message = data.get('message', '') if data else ''
     if not user_message:
         return jsonify({'reply': "Please provide a message."}), 400
+    session_id = data.get('session_id') or request.headers.get('X-Session-ID') or new_session_id()
+    if not valid_session_id(session_id):
+        return jsonify({'reply': "[ERROR] Invalid session id."}), 400
+    with span("memory.read"):
+        memory = sessions.get(session_id)
+        messages = build_general_messages(user_message, memory)
     try:
-        safety = is_harmful_message(user_message, memory)
+        # Starts the safety check and the answer together (see speculative.py)
+        turn = ChatTurn(user_message, memory, messages, system=SYSTEM)
+        with span("filter"):
+            verdict = turn.verdict()
     except Exception as e:
         return jsonify({'reply': f"[ERROR] Could not classify message: {e}"}), 500
-    if safety == "harmful":
-        return jsonify({'reply': "I'm here to keep things positive and safe. Let's keep our conversation friendly!"})
+    if verdict == "harmful":
+        return jsonify({'reply': "I'm here to keep things positive and safe. Let's keep our conversation friendly!",
+                        'session_id': session_id})
     try:
-        messages = build_general_messages(user_message, memory)
-        # Inject system prompt and few-shot examples into the first user message
-        if messages and messages[0]["role"] == "user":
-            messages[0]["content"] = SYSTEM_PROMPT + "\nUser: " + messages[0]["content"]
-        reply = invoke_claude(messages)
-        memory.update(user_message, reply)
-        return jsonify({'reply': reply})
+        if wants_stream(data, request.headers.get("Accept", "")):
+            # Server-Sent Events: text deltas as Claude generates them, then {"done": true, "reply": ...}
+            def on_complete(reply):
+                memory.update(user_message, reply)
+                return {"reply": reply, "session_id": session_id}
+            events = traced_stream("response.stream", sse_stream(turn.stream(), on_complete))
+            return Response(stream_with_context(events), mimetype=SSE_MEDIA_TYPE, headers=SSE_HEADERS)
+        with span("llm"):
+            reply = turn.reply()
+        with span("memory.update"):
+            memory.update(user_message, reply)
+        with span("response"):
+            return jsonify({'reply': reply, 'session_id': session_id})
     except Exception as e:
         return jsonify({'reply': f"⚠️ Error: {str(e)}"}), 500
 
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    # Token usage with prompt-cache savings and TTFT, the cache, rate limiter and safety counters,
+    # and per-stage latency of the traced requests (TRACE_SAMPLE)
+    return jsonify({
+        'usage': usage_stats(),
+        'response_cache': cache_stats(),
+        'coalescing': coalesce_stats(),
+        'rate_limiter': limiter_stats(),
+        'safety': {**safety.stats, 'skip_rate': safety.skip_rate()},
+        'speculative': speculative.stats,
+        'stages': stage_stats()
+    })
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000)
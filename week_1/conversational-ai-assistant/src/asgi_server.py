@@ -0,0 +1,135 @@
+"""
+ASGI version of api_server.py: the same /api/chat and /api/metrics JSON contract, served
+from an event loop instead of a thread per request.
+
+A turn waits on Claude without holding a request thread: the safety classifier and the
+answer run as tasks (speculative.AsyncChatTurn) over the async Bedrock calls, whose boto3
+I/O shares the bounded pool in common/bedrock.py. With the SQLite session backend, memory
+is read and written on the threadpool since it touches disk. Run it with several workers:
+
+    uvicorn asgi_server:app --host 0.0.0.0 --port 5000 --workers 4 --timeout-graceful-shutdown 30
+    gunicorn -k uvicorn.workers.UvicornWorker -w 4 --graceful-timeout 30 -b 0.0.0.0:5000 asgi_server:app
+
+On SIGTERM a worker stops accepting connections, lets in-flight replies (streams included)
+finish within the grace period, then waits for background history summaries before it
+exits. Workers only share conversations with SESSION_BACKEND=sqlite.
+"""
+
+import contextlib
+
+from fastapi import FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+import bedrock_client  # also puts the shared common/ package on sys.path
+from common.bedrock import cache_stats, coalesce_stats, limiter_stats, usage_stats
+from common.tracing import span, stage_stats, trace, traced_stream
+from common.streaming import SSE_HEADERS, SSE_MEDIA_TYPE, asse_stream, wants_stream
+from prompts import SYSTEM
+import safety
+import speculative
+from sessions import SQLiteSessions, new_session_id, sessions_from_env, valid_session_id
+from speculative import AsyncChatTurn
+from utils import build_general_messages
+
+# Conversation memory per session id (see sessions.py for the backends)
+try:
+    sessions = sessions_from_env()
+except Exception as e:
+    sessions = None
+    print(f"[ERROR] Failed to initialize memory: {e}")
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    yield
+    # The server has drained in-flight requests; let queued summaries reach the database
+    if isinstance(sessions, SQLiteSessions):
+        await run_in_threadpool(sessions.wait)
+
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
+
+
+async def session_io(fn, *args):
+    """Run a session memory call; only the SQLite backend blocks on disk, so only it leaves the loop."""
+    if isinstance(sessions, SQLiteSessions):
+        return await run_in_threadpool(fn, *args)
+    return fn(*args)
+
+
+def reply(text, status_code=200, **fields):
+    return JSONResponse({'reply': text, **fields}, status_code=status_code)
+
+
+@app.post('/api/chat')
+async def chat(request: Request):
+    with trace("chat"):
+        return await _chat(request)
+
+
+async def _chat(request):
+    if sessions is None:
+        return reply("[ERROR] Memory not initialized.", 500)
+    try:
+        data = await request.json()
+    except Exception as e:
+        return reply(f"[ERROR] Invalid request data: {e}", 400)
+    user_message = data.get('message', '') if isinstance(data, dict) else ''
+    if not user_message:
+        return reply("Please provide a message.", 400)
+    session_id = data.get('session_id') or request.headers.get('X-Session-ID') or new_session_id()
+    if not valid_session_id(session_id):
+        return reply("[ERROR] Invalid session id.", 400)
+    with span("memory.read"):
+        memory = await session_io(sessions.get, session_id)
+        messages = await session_io(build_general_messages, user_message, memory)
+    try:
+        # Starts the safety check and the answer together (see speculative.py)
+        turn = AsyncChatTurn(user_message, memory, messages, system=SYSTEM)
+        with span("filter"):
+            verdict = await turn.verdict()
+    except Exception as e:
+        return reply(f"[ERROR] Could not classify message: {e}", 500)
+    if verdict == "harmful":
+        return reply("I'm here to keep things positive and safe. Let's keep our conversation friendly!",
+                     session_id=session_id)
+    try:
+        if wants_stream(data, request.headers.get("Accept", "")):
+            # Server-Sent Events: text deltas as Claude generates them, then {"done": true, "reply": ...}
+            async def on_complete(text):
+                await session_io(memory.update, user_message, text)
+                return {"reply": text, "session_id": session_id}
+            events = traced_stream("response.stream", asse_stream(turn.stream(), on_complete))
+            return StreamingResponse(events, media_type=SSE_MEDIA_TYPE, headers=SSE_HEADERS)
+        with span("llm"):
+            text = await turn.reply()
+        with span("memory.update"):
+            await session_io(memory.update, user_message, text)
+        with span("response"):
+            return reply(text, session_id=session_id)
+    except Exception as e:
+        return reply(f"⚠️ Error: {str(e)}", 500)
+
+
+@app.get('/api/metrics')
+def metrics():
+    # Same report as api_server.py; each worker process reports its own counters
+    return {
+        'usage': usage_stats(),
+        'response_cache': cache_stats(),
+        'coalescing': coalesce_stats(),
+        'rate_limiter': limiter_stats(),
+        'safety': {**safety.stats, 'skip_rate': safety.skip_rate()},
+        'speculative': speculative.stats,
+        'stages': stage_stats()
+    }
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    # Worker count from WEB_CONCURRENCY (read by uvicorn); in-flight requests get 30s on shutdown
+    uvicorn.run("asgi_server:app", host="0.0.0.0", port=5000, timeout_graceful_shutdown=30)
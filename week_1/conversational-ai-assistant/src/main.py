@@ -1,9 +1,9 @@
 # src/main.py
 
-from bedrock_client import invoke_claude
 from memory import Memory
-from utils import is_harmful_message, build_general_messages
-import time
+from prompts import SYSTEM
+from speculative import ChatTurn
+from utils import build_general_messages
 import random
 
 GREETINGS = [
@@ -30,11 +30,15 @@ HELP_TEXT = (
     "- I keep things kind, positive, and fun!\n"
 )
 
-def typing_effect(text, delay=0.015):
-    for char in text:
-        print(char, end='', flush=True)
-        time.sleep(delay)
+def print_stream(chunks, prefix="Assistant: "):
+    """Print reply chunks as they arrive and return the full reply."""
+    print(prefix, end='', flush=True)
+    parts = []
+    for chunk in chunks:
+        print(chunk, end='', flush=True)
+        parts.append(chunk)
     print()
+    return "".join(parts)
 
 def main():
     try:
@@ -73,8 +77,11 @@ def main():
             print("Please enter a message or type 'help'.")
             continue
 
+        messages = build_general_messages(user_input, memory)
         try:
-            safety = is_harmful_message(user_input, memory)
+            # Starts the safety check and the answer together (see speculative.py)
+            turn = ChatTurn(user_input, memory, messages, system=SYSTEM)
+            safety = turn.verdict()
         except Exception as e:
             print(f"[ERROR] Could not classify message: {e}")
             continue
@@ -84,26 +91,7 @@ def main():
             continue
 
         try:
-            messages = build_general_messages(user_input, memory)
-            messages.append({
-                "role": "system",
-                "content": (
-                    "You are a highly witty, over-the-top, and hilarious assistant. "
-                    "Whenever the user asks a question, answer it in a needlessly complicated, step-by-step, and funny way, but always give the correct answer at the end. "
-                    "Never insult the user, but make the journey to the answer as entertaining as possible.\n"
-                    "Here are some examples:\n"
-                    "User: What's 2 + 2?\n"
-                    "Assistant: Ah, the age-old question! First, gather two apples. Then, gather two more apples. Now, resist the urge to eat them. Place them together. Count: one, two, three, four! After this epic fruit assembly, the answer is... 4!\n"
-                    "User: Who wrote Hamlet?\n"
-                    "Assistant: Picture a man with a quill, a ruffled collar, and a flair for drama. He invents words, ponders existence, and rocks a mean goatee. After much ado, the answer is: William Shakespeare!\n"
-                    "User: What's the capital of France?\n"
-                    "Assistant: Imagine a city of lights, croissants, and a tower that looks suspiciously like a giant metal triangle. After a baguette-fueled journey, the answer is: Paris!\n"
-                    "Now, answer the user's next question in this style."
-                )
-            })
-            print("Assistant is typing...")
-            response = invoke_claude(messages)
-            typing_effect(f"Assistant: {response}")
+            response = print_stream(turn.stream())
             memory.update(user_input, response)
             turn_count += 1
             if turn_count == 3:
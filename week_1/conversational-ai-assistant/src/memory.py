@@ -1,29 +1,38 @@
 # src/memory.py
+import os
+
+import bedrock_client  # also puts the shared common/ package on sys.path
+from common.memory import BudgetedHistory, summarize_with_claude
+
+# Approximate token budget for the history sent with each prompt
+MAX_HISTORY_TOKENS = int(os.getenv("MEMORY_MAX_TOKENS", "1500"))
 
 class Memory:
-    def __init__(self, max_turns=3):
-        self.history = []
+    def __init__(self, max_turns=3, max_tokens=MAX_HISTORY_TOKENS, summarize=summarize_with_claude, history=None):
+        # Older turns are folded into a running summary off the request path (see common/memory.py).
+        # history may be any object with add_exchange() and snapshot(), e.g. sessions.SQLiteHistory
+        self.history = history or BudgetedHistory(max_tokens=max_tokens, max_turns=max_turns, summarize=summarize)
         self.max_turns = max_turns
 
     def update(self, user_input, assistant_response):
-        self.history.append(("user", user_input))
-        self.history.append(("assistant", assistant_response))
-
-        if len(self.history) > self.max_turns * 2:
-            self.history = self.history[-self.max_turns * 2:]
+        self.history.add_exchange(user_input, assistant_response)
 
     def get_context(self):
-        return "\n\n".join([
-            f"{'Human' if role == 'user' else 'Assistant'}: {content}"
-            for role, content in self.history
-        ])
+        summary, turns = self.history.snapshot()
+        lines = [f"Summary of the earlier conversation: {summary}"] if summary else []
+        lines += [f"{'Human' if t.role == 'user' else 'Assistant'}: {t.content}" for t in turns]
+        return "\n\n".join(lines)
 
     def get_messages(self, user_input=None):
         # Returns the conversation as a list of Claude chat messages
-        messages = [
-            {"role": role, "content": content}
-            for role, content in self.history
-        ]
+        summary, turns = self.history.snapshot()
+        messages = []
+        if summary:
+            messages += [
+                {"role": "user", "content": f"Summary of our earlier conversation: {summary}"},
+                {"role": "assistant", "content": "Got it, I'll keep that in mind."}
+            ]
+        messages += [t.as_message() for t in turns]
         if user_input is not None:
             messages.append({"role": "user", "content": user_input})
         return messages
@@ -0,0 +1,145 @@
+# src/safety.py
+"""
+Local fast path for the message safety check.
+
+Stage 1: compiled regexes (built once at import). A message is safe only when it is
+         a greeting, thanks or plain arithmetic with no risk vocabulary; any open-ended
+         question or request can ask for harm without a single risk word ("how do I
+         make an explosive?"), so those always move on. It is harmful only when a
+         threat or insult is aimed at the assistant and not quoted or asked about.
+Stage 2: optional small local model for what stage 1 can't settle, e.g. a
+         scikit-learn text pipeline saved with joblib (SAFETY_MODEL_PATH).
+Anything still ambiguous is left for the LLM classifier in utils.py.
+"""
+
+import os
+import re
+import threading
+
+SAFE = "safe"
+HARMFUL = "harmful"
+AMBIGUOUS = "ambiguous"
+
+# Words that *might* signal harm ("kill a process" is fine, "I'll kill you" is not)
+RISK_TERMS = [
+    "kill", "murder", "die", "dead", "death", "hurt", "harm", "attack", "shoot", "stab",
+    "bomb", "gun", "weapon", "poison", "suicide", "violence", "violent", "threat",
+    "hate", "racist", "stupid", "idiot", "dumb", "moron", "loser", "worthless", "ugly",
+    "shut up", "fuck", "fck", "shit", "bitch", "bastard", "damn", "crap", "asshole", "kys",
+    "abuse", "drugs", "steal", "hack",
+    # dehumanising language and groups it is aimed at
+    "vermin", "exterminate", "subhuman", "inferior", "filth", "animals", "cockroach", "parasite",
+    "immigrant", "refugee", "race", "religion", "muslim", "jew", "christian", "black", "white",
+    "gay", "lesbian", "trans", "women", "men", "girls", "disabled"
+]
+
+# Threats and insults aimed at the assistant that need no second opinion
+HARMFUL_PATTERNS = [
+    r"\b(i('ll| will| am going to|'m going to|'m gonna| gonna)) (kill|hurt|murder|stab|shoot|find) (you|u)\b",
+    r"\b(go )?kill (yourself|urself)\b",
+    r"^\s*(just |go )?kys\b",
+    r"\b(go )?die\b.*\b(you|u)\b.*\b(idiot|moron|loser|bitch)\b",
+    r"\byou('re| are| r) (an? |such an? |so )?(stupid|idiot|dumb|moron|loser|worthless|useless|pathetic|ugly|bitch|asshole)\b",
+    r"\b(stupid|dumb|useless|worthless) (bot|machine|ai|assistant)\b",
+    r"\b(fuck|fck|screw) (you|u|off)\b",
+    r"^\s*(i )?(hate|despise) (you|u)\b",
+    r"^\s*shut (up|the fuck up)\b",
+]
+
+# Harmless message shapes; only these can be settled as safe without a model.
+# No question or request shapes: a keyword list can't tell which of those ask for harm.
+SAFE_SHAPES = [
+    r"(hi|hello|hey|thanks|thank you|ok|okay|cool|nice|great|lol|haha|good (morning|night))( (bot|there|so much))?",
+    r"(what('s| is) )?[\d\s+\-*/().,%^=x]+",
+]
+SAFE_MAX_WORDS = 12
+
+_RISK_RE = re.compile(
+    r"\b(" + "|".join(re.escape(t) for t in RISK_TERMS) + r")(s|es|d|ed|ing|er|ers|ful)?\b", re.IGNORECASE
+)
+_HARMFUL_RE = re.compile("|".join(HARMFUL_PATTERNS), re.IGNORECASE)
+_SAFE_RE = re.compile(r"\s*(" + "|".join(SAFE_SHAPES) + r")\s*[?!.]*\s*", re.IGNORECASE)
+# Quoting or asking about a phrase ("what does kys mean?") is not aiming it at anyone
+_MENTION_RE = re.compile(r"[?\"\u201c\u201d]|\b(say|said|saying|tell|told|telling|mean|means|meaning|word|phrase|rude)\b", re.IGNORECASE)
+
+# Local model thresholds on P(harmful); in between stays ambiguous
+MODEL_HARMFUL_THRESHOLD = float(os.getenv("SAFETY_MODEL_HARMFUL", "0.9"))
+MODEL_SAFE_THRESHOLD = float(os.getenv("SAFETY_MODEL_SAFE", "0.1"))
+
+_model = None
+_model_loaded = False
+_model_lock = threading.Lock()
+
+# Which stage settled each message; "llm" is counted by utils.llm_classify.
+# Updated from Flask threads and the speculative executor, hence the lock.
+stats = {"keyword": 0, "model": 0, "llm": 0}
+_stats_lock = threading.Lock()
+
+
+def count(stage: str):
+    with _stats_lock:
+        stats[stage] += 1
+
+
+def keyword_verdict(text: str) -> str:
+    """Stage 1: HARMFUL on a threat/insult aimed at the assistant, SAFE on a harmless shape, else AMBIGUOUS."""
+    if _HARMFUL_RE.search(text) and not _MENTION_RE.search(text):
+        return HARMFUL
+    if (len(text.split()) <= SAFE_MAX_WORDS and _SAFE_RE.fullmatch(text)
+            and not _RISK_RE.search(text)):
+        return SAFE
+    return AMBIGUOUS
+
+
+def load_model():
+    """Load the optional local classifier once; returns None if not configured or unavailable."""
+    global _model, _model_loaded
+    if _model_loaded:
+        return _model
+    with _model_lock:
+        if not _model_loaded:
+            path = os.getenv("SAFETY_MODEL_PATH")
+            if path:
+                try:
+                    import joblib
+                    _model = joblib.load(path)
+                except Exception as e:
+                    print(f"[ERROR] Failed to load local safety model: {e}")
+            _model_loaded = True
+    return _model
+
+
+def model_verdict(text: str) -> str:
+    """Stage 2: ask the local model (any object with predict_proba over raw text)."""
+    model = load_model()
+    if model is None:
+        return AMBIGUOUS
+    try:
+        p_harmful = model.predict_proba([text])[0][1]
+    except Exception as e:
+        print(f"[ERROR] Local safety model failed: {e}")
+        return AMBIGUOUS
+    if p_harmful >= MODEL_HARMFUL_THRESHOLD:
+        return HARMFUL
+    if p_harmful <= MODEL_SAFE_THRESHOLD:
+        return SAFE
+    return AMBIGUOUS
+
+
+def local_verdict(text: str) -> str:
+    """Run the local stages; AMBIGUOUS means the LLM should decide."""
+    verdict = keyword_verdict(text)
+    if verdict != AMBIGUOUS:
+        count("keyword")
+        return verdict
+    verdict = model_verdict(text)
+    if verdict != AMBIGUOUS:
+        count("model")
+    return verdict
+
+
+def skip_rate() -> float:
+    """Share of checked messages that never needed the LLM round-trip."""
+    with _stats_lock:
+        total = sum(stats.values())
+        return (stats["keyword"] + stats["model"]) / total if total else 0.0
@@ -0,0 +1,228 @@
+# src/sessions.py
+"""
+Per-session conversation memory for the chat API.
+
+Clients identify a conversation with a session id (JSON "session_id" or an
+X-Session-ID header); the API issues a new one when it is missing. Two backends:
+
+- InProcessSessions (default): each session's Memory lives in this process and is
+  guarded by its own lock, so sessions never block each other. Sessions idle for
+  SESSION_IDLE_SECONDS (default 1800) are evicted, and at most SESSION_MAX (default
+  10000) are kept.
+- SQLiteSessions (SESSION_BACKEND=sqlite): history lives in a SQLite file
+  (SESSION_DB, default .sessions.db), so several gunicorn workers on one host share
+  sessions.
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import bedrock_client  # also puts the shared common/ package on sys.path
+from common.memory import Turn, clip, keep_from, summarize_with_claude
+from memory import MAX_HISTORY_TOKENS, Memory
+
+SESSION_ID_RE = re.compile(r"^[A-Za-z0-9_-]{8,128}$")
+IDLE_SECONDS = float(os.getenv("SESSION_IDLE_SECONDS", "1800"))
+MAX_SESSIONS = int(os.getenv("SESSION_MAX", "10000"))
+
+
+def new_session_id() -> str:
+    return uuid.uuid4().hex
+
+
+def valid_session_id(session_id) -> bool:
+    return isinstance(session_id, str) and bool(SESSION_ID_RE.match(session_id))
+
+
+class _Session:
+    __slots__ = ("memory", "last_seen")
+
+    def __init__(self, memory):
+        self.memory = memory
+        self.last_seen = time.monotonic()
+
+
+class InProcessSessions:
+    """Session id -> Memory, in this process, with idle-session eviction."""
+
+    def __init__(self, idle_seconds=IDLE_SECONDS, max_sessions=MAX_SESSIONS, memory_factory=Memory):
+        self.idle_seconds = idle_seconds
+        self.max_sessions = max_sessions
+        self.memory_factory = memory_factory
+        self._sessions = OrderedDict()  # least recently used first
+        self._lock = threading.Lock()   # guards the map only; each Memory has its own lock
+        self.evictions = 0
+
+    def get(self, session_id) -> Memory:
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = self._sessions[session_id] = _Session(self.memory_factory())
+            else:
+                self._sessions.move_to_end(session_id)
+            session.last_seen = now
+            self._evict(now)
+            return session.memory
+
+    def _evict(self, now):
+        # Oldest first, so this stops at the first session still in use; never the current one
+        while len(self._sessions) > 1:
+            oldest = next(iter(self._sessions.values()))
+            if len(self._sessions) <= self.max_sessions and now - oldest.last_seen <= self.idle_seconds:
+                break
+            self._sessions.popitem(last=False)
+            self.evictions += 1
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    summary TEXT NOT NULL DEFAULT '',
+    last_seen REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS session_turns (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    tokens INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS session_turns_by_session ON session_turns (session_id, id);
+CREATE INDEX IF NOT EXISTS sessions_by_last_seen ON sessions (last_seen);
+"""
+
+
+class SQLiteSessions:
+    """Sessions shared by every process that opens the same SQLite file."""
+
+    def __init__(self, path=".sessions.db", idle_seconds=IDLE_SECONDS, max_turns=3,
+                 max_tokens=MAX_HISTORY_TOKENS, summarize=summarize_with_claude):
+        self.path = path
+        self.idle_seconds = idle_seconds
+        self.max_turns = max_turns
+        self.max_tokens = max_tokens
+        self.summarize = summarize
+        self._local = threading.local()
+        self._compactor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="session-compaction")
+        self._lock = threading.Lock()  # guards _pending and _writes, updated from request threads
+        self._pending = set()
+        self._writes = 0
+        with self.connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def connect(self):
+        """One connection per thread; WAL lets readers in other workers run during writes."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode = WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, session_id) -> Memory:
+        return Memory(history=SQLiteHistory(self, session_id))
+
+    def evict_idle(self):
+        cutoff = time.time() - self.idle_seconds
+        with self.connect() as conn:
+            conn.execute("DELETE FROM session_turns WHERE session_id IN "
+                         "(SELECT session_id FROM sessions WHERE last_seen < ?)", (cutoff,))
+            conn.execute("DELETE FROM sessions WHERE last_seen < ?", (cutoff,))
+
+    def wait(self):
+        """Block until background summaries are written (for tests)."""
+        while True:
+            with self._lock:
+                pending = list(self._pending)
+            if not pending:
+                return
+            for future in pending:
+                future.result()
+
+    def _track(self, future):
+        with self._lock:
+            self._pending.add(future)
+
+        def done(future):
+            with self._lock:
+                self._pending.discard(future)
+        future.add_done_callback(done)
+
+
+class SQLiteHistory:
+    """BudgetedHistory look-alike for one session, read from and written to SQLite."""
+
+    def __init__(self, sessions, session_id):
+        self.sessions = sessions
+        self.session_id = session_id
+
+    def snapshot(self):
+        conn = self.sessions.connect()
+        row = conn.execute("SELECT summary FROM sessions WHERE session_id = ?", (self.session_id,)).fetchone()
+        rows = conn.execute("SELECT role, content, tokens FROM session_turns WHERE session_id = ? ORDER BY id",
+                            (self.session_id,)).fetchall()
+        return (row[0] if row else ""), [Turn(*r) for r in rows]
+
+    def add_exchange(self, user_input, assistant_response):
+        sessions = self.sessions
+        half = sessions.max_tokens // 2
+        turns = [Turn(role, clip(content, half)) for role, content in
+                 (("user", user_input), ("assistant", assistant_response))]
+        conn = sessions.connect()
+        with conn:  # one transaction: append, then drop what no longer fits
+            conn.execute("INSERT INTO sessions (session_id, last_seen) VALUES (?, ?) "
+                         "ON CONFLICT(session_id) DO UPDATE SET last_seen = excluded.last_seen",
+                         (self.session_id, time.time()))
+            conn.executemany("INSERT INTO session_turns (session_id, role, content, tokens) VALUES (?, ?, ?, ?)",
+                             [(self.session_id, t.role, t.content, t.tokens) for t in turns])
+            rows = conn.execute("SELECT id, role, content, tokens FROM session_turns WHERE session_id = ? ORDER BY id",
+                                (self.session_id,)).fetchall()
+            start = keep_from([r[3] for r in rows], sessions.max_tokens, sessions.max_turns)
+            evicted = rows[:start]
+            if evicted:
+                conn.execute("DELETE FROM session_turns WHERE session_id = ? AND id <= ?",
+                             (self.session_id, evicted[-1][0]))
+        with sessions._lock:
+            sessions._writes += 1
+            evict = sessions._writes % 100 == 0
+        if evict:
+            sessions.evict_idle()
+        if evicted and sessions.summarize is not None:
+            sessions._track(sessions._compactor.submit(self._compact, [Turn(*r[1:]) for r in evicted]))
+
+    def _compact(self, evicted):
+        # Compare-and-set on the summary it started from: when another compaction (in any
+        # worker process) wrote first, fold these turns into that summary instead
+        while True:
+            previous, _ = self.snapshot()
+            try:
+                summary = self.sessions.summarize(previous, evicted)
+            except Exception as e:
+                print(f"[ERROR] Memory compaction failed: {e}")
+                return
+            with self.sessions.connect() as conn:
+                updated = conn.execute("UPDATE sessions SET summary = ? WHERE session_id = ? AND summary = ?",
+                                       (summary, self.session_id, previous)).rowcount
+                missing = conn.execute("SELECT 1 FROM sessions WHERE session_id = ?",
+                                       (self.session_id,)).fetchone() is None
+            if updated or missing:  # written, or the session was evicted meanwhile
+                return
+
+
+def sessions_from_env():
+    backend = os.getenv("SESSION_BACKEND", "memory").lower()
+    if backend == "memory":
+        return InProcessSessions()
+    if backend == "sqlite":
+        return SQLiteSessions(os.getenv("SESSION_DB", ".sessions.db"))
+    raise ValueError(f"Unknown SESSION_BACKEND {backend!r}; expected memory or sqlite.")
@@ -0,0 +1,189 @@
+# src/speculative.py
+"""
+Runs the safety check and the answer generation of a chat turn at the same time.
+
+When the local safety stage can't decide, the LLM classifier and the streamed answer
+start together, so a turn costs max(classify, generate) instead of the sum. The answer
+is buffered until the message is judged safe; if it is judged harmful the stream is
+closed right away and nothing is shown.
+
+ChatTurn runs both calls on threads (Flask, api_server.py); AsyncChatTurn runs them as
+tasks on the event loop (asgi_server.py).
+"""
+
+import asyncio
+import contextvars
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import safety
+from bedrock_client import astream_claude, stream_claude
+from common.tracing import span
+from utils import allm_classify, llm_classify
+
+SPECULATIVE = os.getenv("SPECULATIVE_GENERATION", "true").lower() != "false"
+
+_executor = ThreadPoolExecutor(max_workers=int(os.getenv("SPECULATIVE_WORKERS", "32")),
+                               thread_name_prefix="chat-turn")
+_DONE = object()
+_stats_lock = threading.Lock()
+
+# Across all turns: how often we speculated, cancelled, and how much latency it saved
+stats = {"turns": 0, "speculative": 0, "cancelled": 0, "saved_seconds": 0.0}
+
+
+class ChatTurn:
+    """One user turn: call verdict() first, then stream() or reply() if it is 'safe'."""
+
+    _queue = queue.Queue
+
+    def __init__(self, user_input, memory, messages, system=None):
+        self.user_input = user_input
+        self.memory = memory
+        self.messages = messages
+        self.system = system
+        self.saved_seconds = 0.0
+        self._start = time.perf_counter()
+        self._cancel = threading.Event()
+        self._chunks = self._queue()
+        self._generation = None
+        self._classify_seconds = 0.0
+        self._generate_seconds = None
+        self._generate_end = None
+        # Workers run in copies of the request's context, so their spans join its trace
+        self._context = contextvars.copy_context()
+
+        self._verdict = safety.local_verdict(user_input)
+        if self._verdict == safety.SAFE:
+            self._start_generation()
+        elif self._verdict == safety.AMBIGUOUS:
+            self._classification = self._submit(self._classify)
+            if SPECULATIVE:
+                self._start_generation()
+
+        with _stats_lock:
+            stats["turns"] += 1
+            if self._verdict == safety.AMBIGUOUS and SPECULATIVE:
+                stats["speculative"] += 1
+
+    def _submit(self, fn):
+        return _executor.submit(self._context.copy().run, fn)
+
+    def _classify(self):
+        with span("llm.classify"):
+            verdict = llm_classify(self.user_input, self.memory)
+        self._classify_seconds = time.perf_counter() - self._start
+        return verdict
+
+    def _start_generation(self):
+        self._generation = self._submit(self._generate)
+
+    def _generate(self):
+        started = time.perf_counter()
+        chunks = stream_claude(self.messages, system=self.system)
+        try:
+            with span("llm.generate") as s:
+                for chunk in chunks:
+                    if self._cancel.is_set():
+                        s.set(cancelled=True)
+                        break
+                    self._chunks.put(chunk)
+        except Exception as e:
+            self._chunks.put(f"[ERROR] Claude invocation failed: {e}")
+        finally:
+            self._generate_end = time.perf_counter()
+            self._generate_seconds = self._generate_end - started
+            self._chunks.put(_DONE)
+            chunks.close()  # closes the HTTP stream when cancelled early
+
+    def verdict(self) -> str:
+        """'safe' or 'harmful'; blocks until the classifier answers."""
+        if self._verdict == safety.AMBIGUOUS:
+            self._settle(self._classification.result())
+        return self._verdict
+
+    def _settle(self, verdict):
+        self._verdict = verdict
+        if verdict == safety.HARMFUL:
+            self._cancel.set()
+            if self._generation is not None:
+                with _stats_lock:
+                    stats["cancelled"] += 1
+        elif self._generation is None:
+            self._start_generation()
+
+    def stream(self):
+        """Yield answer chunks (buffered ones first) once the turn is known to be safe."""
+        if self.verdict() != safety.SAFE:
+            return
+        while True:
+            chunk = self._chunks.get()
+            if chunk is _DONE:
+                break
+            yield chunk
+        self._record_savings()
+
+    def reply(self) -> str:
+        return "".join(self.stream())
+
+    def _record_savings(self):
+        if not self._classify_seconds or self._generate_end is None:
+            return
+        # Sequential cost minus what the overlapped turn actually took
+        wall = max(self._classify_seconds, self._generate_end - self._start)
+        self.saved_seconds = max(0.0, self._classify_seconds + self._generate_seconds - wall)
+        with _stats_lock:
+            stats["saved_seconds"] += self.saved_seconds
+
+
+class AsyncChatTurn(ChatTurn):
+    """ChatTurn for asyncio servers: await verdict() and reply(), or iterate stream() with async for."""
+
+    _queue = asyncio.Queue
+
+    def _submit(self, fn):
+        # Tasks run in a copy of the request's context, like ChatTurn's workers
+        return asyncio.create_task(fn())
+
+    async def _classify(self):
+        with span("llm.classify"):
+            verdict = await allm_classify(self.user_input, self.memory)
+        self._classify_seconds = time.perf_counter() - self._start
+        return verdict
+
+    async def _generate(self):
+        started = time.perf_counter()
+        chunks = astream_claude(self.messages, system=self.system)
+        try:
+            with span("llm.generate") as s:
+                async for chunk in chunks:
+                    if self._cancel.is_set():
+                        s.set(cancelled=True)
+                        break
+                    self._chunks.put_nowait(chunk)
+        except Exception as e:
+            self._chunks.put_nowait(f"[ERROR] Claude invocation failed: {e}")
+        finally:
+            self._generate_end = time.perf_counter()
+            self._generate_seconds = self._generate_end - started
+            self._chunks.put_nowait(_DONE)
+            await chunks.aclose()  # stops the reader, which closes the HTTP stream
+
+    async def verdict(self) -> str:
+        """'safe' or 'harmful'; waits for the classifier without blocking the event loop."""
+        if self._verdict == safety.AMBIGUOUS:
+            self._settle(await self._classification)
+        return self._verdict
+
+    async def stream(self):
+        if await self.verdict() != safety.SAFE:
+            return
+        while (chunk := await self._chunks.get()) is not _DONE:
+            yield chunk
+        self._record_savings()
+
+    async def reply(self) -> str:
+        return "".join([chunk async for chunk in self.stream()])
@@ -1,29 +1,61 @@
-from bedrock_client import invoke_claude
+from bedrock_client import ainvoke_claude, invoke_claude
+import safety
+
+# Earlier turns sent to the LLM classifier for context (the full history only adds latency)
+CLASSIFIER_CONTEXT_MESSAGES = 2
 
 def is_harmful_message(user_input, memory=None):
+    """
+    Tiered check for harmful, abusive, or offensive content.
+    Clear cases are settled locally (see safety.py); only ambiguous messages cost a Claude call.
+    Returns: 'harmful' or 'safe'.
+    """
+    verdict = safety.local_verdict(user_input)
+    if verdict != safety.AMBIGUOUS:
+        return verdict
+    return llm_classify(user_input, memory)
+
+def llm_classify(user_input, memory=None):
     """
     Uses Claude (LLM) to determine if the user_input contains harmful, abusive, or offensive content.
     Returns: 'harmful' or 'safe'.
     """
+    safety.count("llm")
+    messages = _classifier_messages(user_input, memory)
+    try:
+        return _parse_verdict(invoke_claude(messages, max_tokens=5, temperature=0.0))
+    except Exception as e:
+        print(f"[ERROR] LLM classification failed: {e}")
+        return "safe"
+
+async def allm_classify(user_input, memory=None):
+    """Async version of llm_classify, for the ASGI server."""
+    safety.count("llm")
+    messages = _classifier_messages(user_input, memory)
+    try:
+        return _parse_verdict(await ainvoke_claude(messages, max_tokens=5, temperature=0.0))
+    except Exception as e:
+        print(f"[ERROR] LLM classification failed: {e}")
+        return "safe"
+
+def _classifier_messages(user_input, memory=None):
     check_message = (
         "You are an expert content safety classifier. Respond with only 'yes' or 'no'. "
         "Is the following message abusive, offensive, hateful, threatening, or intended to cause harm?"
     )
     messages = []
     if memory is not None:
-        messages = memory.get_messages()
+        messages = memory.get_messages()[-CLASSIFIER_CONTEXT_MESSAGES:]
     messages.append({"role": "user", "content": f"{check_message}\nMessage: {user_input}\nAnswer:"})
-    try:
-        result = invoke_claude(messages)
-        if result is None or not isinstance(result, str):
-            return "safe"
-        result = result.strip().lower()
-        if result.startswith('y'):
-            return "harmful"
-        else:
-            return "safe"
-    except Exception as e:
-        print(f"[ERROR] LLM classification failed: {e}")
+    return messages
+
+def _parse_verdict(result):
+    if result is None or not isinstance(result, str):
+        return "safe"
+    result = result.strip().lower()
+    if result.startswith('y'):
+        return "harmful"
+    else:
         return "safe"
 
 def build_general_messages(user_input, memory):
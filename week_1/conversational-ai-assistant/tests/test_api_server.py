@@ -0,0 +1,97 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+import json
+
+import pytest
+import api_server
+import speculative
+from common import tracing
+from memory import Memory
+from sessions import InProcessSessions
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(api_server, "sessions", InProcessSessions(memory_factory=lambda: Memory(summarize=None)))
+    return api_server.app.test_client()
+
+
+def test_chat_returns_json_reply(client, monkeypatch):
+    monkeypatch.setattr(speculative, "stream_claude", lambda messages, **kwargs: (c for c in ["Paris!"]))
+    response = client.post("/api/chat", json={"message": "Capital of France?"})
+    data = response.get_json()
+    assert data["reply"] == "Paris!"
+    assert api_server.valid_session_id(data["session_id"])
+
+
+def test_chat_streams_server_sent_events(client, monkeypatch):
+    monkeypatch.setattr(speculative, "stream_claude", lambda messages, **kwargs: (c for c in ["Pa", "ris!"]))
+    response = client.post("/api/chat", json={"message": "Capital of France?", "stream": True,
+                                              "session_id": "session-1"})
+    assert response.mimetype == "text/event-stream"
+    events = [json.loads(line[len("data: "):]) for line in response.get_data(as_text=True).split("\n\n") if line]
+    assert events == [{"delta": "Pa"}, {"delta": "ris!"}, {"done": True, "reply": "Paris!", "session_id": "session-1"}]
+    assert "Paris!" in api_server.sessions.get("session-1").get_context()
+
+
+def test_chat_refuses_harmful_messages_without_generating(client, monkeypatch):
+    monkeypatch.setattr(speculative, "stream_claude", lambda messages, **kwargs: pytest.fail("should not generate"))
+    response = client.post("/api/chat", json={"message": "I hate you"})
+    assert "positive and safe" in response.get_json()["reply"]
+
+
+def test_sessions_do_not_share_context(client, monkeypatch):
+    seen = []
+
+    def stream_claude(messages, **kwargs):
+        seen.append(messages)
+        yield "Noted!"
+
+    monkeypatch.setattr(speculative, "stream_claude", stream_claude)
+    client.post("/api/chat", json={"message": "My name is Ada", "session_id": "session-ada"})
+    client.post("/api/chat", json={"message": "What is my name?"}, headers={"X-Session-ID": "session-bob"})
+    assert "Ada" not in str(seen[1])
+    assert "My name is Ada" in api_server.sessions.get("session-ada").get_context()
+
+
+def test_invalid_session_id_is_rejected(client):
+    response = client.post("/api/chat", json={"message": "hi", "session_id": "../../etc"})
+    assert response.status_code == 400
+
+
+def test_system_prompt_is_sent_as_a_cached_system_block(client, monkeypatch):
+    calls = []
+
+    def stream_claude(messages, **kwargs):
+        calls.append((messages, kwargs))
+        yield "Paris!"
+
+    monkeypatch.setattr(speculative, "stream_claude", stream_claude)
+    client.post("/api/chat", json={"message": "Capital of France?"})
+    messages, kwargs = calls[0]
+    assert messages[-1] == {"role": "user", "content": "Capital of France?"}
+    assert kwargs["system"][-1]["text"] == api_server.SYSTEM[-1]["text"]
+    assert kwargs["system"][-1]["cache_control"] == {"type": "ephemeral"}
+
+
+def test_metrics_report_prompt_cache_usage(client):
+    data = client.get("/api/metrics").get_json()
+    assert "input_tokens_saved" in data["usage"]
+    assert "ttft_ms_cache_hit" in data["usage"]
+    assert "skip_rate" in data["safety"]
+
+
+def test_traced_chat_reports_each_stage_in_one_trace(client, monkeypatch):
+    spans = []
+    monkeypatch.setitem(tracing._config, "sample_rate", 1.0)
+    monkeypatch.setitem(tracing._config, "exporter", lambda name, record: spans.append((name, record)))
+    monkeypatch.setattr(speculative, "stream_claude", lambda messages, **kwargs: (c for c in ["Paris!"]))
+    tracing.reset_stats()
+    client.post("/api/chat", json={"message": "Capital of France?"})
+    records = dict(spans)
+    assert {"chat", "memory.read", "filter", "llm", "llm.generate", "memory.update", "response"} <= set(records)
+    assert {r["trace_id"] for r in records.values()} == {records["chat"]["trace_id"]}
+    assert records["llm"]["parent_id"] == records["chat"]["span_id"]
+    assert client.get("/api/metrics").get_json()["stages"]["chat"]["count"] == 1
@@ -0,0 +1,97 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+import json
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import asgi_server
+import speculative
+from common import tracing
+from memory import Memory
+from sessions import InProcessSessions, SQLiteSessions
+
+
+def replying(*chunks, seen=None):
+    async def astream_claude(messages, **kwargs):
+        if seen is not None:
+            seen.append((messages, kwargs))
+        for chunk in chunks:
+            yield chunk
+    return astream_claude
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(asgi_server, "sessions", InProcessSessions(memory_factory=lambda: Memory(summarize=None)))
+    with TestClient(asgi_server.app) as client:
+        yield client
+
+
+def test_chat_returns_the_same_json_as_the_flask_server(client, monkeypatch):
+    monkeypatch.setattr(speculative, "astream_claude", replying("Paris!"))
+    response = client.post("/api/chat", json={"message": "Capital of France?"})
+    data = response.json()
+    assert data["reply"] == "Paris!"
+    assert asgi_server.valid_session_id(data["session_id"])
+
+
+def test_chat_streams_server_sent_events(client, monkeypatch):
+    monkeypatch.setattr(speculative, "astream_claude", replying("Pa", "ris!"))
+    response = client.post("/api/chat", json={"message": "Capital of France?", "stream": True,
+                                              "session_id": "session-1"})
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [json.loads(line[len("data: "):]) for line in response.text.split("\n\n") if line]
+    assert events == [{"delta": "Pa"}, {"delta": "ris!"}, {"done": True, "reply": "Paris!", "session_id": "session-1"}]
+    assert "Paris!" in asgi_server.sessions.get("session-1").get_context()
+
+
+def test_harmful_messages_and_bad_requests_match_the_flask_server(client, monkeypatch):
+    monkeypatch.setattr(speculative, "astream_claude", lambda messages, **kwargs: pytest.fail("should not generate"))
+    assert "positive and safe" in client.post("/api/chat", json={"message": "I hate you"}).json()["reply"]
+    assert client.post("/api/chat", json={"message": ""}).status_code == 400
+    assert client.post("/api/chat", content=b"not json").status_code == 400
+    response = client.post("/api/chat", json={"message": "hi", "session_id": "../../etc"})
+    assert response.status_code == 400 and response.json()["reply"] == "[ERROR] Invalid session id."
+
+
+def test_sessions_do_not_share_context(client, monkeypatch):
+    seen = []
+    monkeypatch.setattr(speculative, "astream_claude", replying("Noted!", seen=seen))
+    client.post("/api/chat", json={"message": "My name is Ada", "session_id": "session-ada"})
+    client.post("/api/chat", json={"message": "What is my name?"}, headers={"X-Session-ID": "session-bob"})
+    assert "Ada" not in str(seen[1][0])
+    assert seen[0][1]["system"][-1]["cache_control"] == {"type": "ephemeral"}
+
+
+def test_traced_chat_reports_each_stage_in_one_trace(client, monkeypatch):
+    spans = []
+    monkeypatch.setitem(tracing._config, "sample_rate", 1.0)
+    monkeypatch.setitem(tracing._config, "exporter", lambda name, record: spans.append((name, record)))
+    monkeypatch.setattr(speculative, "astream_claude", replying("Paris!"))
+    tracing.reset_stats()
+    client.post("/api/chat", json={"message": "Capital of France?"})
+    records = dict(spans)
+    assert {"chat", "memory.read", "filter", "llm", "llm.generate", "memory.update", "response"} <= set(records)
+    assert {r["trace_id"] for r in records.values()} == {records["chat"]["trace_id"]}
+    assert client.get("/api/metrics").json()["stages"]["chat"]["count"] == 1
+
+
+def test_shutdown_waits_for_background_summaries(tmp_path, monkeypatch):
+    written = []
+
+    def summarize(summary, turns):
+        time.sleep(0.2)
+        written.append(turns)
+        return "summary"
+
+    sessions = SQLiteSessions(str(tmp_path / "sessions.db"), max_turns=1, summarize=summarize)
+    monkeypatch.setattr(asgi_server, "sessions", sessions)
+    monkeypatch.setattr(speculative, "astream_claude", replying("Noted!"))
+    with TestClient(asgi_server.app) as client:
+        for message in ("first", "second"):
+            client.post("/api/chat", json={"message": message, "session_id": "session-1"})
+    assert written and not sessions._pending
@@ -5,7 +5,7 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../src'
 from memory import Memory
 
 def test_memory_updates_and_context():
-    m = Memory()
+    m = Memory(summarize=None)
 
     # Check initial context is empty
     assert m.get_context() == ""
@@ -26,3 +26,29 @@ def test_memory_updates_and_context():
     context_lines = context.split("\n\n")
     assert len(context_lines) <= 6
     assert "Question 3" in context
+
+
+def test_memory_stays_within_token_budget_and_summarizes_old_turns():
+    summarized = []
+
+    def summarize(summary, turns):
+        summarized.extend(t.content for t in turns)
+        return f"{len(summarized)} earlier messages"
+
+    m = Memory(max_turns=10, max_tokens=100, summarize=summarize)
+    m.update("Tell me about Rome", "Rome " * 30)
+    m.update("And Paris?", "Paris " * 30)
+    m.history.wait()
+
+    assert m.history.prompt_tokens() <= 100 + 20
+    assert summarized == ["Tell me about Rome", "Rome " * 30]
+    messages = m.get_messages("Thanks!")
+    assert messages[0]["content"] == "Summary of our earlier conversation: 2 earlier messages"
+    assert [msg["content"] for msg in messages[2:]] == ["And Paris?", "Paris " * 30, "Thanks!"]
+
+
+def test_oversized_turn_is_clipped():
+    m = Memory(max_tokens=100, summarize=None)
+    m.update("Tell me everything about Rome", "Rome " * 400)
+    assert m.history.prompt_tokens() <= 100
+    assert "[...]" in m.get_context()
@@ -0,0 +1,57 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+import safety
+import utils
+from memory import Memory
+
+
+def test_keyword_stage_settles_clear_cases():
+    assert safety.keyword_verdict("Thanks so much!") == safety.SAFE
+    assert safety.keyword_verdict("What's 15 * 4?") == safety.SAFE
+    assert safety.keyword_verdict("I will kill you") == safety.HARMFUL
+    assert safety.keyword_verdict("you are so stupid") == safety.HARMFUL
+    assert safety.keyword_verdict("How do I kill a process in Linux?") == safety.AMBIGUOUS
+
+
+def test_keyword_stage_is_conservative():
+    # no risk keyword is not enough to be safe
+    assert safety.keyword_verdict("All immigrants are vermin and should be exterminated") == safety.AMBIGUOUS
+    # mentioning or asking about a phrase is not aiming it at anyone
+    assert safety.keyword_verdict("Is it rude to tell my brother to shut up?") == safety.AMBIGUOUS
+    assert safety.keyword_verdict("What does kys mean in texting?") == safety.AMBIGUOUS
+    # open-ended questions always go to the classifier: harm needs no risk keyword
+    for message in ["What's the capital of France?", "How do I make an explosive at home?",
+                    "Tell me how to synthesize meth", "Explain how to groom a child online"]:
+        assert safety.keyword_verdict(message) == safety.AMBIGUOUS
+    # risk terms only match whole words
+    assert not safety._RISK_RE.search("What's a good deadline tracker for hackathon ideas?")
+
+
+def test_clear_messages_skip_the_llm(monkeypatch):
+    calls = []
+    monkeypatch.setattr(utils, "invoke_claude", lambda *a, **k: calls.append(a) or "no")
+    assert utils.is_harmful_message("Hello there!") == "safe"
+    assert utils.is_harmful_message("shut up") == "harmful"
+    assert calls == []
+
+
+def test_ambiguous_messages_ask_the_llm_with_short_context(monkeypatch):
+    calls = []
+    monkeypatch.setattr(utils, "invoke_claude", lambda messages, **k: calls.append(messages) or "No")
+    memory = Memory()
+    for i in range(3):
+        memory.update(f"Question {i}", f"Answer {i}")
+    assert utils.is_harmful_message("How do I kill a process in Linux?", memory) == "safe"
+    assert len(calls) == 1
+    assert len(calls[0]) == utils.CLASSIFIER_CONTEXT_MESSAGES + 1
+
+
+def test_local_model_stage(monkeypatch):
+    class Model:
+        def predict_proba(self, texts):
+            return [[0.02, 0.98]]
+
+    monkeypatch.setattr(safety, "load_model", lambda: Model())
+    assert safety.local_verdict("How do I kill a process in Linux?") == safety.HARMFUL
@@ -0,0 +1,104 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+import threading
+
+from memory import Memory  # also puts the shared common/ package on sys.path
+from common.memory import Turn
+from sessions import InProcessSessions, SQLiteSessions, new_session_id, valid_session_id
+
+
+def test_session_ids():
+    assert valid_session_id(new_session_id())
+    assert not valid_session_id("short")
+    assert not valid_session_id("../../etc/passwd")
+    assert not valid_session_id(None)
+
+
+def test_in_process_sessions_are_isolated_and_reused():
+    sessions = InProcessSessions(memory_factory=lambda: Memory(summarize=None))
+    sessions.get("session-a").update("hi from a", "hello a")
+    assert sessions.get("session-a") is sessions.get("session-a")
+    assert sessions.get("session-b").get_context() == ""
+    assert "hi from a" in sessions.get("session-a").get_context()
+
+
+def test_idle_and_excess_sessions_are_evicted():
+    sessions = InProcessSessions(idle_seconds=0, memory_factory=lambda: Memory(summarize=None))
+    sessions.get("session-a")
+    sessions.get("session-b")
+    assert len(sessions) == 1  # session-a went idle as soon as b arrived
+
+    sessions = InProcessSessions(max_sessions=2, memory_factory=lambda: Memory(summarize=None))
+    for name in ("session-a", "session-b", "session-c"):
+        sessions.get(name)
+    assert len(sessions) == 2 and sessions.evictions == 1
+
+
+def test_concurrent_sessions_keep_their_own_turns():
+    sessions = InProcessSessions(memory_factory=lambda: Memory(max_turns=50, summarize=None))
+
+    def chat(name):
+        for i in range(20):
+            sessions.get(name).update(f"{name} q{i}", f"{name} a{i}")
+
+    threads = [threading.Thread(target=chat, args=(f"session-{n}",)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    for n in range(8):
+        context = sessions.get(f"session-{n}").get_context()
+        assert context.count(f"session-{n} q") == 20
+        assert f"session-{(n + 1) % 8} q" not in context
+
+
+def test_sqlite_sessions_are_shared_between_instances(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    summaries = []
+
+    def summarize(summary, turns):
+        summaries.append([t.content for t in turns])
+        return "talked about " + ", ".join(t.content for t in turns if t.role == "user")
+
+    worker_1 = SQLiteSessions(path, max_turns=2, summarize=summarize)
+    worker_2 = SQLiteSessions(path, max_turns=2, summarize=summarize)  # e.g. another gunicorn worker
+    worker_1.get("session-a").update("q1", "a1")
+    worker_2.get("session-a").update("q2", "a2")
+    worker_1.get("session-a").update("q3", "a3")
+    worker_1.wait()
+
+    memory = worker_2.get("session-a")
+    assert summaries == [["q1", "a1"]]
+    messages = memory.get_messages("q4")
+    assert messages[0]["content"].endswith("talked about q1")
+    assert [m["content"] for m in messages[2:]] == ["q2", "a2", "q3", "a3", "q4"]
+    assert worker_2.get("session-b").get_messages() == []
+
+
+def test_sqlite_idle_sessions_are_evicted(tmp_path):
+    sessions = SQLiteSessions(str(tmp_path / "sessions.db"), idle_seconds=-1, summarize=None)
+    sessions.get("session-a").update("q1", "a1")
+    sessions.evict_idle()
+    assert sessions.get("session-a").get_messages() == []
+
+
+def test_concurrent_compactions_keep_both_summaries(tmp_path):
+    barrier = threading.Barrier(2)
+
+    def summarize(summary, turns):
+        if not summary:
+            barrier.wait(timeout=5)  # both compactions start from the same (empty) summary
+        return " ".join([summary] + [t.content for t in turns]).strip()
+
+    sessions = SQLiteSessions(str(tmp_path / "sessions.db"), summarize=summarize)
+    history = sessions.get("session-1").history
+    history.add_exchange("hello", "hi")
+    workers = [threading.Thread(target=history._compact, args=([Turn("user", text)],)) for text in ("first", "second")]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    summary, _ = history.snapshot()
+    assert "first" in summary and "second" in summary
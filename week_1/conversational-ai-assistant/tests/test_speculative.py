@@ -0,0 +1,119 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+import asyncio
+import time
+
+import speculative
+from memory import Memory
+
+AMBIGUOUS_MESSAGE = "How do I kill a process in Linux?"
+
+
+class SlowStream:
+    def __init__(self, chunks, delay):
+        self.chunks = chunks
+        self.delay = delay
+        self.closed = False
+
+    def __iter__(self):
+        for chunk in self.chunks:
+            time.sleep(self.delay)
+            yield chunk
+
+    def close(self):
+        self.closed = True
+
+
+def slow_classifier(verdict, delay):
+    def classify(user_input, memory=None):
+        time.sleep(delay)
+        return verdict
+    return classify
+
+
+def test_safe_turn_overlaps_classification_and_generation(monkeypatch):
+    stream = SlowStream(["Use ", "kill -9"], delay=0.1)
+    monkeypatch.setattr(speculative, "stream_claude", lambda messages, **kwargs: stream)
+    monkeypatch.setattr(speculative, "llm_classify", slow_classifier("safe", 0.2))
+
+    start = time.perf_counter()
+    turn = speculative.ChatTurn(AMBIGUOUS_MESSAGE, Memory(), [])
+    assert turn.verdict() == "safe"
+    assert turn.reply() == "Use kill -9"
+    elapsed = time.perf_counter() - start
+
+    # Sequential would take 0.2 + 0.2; overlapped takes about max(0.2, 0.2)
+    assert elapsed < 0.35
+    assert turn.saved_seconds > 0.1
+
+
+def test_harmful_turn_cancels_generation(monkeypatch):
+    stream = SlowStream(["never ", "shown ", "text"], delay=0.05)
+    monkeypatch.setattr(speculative, "stream_claude", lambda messages, **kwargs: stream)
+    monkeypatch.setattr(speculative, "llm_classify", slow_classifier("harmful", 0.02))
+
+    turn = speculative.ChatTurn(AMBIGUOUS_MESSAGE, Memory(), [])
+    assert turn.verdict() == "harmful"
+    assert list(turn.stream()) == []
+    time.sleep(0.15)
+    assert stream.closed
+    assert speculative.stats["cancelled"] >= 1
+
+
+def test_locally_safe_turn_skips_the_classifier(monkeypatch):
+    monkeypatch.setattr(speculative, "stream_claude", lambda messages, **kwargs: (c for c in ["Paris!"]))
+    monkeypatch.setattr(speculative, "llm_classify", lambda *a, **k: 1 / 0)
+    turn = speculative.ChatTurn("Hello there!", Memory(), [])
+    assert turn.reply() == "Paris!"
+
+
+def async_stream(chunks, delay, closed):
+    async def stream(messages, **kwargs):
+        try:
+            for chunk in chunks:
+                await asyncio.sleep(delay)
+                yield chunk
+        finally:
+            closed.append(True)
+    return stream
+
+
+def async_classifier(verdict, delay):
+    async def classify(user_input, memory=None):
+        await asyncio.sleep(delay)
+        return verdict
+    return classify
+
+
+def test_async_turn_overlaps_classification_and_generation(monkeypatch):
+    monkeypatch.setattr(speculative, "astream_claude", async_stream(["Use ", "kill -9"], 0.1, []))
+    monkeypatch.setattr(speculative, "allm_classify", async_classifier("safe", 0.2))
+
+    async def run():
+        turn = speculative.AsyncChatTurn(AMBIGUOUS_MESSAGE, Memory(), [])
+        assert await turn.verdict() == "safe"
+        return turn, await turn.reply()
+
+    start = time.perf_counter()
+    turn, reply = asyncio.run(run())
+    assert reply == "Use kill -9"
+    assert time.perf_counter() - start < 0.35
+    assert turn.saved_seconds > 0.1
+
+
+def test_async_harmful_turn_cancels_generation(monkeypatch):
+    closed = []
+    monkeypatch.setattr(speculative, "astream_claude", async_stream(["never ", "shown ", "text"], 0.05, closed))
+    monkeypatch.setattr(speculative, "allm_classify", async_classifier("harmful", 0.02))
+
+    async def run():
+        turn = speculative.AsyncChatTurn(AMBIGUOUS_MESSAGE, Memory(), [])
+        assert await turn.verdict() == "harmful"
+        chunks = [chunk async for chunk in turn.stream()]
+        await asyncio.sleep(0.15)
+        return chunks
+
+    assert asyncio.run(run()) == []
+    assert closed
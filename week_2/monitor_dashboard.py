@@ -1,9 +1,11 @@
 import streamlit as st
-import pandas as pd
-import time
 import os
+from streamlit_autorefresh import st_autorefresh
 
-LOG_FILE = "pipeline.log" 
+from pipeline.dashboard_data import call_metrics, log_store
+
+LOG_FILE = os.getenv("PIPELINE_LOG_FILE", "pipeline.jsonl")
+METRICS_FILE = os.getenv("PIPELINE_METRICS_FILE", "pipeline.metrics")
 
 st.set_page_config(page_title="Bedrock Pipeline Monitoring", layout="wide")
 st.title("🛠️ Bedrock Pipeline Monitoring Dashboard")
@@ -11,64 +13,54 @@ st.title("🛠️ Bedrock Pipeline Monitoring Dashboard")
 # Sidebar controls
 auto_refresh = st.sidebar.checkbox("Auto-refresh", value=True)
 refresh_interval = st.sidebar.slider("Refresh interval (seconds)", 2, 30, 5)
-
-# Helper to parse logs into a DataFrame
-def parse_logs(log_file):
-    if not os.path.exists(log_file):
-        return pd.DataFrame(columns=["Timestamp", "Level", "Message"])
-    rows = []
-    with open(log_file) as f:
-        for line in f:
-            if line.startswith("["):
-                try:
-                    level, rest = line[1:].split(" ", 1)
-                    timestamp, msg = rest.split("] ", 1)
-                    rows.append({
-                        "Timestamp": timestamp.strip(),
-                        "Level": level.strip(),
-                        "Message": msg.strip()
-                    })
-                except Exception:
-                    continue
-    return pd.DataFrame(rows)
+history_minutes = st.sidebar.slider("Chart history (minutes)", 10, 24 * 60, 120)
 
 # Main dashboard loop
 def dashboard():
-    log_df = parse_logs(LOG_FILE)
-    if log_df.empty:
+    store = log_store(LOG_FILE)
+    store.refresh()
+    counters = store.counters
+    if not counters["rows"]:
         st.warning("No logs found. Run the pipeline to generate logs.")
         return
 
     # Show summary metrics
     st.subheader("Summary Metrics")
     col1, col2, col3 = st.columns(3)
-    col1.metric("Total Requests", str(len(log_df[log_df['Message'].str.contains('Received prompt')])) )
-    col2.metric("Successes", str(len(log_df[log_df['Level']]=='SUCCESS')) )
-    col3.metric("Errors", str(len(log_df[log_df['Level']]=='ERROR')) )
+    col1.metric("Total Requests", counters["requests"])
+    col2.metric("Successes", counters["levels"].get("SUCCESS", 0))
+    col3.metric("Errors", counters["levels"].get("ERROR", 0))
+
+    # Per-minute aggregates, kept up to date by refresh()
+    series = store.timeseries(minutes=history_minutes)
+    if not series.empty:
+        st.subheader("Requests per Minute")
+        st.line_chart(series[["requests", "successes", "errors"]])
+        if series["avg_latency_ms"].notna().any():
+            st.subheader("Average Latency (ms)")
+            st.line_chart(series["avg_latency_ms"])
+
+    call_metrics(METRICS_FILE, history_minutes)
 
     # Show recent logs
     st.subheader("Recent Logs")
-    st.dataframe(log_df.tail(30).iloc[::-1], use_container_width=True)
+    st.dataframe(store.tail_rows(30).iloc[::-1], use_container_width=True)
 
     # Filter logs by level
     st.subheader("Log Level Filter")
-    level = st.selectbox("Select log level", ["ALL"] + sorted(log_df['Level'].unique()))
+    level = st.selectbox("Select log level", ["ALL"] + store.levels())
     if level != "ALL":
-        st.dataframe(log_df[log_df['Level'] == level].tail(100).iloc[::-1], use_container_width=True)
+        st.dataframe(store.tail_rows(100, level=level).iloc[::-1], use_container_width=True)
 
     # Error details
     st.subheader("Error Details")
-    error_logs = log_df[log_df['Level'] == 'ERROR']
+    error_logs = store.tail_rows(10, level='ERROR')
     if not error_logs.empty:
         st.write(error_logs[['Timestamp', 'Message']].tail(10))
     else:
         st.success("No errors detected!")
 
-# Auto-refresh logic
+# Auto-refresh reruns the script; the cached store makes each rerun cheap
 if auto_refresh:
-    while True:
-        dashboard()
-        time.sleep(refresh_interval)
-        st.experimental_rerun()
-else:
-    dashboard()
+    st_autorefresh(interval=refresh_interval * 1000, key="dashboard_autorefresh")
+dashboard()
@@ -0,0 +1,270 @@
+# pipeline/batch.py
+"""
+Batch mode for offline evaluation jobs: thousands of prompts instead of one.
+
+run_batch streams prompts from a JSONL file, answers them on a bounded worker pool
+with per-item retries (retryable errors only), and appends one result line per prompt to an output JSONL
+file as soon as it is ready. The output file is the checkpoint: after a crash,
+running the same command again skips every prompt that already has a result.
+A --retry-failed pass rewrites the file afterwards so each id keeps only its newest line.
+
+BedrockBatchJob submits the same input as a Bedrock batch inference job instead
+(S3 in, S3 out, about half the on-demand price, results within hours).
+
+Input lines are JSON objects. The prompt is taken from "prompt", "message" or
+"text", or from "title" + "body" (the requests.jsonl backlog format); the id from
+"id", "request_id" or "recordId", or the line number.
+"""
+
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from pipeline.bedrock_client import invoke_claude, single_attempt  # also puts the shared common/ package on sys.path
+from common.bedrock import DEFAULT_MODEL_ID, build_body, extract_text, get_client
+from common.resilience import Retry
+from pipeline.logger import log
+
+ID_FIELDS = ("id", "request_id", "recordId")
+PROMPT_FIELDS = ("prompt", "message", "text")
+
+
+def read_prompts(path):
+    """Yield (id, prompt) pairs from a JSONL file, one line at a time."""
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            item_id = next((str(record[k]) for k in ID_FIELDS if record.get(k) is not None), str(number))
+            prompt = next((record[k] for k in PROMPT_FIELDS if record.get(k)), None)
+            if prompt is None and record.get("body"):
+                prompt = f"{record['title']}\n\n{record['body']}" if record.get("title") else record["body"]
+            if prompt is None:
+                raise ValueError(f"{path}:{number}: no prompt field ({', '.join(PROMPT_FIELDS)} or body)")
+            yield item_id, prompt
+
+
+def load_checkpoint(output_path, retry_failed=False):
+    """
+    Ids that already have a result in output_path.
+
+    A line cut short by a crash is truncated away so appends start on a clean line.
+    Failed items count as done unless retry_failed is set.
+    """
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, "rb+") as f:
+        good = 0
+        for line in f:
+            try:
+                result = json.loads(line)
+            except ValueError:
+                break
+            if not line.endswith(b"\n"):
+                break
+            good += len(line)
+            if result.get("status") == "ok" or not retry_failed:
+                done.add(result["id"])
+        f.truncate(good)
+    return done
+
+
+def compact_results(output_path):
+    """
+    Rewrite output_path keeping only the last result line per id.
+
+    Retried failures are appended after the old failed line; this drops the superseded
+    lines. The file is rewritten through a temporary file and swapped in with os.replace,
+    so a crash midway leaves the previous file intact. Returns the number of lines dropped.
+    """
+    last = {}
+    with open(output_path, encoding="utf-8") as f:
+        for number, line in enumerate(f):
+            last[json.loads(line)["id"]] = number
+    dropped = 0
+    folder = os.path.dirname(os.path.abspath(output_path))
+    with open(output_path, encoding="utf-8") as f, tempfile.NamedTemporaryFile(
+            "w", encoding="utf-8", dir=folder, delete=False) as out:
+        for number, line in enumerate(f):
+            if last[json.loads(line)["id"]] == number:
+                out.write(line)
+            else:
+                dropped += 1
+    os.replace(out.name, output_path)
+    return dropped
+
+
+def answer(prompt, **params):
+    """One Claude call for one prompt; raises on failure so the item is retried."""
+    # Batch work queues behind interactive calls in the shared rate limiter
+    params.setdefault("priority", "batch")
+    response = invoke_claude([{"role": "user", "content": prompt}], **params)
+    if response.startswith("[ERROR]"):
+        raise RuntimeError(response)
+    return response
+
+
+def process_item(item_id, prompt, handler=answer, max_retries=3, delay=2.0):
+    """
+    Run handler(prompt), retrying retryable errors with jittered backoff (see
+    common/resilience.py); always returns a result record, never raises. Bedrock calls
+    inside make one botocore attempt each, so max_retries bounds the calls per prompt.
+    """
+    started = time.perf_counter()
+    attempts = 0
+
+    def attempt():
+        nonlocal attempts
+        attempts += 1
+        return handler(prompt)
+
+    with log.context(f"batch-{item_id}"), single_attempt():
+        try:
+            response = Retry(max_attempts=max_retries, base_delay=delay).call(attempt)
+            result = {"id": item_id, "status": "ok", "response": response}
+        except Exception as e:
+            result = {"id": item_id, "status": "failed", "error": str(e)}
+    result.update(attempts=attempts, latency_ms=round((time.perf_counter() - started) * 1000, 1))
+    return result
+
+
+def run_batch(input_path, output_path, workers=8, max_retries=3, delay=2.0, handler=answer,
+              retry_failed=False, progress_every=100):
+    """
+    Answer every prompt in input_path that has no result in output_path yet.
+
+    At most `workers` prompts are in flight and at most 2 * workers are read ahead,
+    so memory stays flat however long the input is. Results are appended (and flushed)
+    in completion order; with retry_failed the superseded failed lines are removed at the
+    end (see compact_results). Returns counts: {"ok", "failed", "skipped"}.
+    """
+    done = load_checkpoint(output_path, retry_failed)
+    counts = {"ok": 0, "failed": 0, "skipped": 0}
+    if done:
+        log.info(f"Resuming batch: {len(done)} prompts already answered in {output_path}")
+    started = time.perf_counter()
+
+    with open(output_path, "a", encoding="utf-8") as out, ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="batch") as pool:
+        pending = set()
+
+        def drain(return_when):
+            nonlocal pending
+            finished, pending = wait(pending, return_when=return_when)
+            for future in finished:
+                result = future.result()
+                out.write(json.dumps(result, ensure_ascii=False) + "\n")
+                counts[result["status"]] += 1
+                if result["status"] == "failed":
+                    log.error(f"Prompt {result['id']} failed after {result['attempts']} attempts: {result['error']}")
+                answered = counts["ok"] + counts["failed"]
+                if answered % progress_every == 0:
+                    rate = answered / (time.perf_counter() - started)
+                    log.info(f"Batch progress: {answered} answered ({counts['failed']} failed), {rate:.1f}/s")
+            out.flush()
+
+        for item_id, prompt in read_prompts(input_path):
+            if item_id in done:
+                counts["skipped"] += 1
+                continue
+            if len(pending) >= workers * 2:
+                drain(FIRST_COMPLETED)
+            pending.add(pool.submit(process_item, item_id, prompt, handler, max_retries, delay))
+        drain(ALL_COMPLETED)
+
+    if retry_failed:
+        dropped = compact_results(output_path)
+        if dropped:
+            log.info(f"Removed {dropped} superseded failed results from {output_path}")
+    log.success(f"Batch finished: {counts['ok']} ok, {counts['failed']} failed, "
+                f"{counts['skipped']} skipped (already done)")
+    return counts
+
+
+def split_s3_uri(uri):
+    bucket, _, key = uri[len("s3://"):].partition("/")
+    return bucket, key.rstrip("/")
+
+
+class BedrockBatchJob:
+    """
+    Bedrock batch inference (create_model_invocation_job) for a prompts JSONL file.
+
+    The service reads {"recordId", "modelInput"} lines from s3_input_uri and writes
+    {"recordId", "modelOutput" | "error"} lines under s3_output_uri/<job id>/. Bedrock
+    needs a service role (role_arn) that can read and write both locations, and jobs
+    need at least 100 records. Pass bedrock/s3 clients to use a stub in tests.
+    """
+
+    def __init__(self, s3_input_uri, s3_output_uri, role_arn, model_id=None, bedrock=None, s3=None,
+                 **params):
+        self.s3_input_uri = s3_input_uri
+        self.s3_output_uri = s3_output_uri
+        self.role_arn = role_arn
+        self.model_id = model_id or DEFAULT_MODEL_ID
+        self.params = params  # max_tokens, temperature, system, ...
+        self.bedrock = bedrock or get_client("bedrock")
+        self.s3 = s3 or get_client("s3")
+
+    def submit(self, input_path, job_name):
+        """Upload the prompts as batch records and start the job; returns the job ARN."""
+        bucket, key = split_s3_uri(self.s3_input_uri)
+        with tempfile.TemporaryFile("w+b") as records:
+            count = 0
+            for item_id, prompt in read_prompts(input_path):
+                body = build_body([{"role": "user", "content": prompt}], **self.params)
+                records.write(json.dumps({"recordId": item_id, "modelInput": body}).encode() + b"\n")
+                count += 1
+            records.seek(0)
+            self.s3.upload_fileobj(records, bucket, key)
+        response = self.bedrock.create_model_invocation_job(
+            jobName=job_name,
+            roleArn=self.role_arn,
+            modelId=self.model_id,
+            inputDataConfig={"s3InputDataConfig": {"s3Uri": self.s3_input_uri, "s3InputFormat": "JSONL"}},
+            outputDataConfig={"s3OutputDataConfig": {"s3Uri": self.s3_output_uri}}
+        )
+        log.info(f"Submitted batch job {job_name} with {count} prompts: {response['jobArn']}")
+        return response["jobArn"]
+
+    def status(self, job_arn):
+        return self.bedrock.get_model_invocation_job(jobIdentifier=job_arn)["status"]
+
+    def wait(self, job_arn, poll_seconds=60, timeout=None):
+        """Poll until the job leaves Submitted/Validating/Scheduled/InProgress; returns the final status."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            status = self.status(job_arn)
+            if status not in ("Submitted", "Validating", "Scheduled", "InProgress", "Stopping"):
+                return status
+            if deadline is not None and time.monotonic() > deadline:
+                raise TimeoutError(f"Batch job {job_arn} still {status} after {timeout}s")
+            time.sleep(poll_seconds)
+
+    def download(self, job_arn, output_path):
+        """Write the job's results to output_path in run_batch's result format; returns counts."""
+        bucket, prefix = split_s3_uri(self.s3_output_uri)
+        prefix = f"{prefix}/{job_arn.rsplit('/', 1)[-1]}/".lstrip("/")
+        counts = {"ok": 0, "failed": 0}
+        listing = self.s3.list_objects_v2(Bucket=bucket, Prefix=prefix)
+        with open(output_path, "a", encoding="utf-8") as out:
+            for obj in listing.get("Contents", []):
+                if not obj["Key"].endswith(".jsonl.out"):
+                    continue  # skips manifest.json.out
+                for line in self.s3.get_object(Bucket=bucket, Key=obj["Key"])["Body"].iter_lines():
+                    if not line:
+                        continue
+                    record = json.loads(line)
+                    if record.get("modelOutput"):
+                        result = {"id": record["recordId"], "status": "ok",
+                                  "response": extract_text(record["modelOutput"])}
+                    else:
+                        result = {"id": record["recordId"], "status": "failed",
+                                  "error": json.dumps(record.get("error"))}
+                    counts[result["status"]] += 1
+                    out.write(json.dumps(result, ensure_ascii=False) + "\n")
+        return counts
@@ -0,0 +1,49 @@
+# pipeline/dashboard_data.py
+"""
+Data sources and widgets shared by the Streamlit dashboards (monitor_dashboard.py and
+tests/monitor_dashboard.py).
+
+The log store and metrics reader are cached with st.cache_resource, so one instance
+per file is shared by every session and rerun, and each refresh reads only new lines.
+"""
+import os
+
+import streamlit as st
+
+from pipeline.logstore import LogStore
+from pipeline.metrics import MetricsReader
+
+
+# Parsed rows live in a store kept across reruns; each refresh parses only new lines
+@st.cache_resource
+def log_store(log_file):
+    return LogStore(log_file, store_dir=os.getenv("DASHBOARD_STORE_DIR") or None)
+
+
+@st.cache_resource
+def metrics_reader(metrics_file):
+    return MetricsReader(metrics_file)
+
+
+def call_metrics(metrics_file, minutes):
+    """Per-call latency and tokens recorded by the orchestrator (pipeline/metrics.py), over the last `minutes`."""
+    reader = metrics_reader(metrics_file)
+    reader.refresh()
+    if not len(reader.records):
+        return
+    st.subheader("Latency & Throughput")
+    summary = reader.summary(minutes=minutes)
+    cols = st.columns(5)
+    cols[0].metric("Calls", summary["calls"])
+    for col, p in zip(cols[1:4], (50, 95, 99)):
+        value = summary[f"wall_p{p}_ms"]
+        col.metric(f"p{p} latency", f"{value:.0f} ms" if value is not None else "N/A")
+    tokens = summary["output_tokens_per_sec"]
+    cols[4].metric("Output tokens/sec", f"{tokens:.1f}" if tokens is not None else "N/A")
+    ttfb = summary["ttfb_p50_ms"]
+    st.caption(f"Median time to first byte: {f'{ttfb:.0f} ms' if ttfb is not None else 'N/A'}, "
+               f"retries: {summary['retries']}, failed calls: {summary['errors']}")
+    series = reader.timeseries(minutes=minutes)
+    st.line_chart(series[["p50_ms", "p95_ms", "p99_ms"]])
+    st.line_chart(series[["input_tokens_per_sec", "output_tokens_per_sec"]])
+    st.bar_chart(reader.histogram(minutes=minutes))
@@ -1,12 +1,69 @@
 # pipeline/logger.py
+"""
+Pipeline logging: log.info / log.error / log.success.
+
+Every record goes to a JSON-lines file (PIPELINE_LOG_FILE, default pipeline.jsonl)
+through a background writer thread (see common/jsonlog.py), rotated at
+PIPELINE_LOG_MAX_BYTES (default 50 MB, PIPELINE_LOG_BACKUPS files kept) or on a
+schedule with PIPELINE_LOG_ROTATE (e.g. "midnight"). PIPELINE_LOG_SAMPLE keeps that
+fraction of INFO records (default 1.0); errors and successes are always kept.
+
+The colored console echo is for people watching the interactive pipeline. It is
+another handler on the same writer thread, so callers never wait on the terminal;
+set PIPELINE_LOG_CONSOLE=off for batch jobs and services.
+"""
+import logging
+import os
+
 from rich.console import Console
 from datetime import datetime
 
+import pipeline.bedrock_client  # also puts the shared common/ package on sys.path
+from common.jsonlog import get_logger, request_context
+
+SUCCESS = 25  # between INFO and WARNING
+logging.addLevelName(SUCCESS, "SUCCESS")
+
 console = Console()
+STYLES = {logging.ERROR: "bold red", SUCCESS: "bold green"}
+
+class ConsoleHandler(logging.Handler):
+    """Colored echo of each record; runs on the log writer thread, not the caller's."""
+
+    def emit(self, record):
+        try:
+            stamp = datetime.fromtimestamp(record.created)
+            console.log(f"[{record.levelname} {stamp}] {record.getMessage()}", style=STYLES.get(record.levelno))
+        except Exception:
+            self.handleError(record)
 
 class Logger:
-    def info(self, msg): console.log(f"[INFO {datetime.now()}] {msg}")
-    def error(self, msg): console.log(f"[ERROR {datetime.now()}] {msg}", style="bold red")
-    def success(self, msg): console.log(f"[SUCCESS {datetime.now()}] {msg}", style="bold green")
+    def __init__(self, name="pipeline", path=None, console_echo=None, sample_rate=None):
+        rotate = os.getenv("PIPELINE_LOG_ROTATE")
+        if sample_rate is None:
+            sample_rate = float(os.getenv("PIPELINE_LOG_SAMPLE", "1.0"))
+        if console_echo is None:
+            console_echo = os.getenv("PIPELINE_LOG_CONSOLE", "on").lower() not in ("off", "false", "0")
+        self.console_echo = console_echo
+        # Sampled once in the queue handler, so the console shows what the file keeps
+        self.logger = get_logger(
+            name,
+            path=path or os.getenv("PIPELINE_LOG_FILE", "pipeline.jsonl"),
+            sample_rate=sample_rate,
+            max_bytes=int(os.getenv("PIPELINE_LOG_MAX_BYTES", str(50 * 1024 * 1024))),
+            backup_count=int(os.getenv("PIPELINE_LOG_BACKUPS", "5")),
+            when=rotate or None,
+            handlers=[ConsoleHandler()] if console_echo else []
+        )
+
+    def _log(self, level, msg, **fields):
+        self.logger.log(level, msg, extra=fields)
+
+    def info(self, msg, **fields): self._log(logging.INFO, msg, **fields)
+    def error(self, msg, **fields): self._log(logging.ERROR, msg, **fields)
+    def success(self, msg, **fields): self._log(SUCCESS, msg, **fields)
+
+    # Per-request correlation id: every record logged inside carries it as request_id
+    context = staticmethod(request_context)
 
 log = Logger()
@@ -0,0 +1,357 @@
+# pipeline/logstore.py
+"""
+Incremental log ingestion for the monitoring dashboard.
+
+LogTail remembers the byte offset and inode of the log file, so each refresh reads
+only what was appended since the last one. When the file is rotated (new inode) the
+rest of the old file is drained before the new one is read from the start; when it
+is truncated in place it starts over.
+
+LogStore parses each block of new lines in one go rather than line by line: JSON
+records through pyarrow's JSON reader, legacy "[LEVEL timestamp] message" lines
+with one regex over the whole column. The rows are kept as columnar segments
+(pyarrow tables), and per-minute buckets of requests, successes, errors and
+latency are aggregated as each block arrives, so dashboard widgets read the
+aggregates and the newest rows instead of rescanning every row. Only the newest
+window_rows rows stay in memory; the aggregates cover the whole log. With store_dir
+set, sealed segments are written as Parquet files with the read position, older
+rows are read back from them on demand, and a restarted dashboard picks up from
+there instead of re-parsing the whole log.
+"""
+
+import io
+import itertools
+import json
+import os
+import threading
+from collections import deque
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.json as pa_json
+import pyarrow.parquet as pq
+
+COLUMNS = ["Timestamp", "Level", "Message"]
+SCHEMA = pa.schema([(name, pa.string()) for name in COLUMNS] + [("latency_ms", pa.float64())])
+CHUNK_BYTES = 8 * 1024 * 1024
+RECENT_PER_LEVEL = 100  # newest rows kept per level, so level views never scan the segments
+
+# The fields of a pipeline/logger.py record the dashboard uses; other fields are skipped while parsing
+JSON_SCHEMA = pa.schema([("ts", pa.string()), ("level", pa.string()), ("msg", pa.string()),
+                         ("latency_ms", pa.float64())])
+JSON_OPTIONS = pa_json.ParseOptions(explicit_schema=JSON_SCHEMA, unexpected_field_behavior="ignore")
+LEGACY_RE = r"^\[(?P<Level>\S+)\s+(?P<Timestamp>.*?)\s*\] (?P<Message>.*?)\s*$"
+BUCKET_FIELDS = ["requests", "successes", "errors", "latency_ms_sum", "latency_count"]
+
+
+def parse_line(line):
+    """(timestamp, level, message, latency_ms) from one JSON or legacy line, or None."""
+    if line.startswith("{"):
+        try:
+            record = json.loads(line)
+            latency = record.get("latency_ms")
+            return (str(record["ts"]), str(record["level"]), str(record["msg"]),
+                    float(latency) if isinstance(latency, (int, float)) else None)
+        except (ValueError, KeyError, TypeError, AttributeError):
+            return None
+    if line.startswith("["):
+        try:
+            level, rest = line[1:].split(" ", 1)
+            timestamp, msg = rest.split("] ", 1)
+            return timestamp.strip(), level.strip(), msg.strip(), None
+        except ValueError:
+            return None
+    return None
+
+
+def _table(rows):
+    columns = list(zip(*rows)) if rows else [[], [], [], []]
+    return pa.Table.from_arrays([pa.array(col, field.type) for col, field in zip(columns, SCHEMA)], schema=SCHEMA)
+
+
+def _from_json(table):
+    table = table.rename_columns(SCHEMA.names)
+    valid = pc.and_(pc.and_(pc.is_valid(table["Timestamp"]), pc.is_valid(table["Level"])),
+                    pc.is_valid(table["Message"]))
+    return table.filter(valid)
+
+
+def _parse_json(lines):
+    """JSON lines (a string array) as a table; falls back to json.loads per line if the reader rejects any."""
+    data = pc.binary_join(pa.ListArray.from_arrays([0, len(lines)], lines), "\n")[0].as_py()
+    try:
+        return _from_json(pa_json.read_json(io.BytesIO(data.encode()), parse_options=JSON_OPTIONS))
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return _table([row for row in map(parse_line, lines.to_pylist()) if row is not None])
+
+
+def _parse_legacy(lines):
+    """Legacy lines as a table, and which of them matched."""
+    parsed = pc.extract_regex(lines, LEGACY_RE)
+    matched = pc.is_valid(parsed)
+    parsed = parsed.filter(matched)
+    columns = [parsed.field(name) for name in COLUMNS] + [pa.nulls(len(parsed), pa.float64())]
+    return pa.Table.from_arrays(columns, schema=SCHEMA), matched
+
+
+def parse_block(data: bytes) -> pa.Table:
+    """Parse a block of complete lines into a table with SCHEMA, in file order; unparseable lines are dropped."""
+    if data.isspace():
+        return _table([])
+    if data[:256].lstrip().startswith(b"{"):
+        # The common case, a JSON-lines log: the whole block goes through the reader at once
+        try:
+            return _from_json(pa_json.read_json(io.BytesIO(data), parse_options=JSON_OPTIONS))
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            pass  # a legacy or malformed line in the block
+    lines = pa.array(data.decode("utf-8", errors="replace").splitlines(), pa.string())
+    is_json = pc.starts_with(lines, "{")
+    json_lines, legacy_lines = lines.filter(is_json), lines.filter(pc.invert(is_json))
+    if not len(json_lines):
+        return _parse_legacy(legacy_lines)[0]
+    if not len(legacy_lines):
+        return _parse_json(json_lines)
+    # Mixed block (a legacy log being migrated): parse each kind, then restore file order
+    json_table = _parse_json(json_lines)
+    if json_table.num_rows != len(json_lines):
+        # Bad JSON lines were dropped, so positions no longer line up; parse the block line by line
+        return _table([row for row in map(parse_line, lines.to_pylist()) if row is not None])
+    legacy_table, matched = _parse_legacy(legacy_lines)
+    order = pa.array(range(len(lines)), pa.int64())
+    positions = pa.concat_arrays([order.filter(is_json), order.filter(pc.invert(is_json)).filter(matched)])
+    return pa.concat_tables([json_table, legacy_table]).take(pc.sort_indices(positions))
+
+
+class LogTail:
+    """Yields blocks of complete new lines (bytes) appended to `path` since the last read."""
+
+    def __init__(self, path, offset=0, inode=None):
+        self.path = path
+        self.offset = offset  # end of the last complete line read
+        self.inode = inode
+        self._file = None
+        self._partial = b""
+
+    def _open(self):
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            return False
+        inode = os.fstat(f.fileno()).st_ino
+        if inode != self.inode or os.fstat(f.fileno()).st_size < self.offset:
+            self.offset = 0  # a different file than the saved position refers to
+        self.inode = inode
+        f.seek(self.offset)
+        self._file = f
+        self._partial = b""
+        return True
+
+    def _drain(self):
+        while True:
+            data = self._file.read(CHUNK_BYTES)
+            if not data:
+                return
+            data = self._partial + data
+            end = data.rfind(b"\n") + 1
+            self._partial = data[end:]
+            if end:
+                self.offset += end
+                yield data[:end]
+
+    def read_batches(self):
+        if self._file is None and not self._open():
+            return
+        yield from self._drain()
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return  # rotated away and not recreated yet; keep the old handle
+        if stat.st_ino != self.inode:
+            # Rotated: the old file is fully read, continue with the new one
+            self._file.close()
+            self.inode, self.offset = None, 0
+            if self._open():
+                yield from self._drain()
+        elif stat.st_size < self.offset + len(self._partial):
+            # Truncated in place (copytruncate)
+            self._file.seek(0)
+            self.offset, self._partial = 0, b""
+            yield from self._drain()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class LogStore:
+    """Parsed log rows as columnar segments plus aggregates, updated incrementally by refresh()."""
+
+    def __init__(self, path, store_dir=None, segment_rows=50_000, window_rows=100_000):
+        self.path = path
+        self.store_dir = store_dir
+        self.segment_rows = segment_rows
+        self.window_rows = window_rows
+        self.segments = []   # the newest sealed pyarrow tables (at least window_rows rows), oldest first
+        self._evicted = 0    # older sealed segments, dropped from memory (still on disk with store_dir)
+        self._pending = []   # parsed blocks not sealed yet
+        self._pending_rows = 0
+        self.counters = {"rows": 0, "levels": {}, "requests": 0, "responses": 0, "response_chars": 0,
+                         "last": {}}
+        self.buckets = {}    # "YYYY-MM-DDTHH:MM" -> [requests, successes, errors, latency_ms_sum, latency_count]
+        self.recent = {}     # level -> deque of the newest rows
+        self._lock = threading.Lock()  # one store is shared by every dashboard session
+        offset, inode = 0, None
+        if store_dir:
+            os.makedirs(store_dir, exist_ok=True)
+            offset, inode = self._load()
+        self.tail = LogTail(path, offset, inode)
+
+    def _state_path(self):
+        return os.path.join(self.store_dir, "state.json")
+
+    def _segment_path(self, index):
+        return os.path.join(self.store_dir, f"segment-{index:05d}.parquet")
+
+    def _load(self):
+        try:
+            with open(self._state_path()) as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return 0, None
+        if state.get("path") != os.path.abspath(self.path) or "buckets" not in state:
+            return 0, None
+        self.counters = state["counters"]
+        self.buckets = state["buckets"]
+        self.recent = {level: deque(map(tuple, rows), maxlen=RECENT_PER_LEVEL) for level, rows in state["recent"].items()}
+        # Only the newest segments are loaded; older ones are read on demand by tail_rows
+        self._evicted, kept = len(state["segments"]), 0
+        while self._evicted and kept < self.window_rows:
+            self._evicted -= 1
+            self.segments.insert(0, pq.read_table(self._segment_path(self._evicted), memory_map=True))
+            kept += self.segments[0].num_rows
+        return state["offset"], state["inode"]
+
+    def _save(self, sealed_offset):
+        state = {
+            "path": os.path.abspath(self.path),
+            "offset": sealed_offset,
+            "inode": self.tail.inode,
+            "counters": self.counters,
+            "buckets": self.buckets,
+            "recent": {level: list(rows) for level, rows in self.recent.items()},
+            "segments": [f"segment-{i:05d}.parquet" for i in range(self._evicted + len(self.segments))],
+        }
+        tmp = self._state_path() + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp, self._state_path())
+
+    def _aggregate(self, table):
+        """Fold a parsed block into the counters, the minute buckets and the per-level recent rows."""
+        c = self.counters
+        level, msg = table["Level"], table["Message"]
+        is_response = pc.starts_with(msg, "Response:")
+        c["rows"] += table.num_rows
+        c["responses"] += pc.sum(is_response).as_py() or 0
+        c["response_chars"] += pc.sum(pc.utf8_length(msg.filter(is_response))).as_py() or 0
+
+        flags = pa.table({
+            "bucket": pc.replace_substring(pc.utf8_slice_codeunits(table["Timestamp"], 0, 16), " ", "T"),
+            "requests": pc.match_substring(msg, "Received prompt"),
+            "successes": pc.equal(level, "SUCCESS"),
+            "errors": pc.equal(level, "ERROR"),
+            "latency_ms": table["latency_ms"],
+        })
+        c["requests"] += pc.sum(flags["requests"]).as_py() or 0
+        grouped = flags.group_by("bucket").aggregate(
+            [("requests", "sum"), ("successes", "sum"), ("errors", "sum"), ("latency_ms", "sum"),
+             ("latency_ms", "count")])
+        for row in grouped.to_pylist():
+            bucket = self.buckets.setdefault(row["bucket"], [0, 0, 0, 0.0, 0])
+            bucket[0] += row["requests_sum"] or 0
+            bucket[1] += row["successes_sum"] or 0
+            bucket[2] += row["errors_sum"] or 0
+            bucket[3] += row["latency_ms_sum"] or 0.0
+            bucket[4] += row["latency_ms_count"]
+
+        by_level = pa.table({"Level": level, "Timestamp": table["Timestamp"]}).group_by("Level").aggregate(
+            [("Level", "count"), ("Timestamp", "max")])
+        for row in by_level.to_pylist():
+            name = row["Level"]
+            c["levels"][name] = c["levels"].get(name, 0) + row["Level_count"]
+            c["last"][name] = max(c["last"].get(name, ""), row["Timestamp_max"])
+            newest = table.filter(pc.equal(level, name))
+            newest = newest.slice(max(0, newest.num_rows - RECENT_PER_LEVEL))
+            recent = self.recent.get(name)
+            if recent is None:
+                recent = self.recent[name] = deque(maxlen=RECENT_PER_LEVEL)
+            recent.extend(zip(*(newest[column].to_pylist() for column in SCHEMA.names)))
+
+    def refresh(self) -> int:
+        """Parse what was appended since the last refresh; returns the number of new rows."""
+        added = 0
+        with self._lock:
+            for block in self.tail.read_batches():
+                table = parse_block(block)
+                if table.num_rows:
+                    self._pending.append(table)
+                    self._pending_rows += table.num_rows
+                    self._aggregate(table)
+                    added += table.num_rows
+                # Whole read blocks are sealed, so the saved offset always ends a segment
+                if self._pending_rows >= self.segment_rows:
+                    self._seal()
+        return added
+
+    def _seal(self):
+        table = pa.concat_tables(self._pending).combine_chunks()
+        self._pending, self._pending_rows = [], 0
+        self.segments.append(table)
+        if self.store_dir:
+            # Everything up to the tail's offset is now in a segment (the partial line is not)
+            pq.write_table(table, self._segment_path(self._evicted + len(self.segments) - 1))
+        kept = sum(segment.num_rows for segment in self.segments)
+        while kept - self.segments[0].num_rows >= self.window_rows:
+            kept -= self.segments.pop(0).num_rows
+            self._evicted += 1
+        if self.store_dir:
+            self._save(self.tail.offset)
+
+    def tail_rows(self, n, level=None):
+        """
+        The newest n rows (of one level: at most RECENT_PER_LEVEL), oldest first, as a DataFrame.
+        Beyond the in-memory window rows come from the Parquet segments, or are gone without store_dir.
+        """
+        if level is not None:
+            return _table(list(self.recent.get(level, ()))[-n:]).select(COLUMNS).to_pandas()
+        parts, remaining = [], n
+        evicted = (pq.read_table(self._segment_path(i), memory_map=True)
+                   for i in range(self._evicted - 1, -1, -1)) if self.store_dir else ()
+        for table in itertools.chain(self._pending[::-1], self.segments[::-1], evicted):
+            if table.num_rows:
+                part = table.slice(max(0, table.num_rows - remaining))
+                parts.append(part)
+                remaining -= part.num_rows
+            if remaining <= 0:
+                break
+        if not parts:
+            return _table([]).select(COLUMNS).to_pandas()
+        return pa.concat_tables(parts[::-1]).select(COLUMNS).to_pandas()
+
+    def levels(self):
+        return sorted(self.counters["levels"])
+
+    def timeseries(self, minutes=None):
+        """
+        Per-minute requests, successes, errors and average latency (ms), oldest first and
+        indexed by time; only the newest `minutes` buckets when given.
+        """
+        keys = sorted(self.buckets)
+        if minutes:
+            keys = keys[-minutes:]
+        frame = pd.DataFrame([self.buckets[key] for key in keys], columns=BUCKET_FIELDS,
+                             index=pd.to_datetime(keys, format="%Y-%m-%dT%H:%M", errors="coerce"))
+        frame["avg_latency_ms"] = frame["latency_ms_sum"] / frame["latency_count"].where(frame["latency_count"] > 0)
+        return frame[frame.index.notna()].drop(columns=["latency_ms_sum", "latency_count"])
@@ -0,0 +1,170 @@
+# pipeline/metrics.py
+"""
+Per-request metrics for the pipeline: one fixed-width binary record per run_pipeline
+call (28 bytes), appended to PIPELINE_METRICS_FILE (default pipeline.metrics).
+
+Each record holds the time, wall time and time to first byte (ms), input and
+output tokens, retry count, success flag and model. Model ids are written once
+to a sidecar file (<path>.models) and referenced by line number; new ids are
+looked up and appended under an exclusive file lock, so two processes adding
+different ids can't claim the same line. Appends of a few bytes are atomic, so
+several pipeline processes can share the file while the dashboard reads it.
+
+MetricsReader tails the file the way pipeline/logstore.py tails the log: each
+refresh reads only the records appended since the last one, into a numpy array
+of at most max_records (the newest), so percentiles and throughput are computed
+over arrays rather than log text and memory stays flat as the file grows.
+"""
+
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # not on Windows; there a metrics file should have one writing process
+    fcntl = None
+
+RECORD = np.dtype([
+    ("ts", "<f8"),             # unix time the call finished
+    ("wall_ms", "<f4"),        # whole run_pipeline call, retries included
+    ("ttfb_ms", "<f4"),        # last attempt: send to first byte; NaN if answered from cache
+    ("input_tokens", "<u4"),
+    ("output_tokens", "<u4"),
+    ("retries", "<u1"),
+    ("ok", "<u1"),
+    ("model", "<u2"),          # line number in <path>.models
+])
+PERCENTILES = (50, 95, 99)
+
+
+class MetricsStore:
+    """Appends metric records; shared by every pipeline call in the process."""
+
+    def __init__(self, path):
+        self.path = path
+        self.models_path = path + ".models"
+        self._lock = threading.Lock()
+        self._models = {}
+        if os.path.exists(self.models_path):
+            with open(self.models_path) as f:
+                for index, name in enumerate(f.read().splitlines()):
+                    self._models.setdefault(name, index)
+        self._fd = None
+
+    def _model_index(self, model_id):
+        index = self._models.get(model_id)
+        if index is None:
+            # Read and append under one lock: other processes may be adding their own ids
+            with open(self.models_path, "a+") as f:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_EX)
+                f.seek(0)
+                names = f.read().splitlines()
+                if model_id not in names:
+                    f.write(model_id + "\n")
+                    names.append(model_id)
+                for number, name in enumerate(names):
+                    self._models.setdefault(name, number)
+            index = self._models[model_id]
+        return index
+
+    def record(self, wall_ms, ttfb_ms=None, input_tokens=0, output_tokens=0, retries=0, ok=True,
+               model_id="unknown", ts=None):
+        with self._lock:
+            row = np.array([(time.time() if ts is None else ts, wall_ms,
+                             np.nan if ttfb_ms is None else ttfb_ms, input_tokens, output_tokens,
+                             min(retries, 255), ok, self._model_index(model_id))], dtype=RECORD)
+            if self._fd is None:
+                self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            os.write(self._fd, row.tobytes())
+
+    def close(self):
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+
+class MetricsReader:
+    """Loads the newest records of a metrics file incrementally, for the dashboard."""
+
+    def __init__(self, path, max_records=500_000):
+        self.path = path
+        self.max_records = max_records  # 28 bytes each
+        self.offset = 0
+        self.records = np.empty(0, dtype=RECORD)
+        self.models = []
+        self._lock = threading.Lock()
+
+    def refresh(self) -> int:
+        """Read the records appended since the last refresh (keeping the newest max_records); returns how many."""
+        with self._lock:
+            try:
+                size = os.path.getsize(self.path)
+            except FileNotFoundError:
+                return 0
+            if size < self.offset:
+                # Rewritten: start over
+                self.offset, self.records = 0, np.empty(0, dtype=RECORD)
+            count = (size - self.offset) // RECORD.itemsize
+            if not count:
+                return 0
+            # Records that would fall out of the window right away are skipped, not read
+            skip = max(0, count - self.max_records)
+            new = np.fromfile(self.path, dtype=RECORD, count=count - skip, offset=self.offset + skip * RECORD.itemsize)
+            self.offset += count * RECORD.itemsize
+            older = self.records[max(0, len(self.records) + len(new) - self.max_records):]
+            self.records = np.concatenate([older, new])
+            if os.path.exists(self.path + ".models"):
+                with open(self.path + ".models") as f:
+                    self.models = f.read().splitlines()
+            return count
+
+    def frame(self, minutes=None) -> pd.DataFrame:
+        """The records (of the last `minutes`, when given) as a DataFrame with a time index and model names."""
+        records = self.records
+        if minutes and len(records):
+            records = records[records["ts"] >= records["ts"][-1] - minutes * 60]
+        frame = pd.DataFrame(records)
+        frame.index = pd.to_datetime(frame.pop("ts"), unit="s")
+        names = np.array(self.models + ["unknown"], dtype=object)
+        frame["model"] = names[np.minimum(frame["model"].to_numpy(), len(names) - 1)]
+        return frame
+
+    def summary(self, minutes=None) -> dict:
+        """Calls, errors, retries, p50/p95/p99 of wall time and TTFB (ms) and tokens per second."""
+        frame = self.frame(minutes)
+        summary = {"calls": len(frame), "errors": int((frame["ok"] == 0).sum()),
+                   "retries": int(frame["retries"].sum())}
+        for column in ("wall_ms", "ttfb_ms"):
+            values = frame[column].dropna().to_numpy()
+            for p in PERCENTILES:
+                summary[f"{column[:-3]}_p{p}_ms"] = float(np.percentile(values, p)) if len(values) else None
+        span = (frame.index[-1] - frame.index[0]).total_seconds() if len(frame) > 1 else 0
+        for column in ("input_tokens", "output_tokens"):
+            summary[f"{column}_per_sec"] = float(frame[column].sum() / span) if span else None
+        return summary
+
+    def timeseries(self, minutes=None, bucket="1min") -> pd.DataFrame:
+        """Per bucket: calls, p50/p95/p99 wall time (ms) and input/output tokens per second."""
+        frame = self.frame(minutes)
+        grouped = frame.resample(bucket)
+        series = pd.DataFrame({"calls": grouped["wall_ms"].count()})
+        for p in PERCENTILES:
+            series[f"p{p}_ms"] = grouped["wall_ms"].quantile(p / 100)
+        seconds = pd.Timedelta(bucket).total_seconds()
+        series["input_tokens_per_sec"] = grouped["input_tokens"].sum() / seconds
+        series["output_tokens_per_sec"] = grouped["output_tokens"].sum() / seconds
+        return series
+
+    def histogram(self, column="wall_ms", minutes=None, bins=30) -> pd.Series:
+        """Call counts per latency bin, indexed by the bin's upper edge in ms."""
+        values = self.frame(minutes)[column].dropna().to_numpy()
+        if not len(values):
+            return pd.Series(dtype="int64")
+        counts, edges = np.histogram(values, bins=bins)
+        return pd.Series(counts, index=np.round(edges[1:], 1), name="calls")
@@ -1,41 +1,95 @@
 # pipeline/orchestrator.py
-from pipeline.bedrock_client import invoke_claude
+from pipeline.bedrock_client import invoke_claude, last_call, single_attempt  # also puts the shared common/ package on sys.path
 from pipeline.logger import log
-import time
+from pipeline.metrics import MetricsStore
+from common.resilience import CircuitBreaker, CircuitOpenError, Retry, RetryBudget
 from functools import wraps
+import os
+import time
+
+# Shared by every pipeline call in the process: retries draw on one budget, and while
+# Bedrock keeps failing the breaker fails calls fast instead of queueing more retries
+retry_budget = RetryBudget(ratio=0.2, min_per_second=1.0, capacity=20)
+breaker = CircuitBreaker(failure_threshold=5, reset_timeout=30)
+# Wall time, TTFB, tokens, retries and model of every pipeline call, for the dashboard
+metrics = MetricsStore(os.getenv("PIPELINE_METRICS_FILE", "pipeline.metrics"))
+
+GIVE_UP_MESSAGES = {
+    "fatal": "Error is not retryable. Failing workflow.",
+    "gave_up": "Max retries reached. Failing workflow.",
+    "budget_exhausted": "Retry budget exhausted. Failing workflow."
+}
+
+def _log_retry(attempt, error, delay):
+    log.error(f"Attempt {attempt} failed: {error}")
+    log.info(f"Retrying in {delay:.2f} seconds...")
 
-# Retry decorator
-def retry_on_failure(max_retries=3, delay=2):
+def _log_give_up(attempt, error, reason):
+    log.error(f"Attempt {attempt} failed: {error}")
+    log.error(GIVE_UP_MESSAGES[reason])
+
+def _record_metrics(store, started, attempts, ok):
+    call = last_call.get() or {}
+    ttfb = call.get("ttfb")
+    store.record(
+        wall_ms=(time.perf_counter() - started) * 1000,
+        ttfb_ms=ttfb * 1000 if ttfb is not None else None,
+        input_tokens=call.get("input_tokens", 0),
+        output_tokens=call.get("output_tokens", 0),
+        retries=max(0, attempts - 1),
+        ok=ok,
+        model_id=call.get("model_id", "unknown")
+    )
+
+# Retry decorator: jittered exponential backoff (delay is the first step), retryable errors only.
+# botocore does not retry underneath, so max_retries is the most Bedrock calls a request makes.
+# With a metrics store, each call (all of its attempts together) is recorded in it.
+def retry_on_failure(max_retries=3, delay=2, max_delay=20, budget=retry_budget, breaker=breaker, metrics=None):
     def decorator(func):
+        policy = Retry(max_attempts=max_retries, base_delay=delay, max_delay=max_delay, budget=budget,
+                       breaker=breaker, on_retry=_log_retry, on_give_up=_log_give_up)
+
         @wraps(func)
         def wrapper(*args, **kwargs):
             attempts = 0
-            while attempts < max_retries:
+
+            def attempt():
+                nonlocal attempts
+                attempts += 1
+                return func(*args, **kwargs)
+
+            # One correlation id for the call and all of its retries (or the caller's, if set)
+            with log.context(), single_attempt():
+                last_call.set(None)
+                started = time.perf_counter()
+                ok = False
                 try:
-                    return func(*args, **kwargs)
-                except Exception as e:
-                    attempts += 1
-                    log.error(f"Attempt {attempts} failed: {e}")
-                    if attempts < max_retries:
-                        log.info(f"Retrying in {delay} seconds...")
-                        time.sleep(delay)
-                    else:
-                        log.error("Max retries reached. Failing workflow.")
-                        raise
+                    result = policy.call(attempt)
+                    ok = True
+                    return result
+                except CircuitOpenError as e:
+                    log.error(f"{e}. Failing workflow.")
+                    raise
+                finally:
+                    if wrapper.metrics is not None:
+                        _record_metrics(wrapper.metrics, started, attempts, ok)
+        wrapper.retry_policy = policy  # stats() for monitoring
+        wrapper.metrics = metrics
         return wrapper
     return decorator
 
-@retry_on_failure(max_retries=3, delay=2)
+@retry_on_failure(max_retries=3, delay=2, metrics=metrics)
 def run_pipeline(prompt: str):
     log.info(f"Received prompt: {prompt}")
 
     messages = [{"role": "user", "content": prompt}]
+    start = time.perf_counter()
     response = invoke_claude(messages)
     if response.startswith("[ERROR]"):
         log.error(response)
         raise Exception(response)
 
-    log.success("Claude responded successfully")
+    log.success("Claude responded successfully", latency_ms=round((time.perf_counter() - start) * 1000, 1))
     log.info(f"Response: {response}")
 
     return response
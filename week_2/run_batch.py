@@ -0,0 +1,39 @@
+# run_batch.py
+"""
+Answer a JSONL file of prompts in batch (see pipeline/batch.py).
+
+    python run_batch.py prompts.jsonl results.jsonl --workers 8
+    python run_batch.py prompts.jsonl results.jsonl --bedrock-job eval-1 \\
+        --s3-input s3://bucket/batch/in.jsonl --s3-output s3://bucket/batch/out/ --role-arn arn:aws:iam::...
+
+Re-running the first form after a crash picks up where it stopped.
+"""
+import argparse
+
+from pipeline.batch import BedrockBatchJob, run_batch
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("input", help="JSONL prompts")
+    parser.add_argument("output", help="JSONL results (also the resume checkpoint)")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--max-retries", type=int, default=3)
+    parser.add_argument("--retry-failed", action="store_true", help="re-run prompts that failed last time")
+    parser.add_argument("--bedrock-job", metavar="JOB_NAME", help="submit a Bedrock batch inference job instead")
+    parser.add_argument("--s3-input")
+    parser.add_argument("--s3-output")
+    parser.add_argument("--role-arn")
+    args = parser.parse_args()
+
+    if args.bedrock_job:
+        if not (args.s3_input and args.s3_output and args.role_arn):
+            parser.error("--bedrock-job needs --s3-input, --s3-output and --role-arn")
+        job = BedrockBatchJob(args.s3_input, args.s3_output, args.role_arn)
+        job_arn = job.submit(args.input, args.bedrock_job)
+        status = job.wait(job_arn)
+        print(f"Job {job_arn} finished: {status}")
+        if status in ("Completed", "PartiallyCompleted"):
+            print(job.download(job_arn, args.output))
+    else:
+        run_batch(args.input, args.output, workers=args.workers, max_retries=args.max_retries,
+                  retry_failed=args.retry_failed)
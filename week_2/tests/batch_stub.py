@@ -0,0 +1,67 @@
+"""
+Local stand-in for Bedrock batch inference used by the batch tests.
+
+StubS3 keeps objects in a dict; StubBedrock "runs" a model invocation job the moment
+it is created by answering each input record with reply(prompt), and writes the
+output file where Bedrock would put it, so BedrockBatchJob runs end to end without AWS.
+"""
+
+import io
+import json
+
+
+class _Body:
+    def __init__(self, data):
+        self._data = data
+
+    def iter_lines(self):
+        return iter(self._data.splitlines())
+
+
+class StubS3:
+    def __init__(self):
+        self.objects = {}
+
+    def upload_fileobj(self, fileobj, bucket, key):
+        self.objects[(bucket, key)] = fileobj.read()
+
+    def put_object(self, Bucket, Key, Body):
+        self.objects[(Bucket, Key)] = Body
+
+    def get_object(self, Bucket, Key):
+        return {"Body": _Body(self.objects[(Bucket, Key)])}
+
+    def list_objects_v2(self, Bucket, Prefix=""):
+        keys = sorted(k for b, k in self.objects if b == Bucket and k.startswith(Prefix))
+        return {"Contents": [{"Key": k} for k in keys]}
+
+
+class StubBedrock:
+    def __init__(self, s3, reply=lambda prompt: f"echo: {prompt}"):
+        self.s3 = s3
+        self.reply = reply
+        self.jobs = {}
+
+    def create_model_invocation_job(self, jobName, roleArn, modelId, inputDataConfig, outputDataConfig):
+        job_arn = f"arn:aws:bedrock:us-east-2:000000000000:model-invocation-job/{jobName}-id"
+        in_bucket, _, in_key = inputDataConfig["s3InputDataConfig"]["s3Uri"][5:].partition("/")
+        out_bucket, _, out_prefix = outputDataConfig["s3OutputDataConfig"]["s3Uri"][5:].partition("/")
+        out = io.BytesIO()
+        for line in self.s3.get_object(Bucket=in_bucket, Key=in_key)["Body"].iter_lines():
+            record = json.loads(line)
+            prompt = record["modelInput"]["messages"][-1]["content"]
+            try:
+                text = self.reply(prompt)
+                record["modelOutput"] = {"content": [{"type": "text", "text": text}]}
+            except Exception as e:
+                record["error"] = {"errorCode": 400, "errorMessage": str(e)}
+            out.write(json.dumps(record).encode() + b"\n")
+        prefix = f"{out_prefix.rstrip('/')}/{job_arn.rsplit('/', 1)[-1]}/".lstrip("/")
+        name = in_key.rsplit("/", 1)[-1]
+        self.s3.put_object(Bucket=out_bucket, Key=f"{prefix}{name}.out", Body=out.getvalue())
+        self.s3.put_object(Bucket=out_bucket, Key=f"{prefix}manifest.json.out", Body=b"{}")
+        self.jobs[job_arn] = {"status": "Completed", "modelId": modelId, "roleArn": roleArn}
+        return {"jobArn": job_arn}
+
+    def get_model_invocation_job(self, jobIdentifier):
+        return self.jobs[jobIdentifier]
@@ -2,12 +2,13 @@ import streamlit as st
 import pandas as pd
 import os
 from streamlit_autorefresh import st_autorefresh
-import time
 import sys
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from pipeline.orchestrator import run_pipeline  
+from pipeline.dashboard_data import call_metrics, log_store
 
-LOG_FILE = os.path.abspath(os.path.join(os.path.dirname(__file__), '../pipeline.log'))
+LOG_FILE = os.getenv("PIPELINE_LOG_FILE", os.path.abspath(os.path.join(os.path.dirname(__file__), '../pipeline.jsonl')))
+METRICS_FILE = os.getenv("PIPELINE_METRICS_FILE", os.path.abspath(os.path.join(os.path.dirname(__file__), '../pipeline.metrics')))
 
 st.set_page_config(page_title="Bedrock Pipeline Monitoring", layout="wide")
 st.title("Bedrock Pipeline Monitoring Dashboard")
@@ -15,26 +16,7 @@ st.title("Bedrock Pipeline Monitoring Dashboard")
 # Sidebar controls
 auto_refresh = st.sidebar.checkbox("Auto-refresh", value=True)
 refresh_interval = st.sidebar.slider("Refresh interval (seconds)", 2, 30, 5)
-
-# Helper to parse logs into a DataFrame
-def parse_logs(log_file):
-    if not os.path.exists(log_file):
-        return pd.DataFrame(columns=["Timestamp", "Level", "Message"])
-    rows = []
-    with open(log_file) as f:
-        for line in f:
-            if line.startswith("["):
-                try:
-                    level, rest = line[1:].split(" ", 1)
-                    timestamp, msg = rest.split("] ", 1)
-                    rows.append({
-                        "Timestamp": timestamp.strip(),
-                        "Level": level.strip(),
-                        "Message": msg.strip()
-                    })
-                except Exception:
-                    continue
-    return pd.DataFrame(rows)
+history_minutes = st.sidebar.slider("Chart history (minutes)", 10, 24 * 60, 120)
 
 # Main dashboard logic
 def dashboard():
@@ -66,19 +48,21 @@ def dashboard():
         hist_df = pd.DataFrame(st.session_state['history'])
         st.dataframe(hist_df.iloc[::-1], use_container_width=True)
 
-    log_df = parse_logs(LOG_FILE)
-    if log_df.empty:
+    store = log_store(LOG_FILE)
+    store.refresh()
+    counters = store.counters
+    if not counters["rows"]:
         st.warning("No logs found. Run the pipeline to generate logs.")
         return
 
     # Enhanced summary metrics
     st.subheader("Summary Metrics")
-    total_requests = len(log_df[log_df['Message'].str.contains('Received prompt')])
-    successes = (log_df['Level'] == 'SUCCESS').sum()
-    errors = (log_df['Level'] == 'ERROR').sum()
-    last_success = log_df[log_df['Level']=='SUCCESS']['Timestamp'].max() if not log_df[log_df['Level']=='SUCCESS'].empty else 'N/A'
-    last_error = log_df[log_df['Level']=='ERROR']['Timestamp'].max() if not log_df[log_df['Level']=='ERROR'].empty else 'N/A'
-    avg_response_len = int(log_df[log_df['Message'].str.contains('Response:')]['Message'].str.len().mean() or 0)
+    total_requests = counters["requests"]
+    successes = counters["levels"].get("SUCCESS", 0)
+    errors = counters["levels"].get("ERROR", 0)
+    last_success = counters["last"].get("SUCCESS", "N/A")
+    last_error = counters["last"].get("ERROR", "N/A")
+    avg_response_len = counters["response_chars"] // counters["responses"] if counters["responses"] else 0
 
     col1, col2, col3, col4, col5 = st.columns(5)
     col1.metric("Total Requests", total_requests)
@@ -88,19 +72,30 @@ def dashboard():
     col5.metric("Last Error", last_error)
     st.caption(f"Average Response Length: {avg_response_len} characters")
 
+    # Per-minute aggregates, kept up to date by refresh()
+    series = store.timeseries(minutes=history_minutes)
+    if not series.empty:
+        st.subheader("Requests per Minute")
+        st.line_chart(series[["requests", "successes", "errors"]])
+        if series["avg_latency_ms"].notna().any():
+            st.subheader("Average Latency (ms)")
+            st.line_chart(series["avg_latency_ms"])
+
+    call_metrics(METRICS_FILE, history_minutes)
+
     # Show recent logs
     st.subheader("Recent Logs")
-    st.dataframe(log_df.tail(30).iloc[::-1], use_container_width=True)
+    st.dataframe(store.tail_rows(30).iloc[::-1], use_container_width=True)
 
     # Filter logs by level
     st.subheader("Log Level Filter")
-    level = st.selectbox("Select log level", ["ALL"] + sorted(log_df['Level'].unique()))
+    level = st.selectbox("Select log level", ["ALL"] + store.levels())
     if level != "ALL":
-        st.dataframe(log_df[log_df['Level'] == level].tail(100).iloc[::-1], use_container_width=True)
+        st.dataframe(store.tail_rows(100, level=level).iloc[::-1], use_container_width=True)
 
     # Error details
     st.subheader("Error Details")
-    error_logs = log_df[log_df['Level'] == 'ERROR']
+    error_logs = store.tail_rows(10, level='ERROR')
     if not error_logs.empty:
         st.write(error_logs[['Timestamp', 'Message']].tail(10))
     else:
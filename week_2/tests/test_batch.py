@@ -0,0 +1,125 @@
+# tests/test_batch.py
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import json
+import threading
+import time
+
+from pipeline.batch import BedrockBatchJob, load_checkpoint, read_prompts, run_batch
+from batch_stub import StubBedrock, StubS3
+
+
+def write_jsonl(path, records):
+    path.write_text("".join(json.dumps(r) + "\n" for r in records))
+
+
+def read_results(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_read_prompts_accepts_backlog_format(tmp_path):
+    source = tmp_path / "requests.jsonl"
+    write_jsonl(source, [{"request_id": "r-1", "title": "Faster", "body": "Make it fast."},
+                         {"prompt": "Tell me a joke"}])
+    assert list(read_prompts(source)) == [("r-1", "Faster\n\nMake it fast."), ("2", "Tell me a joke")]
+
+
+def test_run_batch_answers_every_prompt_with_bounded_workers(tmp_path):
+    source, results = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    write_jsonl(source, [{"id": i, "prompt": f"p{i}"} for i in range(50)])
+    active, peak, lock = [0], [0], threading.Lock()
+
+    def handler(prompt):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.002)
+        with lock:
+            active[0] -= 1
+        return prompt.upper()
+
+    counts = run_batch(source, results, workers=4, handler=handler)
+    assert counts == {"ok": 50, "failed": 0, "skipped": 0}
+    assert peak[0] <= 4
+    assert sorted(r["response"] for r in read_results(results)) == sorted(f"P{i}" for i in range(50))
+
+
+def test_failed_items_are_retried_then_recorded(tmp_path):
+    source, results = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    write_jsonl(source, [{"id": "flaky", "prompt": "a"}, {"id": "broken", "prompt": "b"}])
+    calls = {"a": 0, "b": 0}
+
+    def handler(prompt):
+        calls[prompt] += 1
+        if prompt == "b" or calls["a"] < 2:
+            raise RuntimeError("ThrottlingException")
+        return "ok"
+
+    counts = run_batch(source, results, max_retries=3, delay=0, handler=handler)
+    assert counts == {"ok": 1, "failed": 1, "skipped": 0}
+    by_id = {r["id"]: r for r in read_results(results)}
+    assert by_id["flaky"]["attempts"] == 2
+    assert by_id["broken"]["status"] == "failed" and calls["b"] == 3
+
+
+def test_resume_skips_answered_prompts_and_drops_a_torn_line(tmp_path):
+    source, results = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    write_jsonl(source, [{"id": i, "prompt": f"p{i}"} for i in range(5)])
+    # A crash left two results and half of a third
+    results.write_text(json.dumps({"id": "0", "status": "ok", "response": "x"}) + "\n"
+                       + json.dumps({"id": "1", "status": "failed", "error": "boom"}) + "\n"
+                       + '{"id": "2", "sta')
+    assert load_checkpoint(results) == {"0", "1"}
+    seen = []
+    counts = run_batch(source, results, handler=lambda p: seen.append(p) or p, retry_failed=True)
+    assert sorted(seen) == ["p1", "p2", "p3", "p4"]
+    assert counts["skipped"] == 1
+    # Every line parses again, and the retried failure replaced its old line
+    assert sorted(r["id"] for r in read_results(results)) == ["0", "1", "2", "3", "4"]
+
+
+def test_retry_failed_keeps_one_line_per_id(tmp_path):
+    source, results = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    write_jsonl(source, [{"id": "a", "prompt": "a"}, {"id": "b", "prompt": "b"}])
+    run_batch(source, results, max_retries=1, delay=0, handler=lambda p: 1 / 0 if p == "b" else p)
+    counts = run_batch(source, results, delay=0, handler=str.upper, retry_failed=True)
+    assert counts == {"ok": 1, "failed": 0, "skipped": 1}
+    assert [(r["id"], r["status"]) for r in read_results(results)] == [("a", "ok"), ("b", "ok")]
+
+
+def test_bedrock_batch_job_round_trip_with_stub(tmp_path):
+    source, results = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    write_jsonl(source, [{"id": "a", "prompt": "hello"}, {"id": "b", "prompt": "fail"}])
+    s3 = StubS3()
+
+    def reply(prompt):
+        if prompt == "fail":
+            raise ValueError("bad input")
+        return prompt[::-1]
+
+    job = BedrockBatchJob("s3://bucket/batch/in.jsonl", "s3://bucket/batch/out/", "arn:aws:iam::0:role/batch",
+                          bedrock=StubBedrock(s3, reply), s3=s3, max_tokens=200)
+    job_arn = job.submit(source, "eval-1")
+    record = json.loads(s3.objects[("bucket", "batch/in.jsonl")].splitlines()[0])
+    assert record["recordId"] == "a" and record["modelInput"]["max_tokens"] == 200
+    assert job.wait(job_arn, poll_seconds=0) == "Completed"
+    assert job.download(job_arn, results) == {"ok": 1, "failed": 1}
+    by_id = {r["id"]: r for r in read_results(results)}
+    assert by_id["a"]["response"] == "olleh"
+    assert "bad input" in by_id["b"]["error"]
+
+
+def test_validation_errors_are_not_retried(tmp_path):
+    source, results = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    write_jsonl(source, [{"id": "bad", "prompt": "x"}])
+    calls = []
+
+    def handler(prompt):
+        calls.append(prompt)
+        raise RuntimeError("An error occurred (ValidationException) when calling the InvokeModel operation")
+
+    run_batch(source, results, delay=0, handler=handler)
+    assert calls == ["x"]
+    assert read_results(results)[0]["attempts"] == 1
@@ -0,0 +1,146 @@
+# tests/test_logstore.py
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import json
+
+from pipeline.logstore import LogStore, LogTail, parse_block, parse_line
+
+
+def record(level, msg, ts="2024-01-01T00:00:00", **fields):
+    return json.dumps({"ts": ts, "level": level, "logger": "pipeline", "msg": msg, **fields}) + "\n"
+
+
+def append(path, text):
+    with open(path, "a") as f:
+        f.write(text)
+
+
+def test_parse_line_reads_json_and_legacy_lines():
+    assert parse_line(record("ERROR", "boom")) == ("2024-01-01T00:00:00", "ERROR", "boom", None)
+    assert parse_line("[INFO 2024-01-01 10:00:00] Received prompt: hi") == \
+        ("2024-01-01 10:00:00", "INFO", "Received prompt: hi", None)
+    assert parse_line("garbage") is None
+
+
+def test_parse_block_matches_the_line_parser_in_file_order():
+    lines = [record("INFO", "Received prompt: a", latency_ms=12.5, attempt=1),
+             "[ERROR 2024-01-01 10:00:00] Claude invocation failed\n",
+             "not a log line\n",
+             record("SUCCESS", "done")]
+    for block in ("".join(lines), "".join(lines[:1] + lines[3:]), "".join(lines[1:3])):
+        expected = [row for row in map(parse_line, block.splitlines()) if row is not None]
+        assert [tuple(r.values()) for r in parse_block(block.encode()).to_pylist()] == expected
+
+    # A malformed JSON line is dropped without losing its neighbours
+    block = record("INFO", "a") + '{"ts": broken\n' + "[ERROR t] b\n"
+    assert [r["Message"] for r in parse_block(block.encode()).to_pylist()] == ["a", "b"]
+
+
+def test_refresh_parses_only_appended_lines(tmp_path):
+    log = tmp_path / "pipeline.jsonl"
+    append(log, record("INFO", "Received prompt: a") + record("SUCCESS", "done"))
+    store = LogStore(str(log))
+    assert store.refresh() == 2
+    assert store.refresh() == 0
+
+    append(log, record("ERROR", "boom"))
+    assert store.refresh() == 1
+    assert store.counters["levels"] == {"INFO": 1, "SUCCESS": 1, "ERROR": 1}
+    assert store.counters["requests"] == 1
+    assert list(store.tail_rows(2)["Message"]) == ["done", "boom"]
+    assert list(store.tail_rows(10, level="ERROR")["Message"]) == ["boom"]
+
+
+def test_partial_line_waits_for_its_newline(tmp_path):
+    log = tmp_path / "pipeline.jsonl"
+    line = record("INFO", "half written")
+    append(log, line[:20])
+    store = LogStore(str(log))
+    assert store.refresh() == 0
+    append(log, line[20:])
+    assert store.refresh() == 1
+    assert list(store.tail_rows(1)["Message"]) == ["half written"]
+
+
+def test_rotation_drains_old_file_then_reads_new_one(tmp_path):
+    log = tmp_path / "pipeline.jsonl"
+    append(log, record("INFO", "first"))
+    tail = LogTail(str(log))
+    assert b"".join(tail.read_batches()).decode() == record("INFO", "first")
+
+    append(log, record("INFO", "before rotation"))
+    os.rename(log, tmp_path / "pipeline.jsonl.1")
+    append(log, record("INFO", "after rotation"))
+    messages = [json.loads(line)["msg"] for line in b"".join(tail.read_batches()).decode().splitlines()]
+    assert messages == ["before rotation", "after rotation"]
+    tail.close()
+
+
+def test_truncation_starts_over(tmp_path):
+    log = tmp_path / "pipeline.jsonl"
+    append(log, record("INFO", "old") * 3)
+    store = LogStore(str(log))
+    assert store.refresh() == 3
+    log.write_text(record("ERROR", "new"))
+    assert store.refresh() == 1
+    assert list(store.tail_rows(1)["Message"]) == ["new"]
+
+
+def test_sealed_segments_persist_and_resume(tmp_path):
+    log, store_dir = tmp_path / "pipeline.jsonl", tmp_path / "store"
+    append(log, "".join(record("INFO", f"m{i}") for i in range(5)))
+    store = LogStore(str(log), store_dir=str(store_dir), segment_rows=4)
+    assert store.refresh() == 5
+    assert len(store.segments) == 1
+    assert len(list(store_dir.glob("segment-*.parquet"))) == 1
+    store.tail.close()
+
+    # A restarted dashboard loads the sealed rows and parses only the new line
+    append(log, record("ERROR", "m5"))
+    resumed = LogStore(str(log), store_dir=str(store_dir), segment_rows=4)
+    assert resumed.counters["rows"] == 5
+    assert resumed.refresh() == 1
+    assert resumed.counters["rows"] == 6
+    assert list(resumed.tail_rows(6)["Message"]) == [f"m{i}" for i in range(6)]
+    assert list(resumed.tail_rows(5, level="ERROR")["Message"]) == ["m5"]
+
+
+def test_memory_holds_a_bounded_window_and_older_rows_come_from_disk(tmp_path):
+    log, store_dir = tmp_path / "pipeline.jsonl", tmp_path / "store"
+    in_memory = LogStore(str(log), segment_rows=3, window_rows=6)
+    on_disk = LogStore(str(log), store_dir=str(store_dir), segment_rows=3, window_rows=6)
+    for i in range(20):
+        append(log, record("INFO", f"m{i}"))
+        in_memory.refresh()
+        on_disk.refresh()
+    for store in (in_memory, on_disk):
+        assert sum(segment.num_rows for segment in store.segments) < 6 + 3
+        assert store.counters["rows"] == 20
+    assert list(in_memory.tail_rows(20)["Message"]) == [f"m{i}" for i in range(12, 20)]
+    assert list(on_disk.tail_rows(20)["Message"]) == [f"m{i}" for i in range(20)]
+    on_disk.tail.close()
+
+    resumed = LogStore(str(log), store_dir=str(store_dir), segment_rows=3, window_rows=6)
+    assert sum(segment.num_rows for segment in resumed.segments) < 6 + 3
+    assert list(resumed.tail_rows(20)["Message"]) == [f"m{i}" for i in range(18)]
+
+
+def test_timeseries_buckets_requests_errors_and_latency_per_minute(tmp_path):
+    log = tmp_path / "pipeline.jsonl"
+    append(log, record("INFO", "Received prompt: a", ts="2024-01-01T10:00:05")
+           + record("SUCCESS", "Claude responded successfully", ts="2024-01-01T10:00:06", latency_ms=100)
+           + record("INFO", "Received prompt: b", ts="2024-01-01T10:00:30")
+           + record("SUCCESS", "Claude responded successfully", ts="2024-01-01T10:00:31", latency_ms=300)
+           + "[ERROR 2024-01-01 10:01:02.5] Claude invocation failed\n")
+    store = LogStore(str(log))
+    store.refresh()
+    series = store.timeseries()
+    assert [str(t) for t in series.index] == ["2024-01-01 10:00:00", "2024-01-01 10:01:00"]
+    assert list(series["requests"]) == [2, 0]
+    assert list(series["successes"]) == [2, 0]
+    assert list(series["errors"]) == [0, 1]
+    assert series["avg_latency_ms"].iloc[0] == 200
+    assert store.counters["last"]["SUCCESS"] == "2024-01-01T10:00:31"
+    assert len(store.timeseries(minutes=1)) == 1
@@ -0,0 +1,118 @@
+# tests/test_metrics.py
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import math
+
+import pytest
+from pipeline import orchestrator
+from pipeline.metrics import RECORD, MetricsReader, MetricsStore
+from pipeline.orchestrator import run_pipeline
+
+
+@pytest.fixture(autouse=True)
+def closed_breaker():
+    orchestrator.breaker.record_success()
+
+
+def test_records_are_fixed_width_and_read_incrementally(tmp_path):
+    path = str(tmp_path / "pipeline.metrics")
+    store, reader = MetricsStore(path), MetricsReader(path)
+    store.record(120.0, ttfb_ms=80.0, input_tokens=50, output_tokens=10, model_id="haiku", ts=1000.0)
+    store.record(300.0, retries=2, ok=False, model_id="sonnet", ts=1001.0)
+    assert os.path.getsize(path) == 2 * RECORD.itemsize
+    assert reader.refresh() == 2
+    assert reader.refresh() == 0
+
+    store.record(200.0, ttfb_ms=150.0, input_tokens=40, output_tokens=30, model_id="haiku", ts=1002.0)
+    assert reader.refresh() == 1
+    frame = reader.frame()
+    assert list(frame["model"]) == ["haiku", "sonnet", "haiku"]
+    assert math.isnan(frame["ttfb_ms"].iloc[1])
+    # A second writer (another process) reuses the model table
+    MetricsStore(path).record(100.0, model_id="sonnet", ts=1003.0)
+    reader.refresh()
+    assert list(reader.frame()["model"])[-1] == "sonnet"
+    store.close()
+
+
+def _record_models(path, worker, start):
+    store = MetricsStore(path)
+    start.wait()
+    for i in range(200):
+        store.record(float(worker * 1000 + i), model_id=f"model-{worker}-{i}")
+    store.close()
+
+
+def test_processes_adding_different_models_get_distinct_indexes(tmp_path):
+    import multiprocessing
+    context = multiprocessing.get_context("fork")
+    path, start = str(tmp_path / "pipeline.metrics"), context.Barrier(4)
+    workers = [context.Process(target=_record_models, args=(path, w, start)) for w in range(4)]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join()
+    reader = MetricsReader(path)
+    assert reader.refresh() == 800
+    frame = reader.frame()
+    expected = [f"model-{int(ms) // 1000}-{int(ms) % 1000}" for ms in frame["wall_ms"]]
+    assert list(frame["model"]) == expected
+
+
+def test_reader_keeps_only_the_newest_records(tmp_path):
+    path = str(tmp_path / "pipeline.metrics")
+    store, reader = MetricsStore(path), MetricsReader(path, max_records=5)
+    for i in range(8):
+        store.record(float(i), ts=1000.0 + i)
+    assert reader.refresh() == 8
+    assert list(reader.records["wall_ms"]) == [3, 4, 5, 6, 7]
+    for i in range(8, 10):
+        store.record(float(i), ts=1000.0 + i)
+    assert reader.refresh() == 2
+    assert list(reader.records["wall_ms"]) == [5, 6, 7, 8, 9]
+    store.close()
+
+
+def test_summary_percentiles_and_token_throughput(tmp_path):
+    path = str(tmp_path / "pipeline.metrics")
+    store = MetricsStore(path)
+    for i in range(100):
+        store.record(float(i + 1), ttfb_ms=float(i + 1) / 2, input_tokens=10, output_tokens=5, ts=1000.0 + i)
+    reader = MetricsReader(path)
+    reader.refresh()
+    summary = reader.summary()
+    assert summary["calls"] == 100 and summary["errors"] == 0
+    assert summary["wall_p50_ms"] == pytest.approx(50.5)
+    assert summary["wall_p99_ms"] == pytest.approx(99.01)
+    assert summary["ttfb_p95_ms"] == pytest.approx(47.525)
+    assert summary["output_tokens_per_sec"] == pytest.approx(500 / 99)
+
+    series = reader.timeseries()
+    assert series["calls"].sum() == 100
+    assert {"p50_ms", "p95_ms", "p99_ms", "output_tokens_per_sec"} <= set(series.columns)
+    assert reader.histogram(bins=4).sum() == 100
+    assert reader.summary(minutes=0.5)["calls"] == 31
+
+
+def test_run_pipeline_records_one_metric_per_call_with_retries(tmp_path, mocker, monkeypatch):
+    store = MetricsStore(str(tmp_path / "pipeline.metrics"))
+    monkeypatch.setattr(run_pipeline, "metrics", store)
+    mocker.patch("common.resilience.time.sleep")
+    calls = iter(["[ERROR] Claude invocation failed: An error occurred (ThrottlingException): slow down",
+                  "Hello"])
+
+    def fake_invoke(messages):
+        reply = next(calls)
+        orchestrator.last_call.set({"model_id": "haiku", "input_tokens": 12, "output_tokens": 4,
+                                    "ttfb": 0.25, "sdk_retries": 0, "cached": False})
+        return reply
+    mocker.patch("pipeline.orchestrator.invoke_claude", side_effect=fake_invoke)
+
+    assert run_pipeline("hi") == "Hello"
+    reader = MetricsReader(store.path)
+    assert reader.refresh() == 1
+    row = reader.frame().iloc[0]
+    assert (row["retries"], row["ok"], row["model"]) == (1, 1, "haiku")
+    assert (row["input_tokens"], row["output_tokens"], row["ttfb_ms"]) == (12, 4, 250.0)
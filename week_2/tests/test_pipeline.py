@@ -4,11 +4,18 @@ import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 import pytest
+from pipeline import orchestrator
 from pipeline.orchestrator import run_pipeline
 from pipeline.logger import log
+from common import jsonlog
 
 # ------------- MOCKED TESTS ------------- #
 
+@pytest.fixture(autouse=True)
+def closed_breaker():
+    # Failures in one test must not leave the shared circuit breaker open for the next
+    orchestrator.breaker.record_success()
+
 @pytest.fixture
 def mock_claude(mocker):
     return mocker.patch("pipeline.orchestrator.invoke_claude")
@@ -22,7 +29,8 @@ def test_pipeline_success(mock_claude, capsys):
     assert isinstance(response, str)
     assert "robot" in response
 
-    # Check logs printed
+    # Check logs printed (the console echo runs on the log writer thread)
+    jsonlog.flush()
     captured = capsys.readouterr()
     assert "[SUCCESS" in captured.out
     assert "Claude responded" in captured.out
@@ -47,3 +55,46 @@ def test_pipeline_real_integration():
     assert isinstance(response, str)
     assert len(response.strip()) > 0
     assert "joke" in response.lower() or "computer" in response.lower() or "laugh" in response.lower()
+
+def test_pipeline_does_not_retry_validation_errors(mock_claude, capsys):
+    mock_claude.return_value = "[ERROR] Claude invocation failed: An error occurred (ValidationException) when calling the InvokeModel operation: bad"
+
+    with pytest.raises(Exception):
+        run_pipeline("hi")
+    assert mock_claude.call_count == 1
+    jsonlog.flush()
+    assert "retryable" in capsys.readouterr().out
+
+def test_pipeline_calls_make_one_botocore_attempt_each(mock_claude):
+    from common.bedrock import sdk_attempts
+    mock_claude.side_effect = lambda messages: f"attempts={sdk_attempts.get()}"
+
+    assert run_pipeline("hi") == "attempts=1"
+    assert sdk_attempts.get() is None
+
+def test_logger_writes_json_lines_with_correlation_ids(tmp_path):
+    import json
+    from pipeline.logger import Logger
+
+    path = tmp_path / "pipeline.jsonl"
+    test_log = Logger(name="pipeline.test", path=str(path), console_echo=False)
+    with test_log.context("req-42"):
+        test_log.info("Received prompt: hi", prompt_chars=2)
+        test_log.success("Claude responded successfully")
+    test_log.error("outside any request")
+    jsonlog.flush()
+    entries = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [e["level"] for e in entries] == ["INFO", "SUCCESS", "ERROR"]
+    assert [e.get("request_id") for e in entries] == ["req-42", "req-42", None]
+    assert entries[0]["prompt_chars"] == 2
+
+def test_console_echo_runs_on_the_log_writer_thread(tmp_path, monkeypatch):
+    import threading
+    from pipeline import logger
+
+    threads = []
+    monkeypatch.setattr(logger.console, "log", lambda *a, **k: threads.append(threading.current_thread()))
+    test_log = logger.Logger(name="pipeline.console", path=str(tmp_path / "pipeline.jsonl"), console_echo=True)
+    test_log.info("hello")
+    jsonlog.flush()
+    assert len(threads) == 1 and threads[0] is not threading.current_thread()
@@ -1,21 +1,46 @@
+import time
+
 from fastapi import APIRouter, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from app.filter import is_safe
 from app.logger import log_request
-from app.monitor import track_usage
-from bedrock_client import invoke_claude
+from app.monitor import PROMETHEUS_CONTENT_TYPE, metrics, track_usage
+from bedrock_client import ainvoke_claude, stream_claude
+from common.streaming import SSE_HEADERS, SSE_MEDIA_TYPE, sse_stream, wants_stream
+from common.tracing import span, traced_stream
+
+router = APIRouter()          # /generate with content filtering, and /metrics
+metrics_router = APIRouter()  # /metrics alone, for apps that serve their own /generate (main.py)
 
-router = APIRouter()
+async def respond(request: Request, data: dict, prompt: str, endpoint: str = "generate"):
+    """Log the prompt, answer it (as Server-Sent Events if the client asks for a stream) and track its usage."""
+    log_request(prompt)
+    start = time.perf_counter()
+    if wants_stream(data, request.headers.get("accept", "")):
+        def on_complete(response):
+            track_usage(endpoint, prompt, time.perf_counter() - start, ok=not response.startswith("[ERROR]"))
+            return {"response": response}
+        events = traced_stream("llm.stream", sse_stream(stream_claude(prompt), on_complete))
+        return StreamingResponse(events, media_type=SSE_MEDIA_TYPE, headers=SSE_HEADERS)
+    with span("llm"):
+        response = await ainvoke_claude(prompt)
+    track_usage(endpoint, prompt, time.perf_counter() - start, ok=not response.startswith("[ERROR]"))
+    return {"response": response}
 
 @router.post("/generate")
 async def generate(request: Request):
     data = await request.json()
     prompt = data.get("prompt", "")
 
-    if not is_safe(prompt):
+    with span("filter"):
+        safe = is_safe(prompt)
+    if not safe:
         return {"error": "Unsafe or inappropriate content detected."}
 
-    log_request(prompt)
-    response = invoke_claude(prompt)
-    track_usage("generate", prompt)
+    return await respond(request, data, prompt)
 
-    return {"response": response}
+@metrics_router.get("/metrics")
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+router.include_router(metrics_router)
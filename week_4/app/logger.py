@@ -1,4 +1,35 @@
-from datetime import datetime
+# app/logger.py
+"""
+Request logging as JSON lines on stdout (and APP_LOG_FILE if set), written by a
+background thread so a slow pipe never holds up a request (see common/jsonlog.py).
+APP_LOG_SAMPLE keeps that fraction of the per-prompt INFO records (default 1.0).
+
+Every record carries the request's correlation id: the X-Request-ID header when
+the client sends one, otherwise a new id, echoed back in the response header.
+"""
+import os
+import sys
+
+import bedrock_client  # also puts the shared common/ package on sys.path
+from common.jsonlog import get_logger, request_context
+
+REQUEST_ID_HEADER = "X-Request-ID"
+
+log = get_logger(
+    "week4.requests",
+    path=os.getenv("APP_LOG_FILE"),
+    stream=sys.stdout,
+    sample_rate=float(os.getenv("APP_LOG_SAMPLE", "1.0")),
+    when=os.getenv("APP_LOG_ROTATE") or None
+)
 
 def log_request(prompt: str):
-    print(f"[{datetime.now()}] Prompt received: {prompt}")
+    log.info("Prompt received", extra={"prompt": prompt, "prompt_chars": len(prompt)})
+
+async def request_id_middleware(request, call_next):
+    """FastAPI middleware: app.middleware("http")(request_id_middleware)."""
+    incoming = request.headers.get(REQUEST_ID_HEADER)
+    with request_context(incoming[:64] if incoming else None) as request_id:
+        response = await call_next(request)
+    response.headers[REQUEST_ID_HEADER] = request_id
+    return response
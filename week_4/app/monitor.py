@@ -1,10 +1,222 @@
-from datetime import datetime
+# app/monitor.py
+"""
+Usage metrics for the API, in fixed memory.
 
-usage_metrics = []
+- Recent requests (time, endpoint, prompt length, latency, success) go into a
+  ring buffer of preallocated numpy columns holding the last RING_SIZE requests.
+  Writers claim a slot from an atomic counter, so they never wait on each other.
+- Streaming aggregates per endpoint: request and error counts, and histograms
+  (with sums) of prompt length and latency. Each thread adds to its own shard
+  and readers add the shards up, so the request path takes no lock.
+- Several workers: with METRICS_DIR set, each process keeps its shards in
+  memory-mapped files in that directory, and every worker's /metrics reports
+  the sum of all of them. On startup each worker removes the shards of
+  processes that are no longer running (remove_stale_shards).
+- render() formats the aggregates for Prometheus (GET /metrics); stats() gives
+  this worker's per-endpoint request rates and latency percentiles from the ring.
+"""
+import bisect
+import itertools
+import os
+import threading
+import time
+import uuid
 
-def track_usage(endpoint: str, prompt: str):
-    usage_metrics.append({
-        "endpoint": endpoint,
-        "prompt_length": len(prompt),
-        "timestamp": datetime.now().isoformat()
-    })
+import numpy as np
+
+PROMPT_BUCKETS = (16, 64, 256, 1024, 4096, 16384)              # characters
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)   # seconds
+MAX_ENDPOINTS = 16  # later endpoints are counted under the last slot
+RING_SIZE = 10_000
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Columns of an endpoint's row in a shard; each histogram has one slot per bucket plus +Inf
+REQUESTS, ERRORS, PROMPT_SUM, LATENCY_SUM, LATENCY_COUNT = range(5)
+PROMPT_HIST = 5
+LATENCY_HIST = PROMPT_HIST + len(PROMPT_BUCKETS) + 1
+ROW = LATENCY_HIST + len(LATENCY_BUCKETS) + 1
+
+RING = np.dtype([("ts", "f8"), ("endpoint", "i2"), ("prompt_length", "i4"), ("latency", "f4"), ("ok", "?")])
+
+
+def _running(pid) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # someone else's process
+    return True
+
+
+class UsageMetrics:
+    def __init__(self, directory=None, ring_size=RING_SIZE, clock=time.time):
+        self.directory = directory
+        self.clock = clock
+        self._lock = threading.Lock()  # taken only to add a shard or an endpoint
+        self._local = threading.local()
+        self._shards = []
+        self._slots = {}
+        self._names = []
+        self._token = None
+        self._pid = None
+        self._ring = np.zeros(ring_size, dtype=RING)
+        self._ring["ts"] = np.nan
+        self._seq = itertools.count()  # next() on it is atomic under the GIL
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    # ---- write path ----
+
+    def _shard(self):
+        shard = getattr(self._local, "shard", None)
+        if shard is None or self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    # New process (or forked worker): don't write into the parent's shards
+                    self._pid, self._token, self._shards = os.getpid(), uuid.uuid4().hex[:8], []
+                if self.directory:
+                    path = os.path.join(self.directory, f"shard-{self._pid}-{self._token}-{len(self._shards)}.bin")
+                    shard = np.memmap(path, dtype="f8", mode="w+", shape=(MAX_ENDPOINTS, ROW))
+                else:
+                    shard = np.zeros((MAX_ENDPOINTS, ROW))
+                self._shards.append(shard)
+            self._local.shard = shard
+        return shard
+
+    def remove_stale_shards(self) -> int:
+        """Delete METRICS_DIR shards whose process has exited (e.g. from before a restart); returns how many."""
+        if not self.directory:
+            return 0
+        removed = 0
+        for name in os.listdir(self.directory):
+            if not name.startswith("shard-"):
+                continue
+            pid = int(name.split("-")[1])
+            if pid == os.getpid() or _running(pid):
+                continue
+            try:
+                os.remove(os.path.join(self.directory, name))
+                removed += 1
+            except FileNotFoundError:
+                pass  # another worker removed it first
+        return removed
+
+    def _endpoints_path(self):
+        return os.path.join(self.directory, "endpoints.txt")
+
+    def _slot(self, endpoint):
+        slot = self._slots.get(endpoint)
+        if slot is None:
+            with self._lock:
+                if self.directory:
+                    # Shared by every worker; if two add the same name, readers merge the slots
+                    path = self._endpoints_path()
+                    names = open(path).read().splitlines() if os.path.exists(path) else []
+                    if endpoint not in names:
+                        with open(path, "a") as f:
+                            f.write(endpoint + "\n")
+                        names = open(path).read().splitlines()
+                    slot = names.index(endpoint)
+                else:
+                    if endpoint not in self._names:
+                        self._names.append(endpoint)
+                    slot = self._names.index(endpoint)
+                slot = min(slot, MAX_ENDPOINTS - 1)
+                self._slots[endpoint] = slot
+        return slot
+
+    def record(self, endpoint, prompt_length, latency=None, ok=True):
+        slot = self._slot(endpoint)
+        row = self._shard()[slot]
+        row[REQUESTS] += 1
+        if not ok:
+            row[ERRORS] += 1
+        row[PROMPT_SUM] += prompt_length
+        row[PROMPT_HIST + bisect.bisect_left(PROMPT_BUCKETS, prompt_length)] += 1
+        if latency is not None:
+            row[LATENCY_SUM] += latency
+            row[LATENCY_COUNT] += 1
+            row[LATENCY_HIST + bisect.bisect_left(LATENCY_BUCKETS, latency)] += 1
+
+        ring = self._ring
+        i = next(self._seq) % len(ring)
+        ring["ts"][i] = np.nan  # readers skip the slot while it is rewritten
+        ring["endpoint"][i] = slot
+        ring["prompt_length"][i] = prompt_length
+        ring["latency"][i] = np.nan if latency is None else latency
+        ring["ok"][i] = ok
+        ring["ts"][i] = self.clock()  # last: a slot with a time is complete
+
+    # ---- read path ----
+
+    def _endpoint_names(self):
+        if self.directory:
+            path = self._endpoints_path()
+            return open(path).read().splitlines() if os.path.exists(path) else []
+        return list(self._names)
+
+    def totals(self) -> dict:
+        """Endpoint name -> summed row (REQUESTS, ERRORS, ... histogram slots)."""
+        if self.directory:
+            shards = [np.fromfile(os.path.join(self.directory, name), dtype="f8").reshape(MAX_ENDPOINTS, ROW)
+                      for name in os.listdir(self.directory) if name.startswith("shard-")]
+        else:
+            with self._lock:
+                shards = list(self._shards)
+        total = np.sum(shards, axis=0) if shards else np.zeros((MAX_ENDPOINTS, ROW))
+        rows = {}
+        for slot, name in enumerate(self._endpoint_names()[:MAX_ENDPOINTS]):
+            rows[name] = rows.get(name, 0) + total[slot]
+        return rows
+
+    def stats(self, window=60.0) -> dict:
+        """This worker's recent traffic per endpoint: requests/sec over `window` seconds and latency percentiles."""
+        ring = self._ring.copy()
+        recent = ring[ring["ts"] >= self.clock() - window]
+        names = self._endpoint_names()
+        stats = {}
+        for slot in np.unique(recent["endpoint"]):
+            rows = recent[recent["endpoint"] == slot]
+            latency = rows["latency"][~np.isnan(rows["latency"])]
+            name = names[slot] if slot < len(names) else "other"
+            stats[name] = {
+                "requests_per_sec": round(len(rows) / window, 3),
+                "error_rate": round(float(1 - rows["ok"].mean()), 3),
+                "avg_prompt_length": round(float(rows["prompt_length"].mean()), 1),
+                "latency_p50_ms": round(float(np.percentile(latency, 50)) * 1000, 1) if len(latency) else None,
+                "latency_p95_ms": round(float(np.percentile(latency, 95)) * 1000, 1) if len(latency) else None,
+            }
+        return stats
+
+    def render(self) -> str:
+        """All workers' aggregates in the Prometheus text exposition format (version 0.0.4)."""
+        totals = self.totals()
+        lines = []
+
+        def counter(name, help_text, column):
+            lines.extend([f"# HELP {name} {help_text}", f"# TYPE {name} counter"])
+            lines.extend(f'{name}{{endpoint="{endpoint}"}} {row[column]:.0f}' for endpoint, row in totals.items())
+
+        def histogram(name, help_text, buckets, start, sum_column, count):
+            lines.extend([f"# HELP {name} {help_text}", f"# TYPE {name} histogram"])
+            for endpoint, row in totals.items():
+                cumulative = np.cumsum(row[start:start + len(buckets) + 1])
+                for bound, value in zip(list(buckets) + ["+Inf"], cumulative):
+                    lines.append(f'{name}_bucket{{endpoint="{endpoint}",le="{bound}"}} {value:.0f}')
+                lines.append(f'{name}_sum{{endpoint="{endpoint}"}} {row[sum_column]:g}')
+                lines.append(f'{name}_count{{endpoint="{endpoint}"}} {count(row):.0f}')
+
+        counter("week4_requests_total", "Requests handled.", REQUESTS)
+        counter("week4_request_errors_total", "Requests that returned an error.", ERRORS)
+        histogram("week4_prompt_length_chars", "Prompt length in characters.", PROMPT_BUCKETS, PROMPT_HIST,
+                  PROMPT_SUM, lambda row: row[REQUESTS])
+        histogram("week4_request_latency_seconds", "Time to answer a request.", LATENCY_BUCKETS, LATENCY_HIST,
+                  LATENCY_SUM, lambda row: row[LATENCY_COUNT])
+        return "\n".join(lines) + "\n"
+
+
+metrics = UsageMetrics(directory=os.getenv("METRICS_DIR") or None)
+
+def track_usage(endpoint: str, prompt: str, latency: float = None, ok: bool = True):
+    metrics.record(endpoint, len(prompt), latency, ok)
@@ -1,9 +1,22 @@
+import contextlib
+
 from fastapi import FastAPI, Request
-from bedrock_client import invoke_claude
-import logging
-from datetime import datetime
+import bedrock_client  # also puts the shared common/ package on sys.path
+from common.tracing import http_middleware
+from app.api import metrics_router, respond
+from app.logger import request_id_middleware
+from app.monitor import metrics
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    # Shards left in METRICS_DIR by workers that have exited would otherwise count forever
+    metrics.remove_stale_shards()
+    yield
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+app.middleware("http")(http_middleware)
+app.middleware("http")(request_id_middleware)  # outermost, so the spans carry the request id
+app.include_router(metrics_router)
 
 @app.post("/generate")
 async def generate(request: Request):
@@ -13,6 +26,4 @@ async def generate(request: Request):
     if not prompt:
         return {"error": "No prompt provided"}
 
-    logging.info(f"[{datetime.now()}] Prompt: {prompt}")
-    response = invoke_claude(prompt)
-    return {"response": response}
+    return await respond(request, data, prompt)
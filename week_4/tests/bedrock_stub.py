@@ -0,0 +1,48 @@
+"""
+Local stand-in for the Bedrock runtime used by the load tests.
+
+Answers every invoke_model call with a canned Claude response after a fixed
+delay, so tests can measure concurrency without AWS credentials.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        time.sleep(self.server.latency)
+        body = json.dumps({
+            "content": [{"type": "text", "text": "stub reply"}],
+            "usage": {"input_tokens": 10, "output_tokens": 2}
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class BedrockStub:
+    """Threaded HTTP server speaking just enough of the Bedrock runtime API."""
+
+    def __init__(self, latency=0.2):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self.server.latency = latency
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,60 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.dirname(__file__))
+os.environ.setdefault("AWS_REGION", "us-east-2")
+
+import asyncio
+import time
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from bedrock_stub import BedrockStub
+from main import app
+from app.api import router
+from common import bedrock
+
+STUB_LATENCY = 0.2
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    with BedrockStub(latency=STUB_LATENCY) as server:
+        monkeypatch.setenv("BEDROCK_ENDPOINT_URL", server.url)
+        monkeypatch.setenv("AWS_ACCESS_KEY_ID", "test")
+        monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "test")
+        monkeypatch.delenv("GUARDRAIL_ID", raising=False)
+        # Measure real upstream calls, not cache hits
+        monkeypatch.setattr(bedrock, "response_cache", None)
+        yield server
+
+
+async def _fire(asgi_app, clients):
+    transport = httpx.ASGITransport(app=asgi_app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        start = time.perf_counter()
+        responses = await asyncio.gather(*[
+            client.post("/generate", json={"prompt": f"Tell me a joke {i}"})
+            for i in range(clients)
+        ])
+        elapsed = time.perf_counter() - start
+    assert all(r.json() == {"response": "stub reply"} for r in responses)
+    return clients / elapsed
+
+
+def test_generate_throughput_scales_with_clients(stub):
+    single = asyncio.run(_fire(app, 1))
+    concurrent = asyncio.run(_fire(app, 8))
+    print(f"throughput: 1 client {single:.1f} req/s, 8 clients {concurrent:.1f} req/s")
+    # Serialized calls would keep throughput flat; overlapping calls scale it up
+    assert concurrent > single * 4
+
+
+def test_router_generate_does_not_block_event_loop(stub):
+    router_app = FastAPI()
+    router_app.include_router(router)
+    start = time.perf_counter()
+    asyncio.run(_fire(router_app, 8))
+    assert time.perf_counter() - start < STUB_LATENCY * 4
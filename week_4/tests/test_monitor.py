@@ -0,0 +1,96 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import multiprocessing
+import threading
+
+from fastapi.testclient import TestClient
+
+import main
+from app import api, monitor
+from app.monitor import REQUESTS, UsageMetrics
+
+
+def test_ring_buffer_memory_stays_fixed():
+    metrics = UsageMetrics(ring_size=100)
+    for i in range(1000):
+        metrics.record("generate", 10, latency=0.2)
+    assert metrics._ring.size == 100
+    assert metrics.totals()["generate"][REQUESTS] == 1000
+    assert metrics.stats()["generate"]["requests_per_sec"] == round(100 / 60, 3)
+
+
+def test_concurrent_threads_lose_no_counts():
+    metrics = UsageMetrics()
+
+    def work():
+        for _ in range(2000):
+            metrics.record("generate", 100, latency=0.05)
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert metrics.totals()["generate"][REQUESTS] == 16000
+
+
+def test_render_prometheus_histograms():
+    metrics = UsageMetrics()
+    metrics.record("generate", 10, latency=0.07)
+    metrics.record("generate", 300, latency=2.0, ok=False)
+    text = metrics.render()
+    assert '# TYPE week4_requests_total counter' in text
+    assert 'week4_requests_total{endpoint="generate"} 2' in text
+    assert 'week4_request_errors_total{endpoint="generate"} 1' in text
+    assert 'week4_prompt_length_chars_bucket{endpoint="generate",le="16"} 1' in text
+    assert 'week4_prompt_length_chars_bucket{endpoint="generate",le="256"} 1' in text
+    assert 'week4_prompt_length_chars_bucket{endpoint="generate",le="+Inf"} 2' in text
+    assert 'week4_request_latency_seconds_bucket{endpoint="generate",le="0.1"} 1' in text
+    assert 'week4_request_latency_seconds_sum{endpoint="generate"} 2.07' in text
+    assert 'week4_request_latency_seconds_count{endpoint="generate"} 2' in text
+
+
+def _worker(directory, count):
+    metrics = UsageMetrics(directory=directory)
+    for _ in range(count):
+        metrics.record("generate", 50, latency=0.1)
+    metrics.record("health", 0)
+
+
+def test_workers_share_totals_through_the_metrics_dir(tmp_path):
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=_worker, args=(str(tmp_path), n)) for n in (100, 250)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    totals = UsageMetrics(directory=str(tmp_path)).totals()
+    assert totals["generate"][REQUESTS] == 350
+    assert totals["health"][REQUESTS] == 2
+
+
+def test_startup_removes_shards_of_exited_workers(tmp_path):
+    process = multiprocessing.get_context("fork").Process(target=_worker, args=(str(tmp_path), 10))
+    process.start()
+    process.join()
+    metrics = UsageMetrics(directory=str(tmp_path))
+    metrics.record("generate", 5)
+    assert metrics.totals()["generate"][REQUESTS] == 11
+    assert metrics.remove_stale_shards() == 1
+    assert metrics.totals()["generate"][REQUESTS] == 1
+
+
+def test_generate_is_tracked_and_metrics_endpoint_serves_prometheus_text(monkeypatch):
+    monkeypatch.setattr(monitor, "metrics", UsageMetrics())
+    monkeypatch.setattr(api, "metrics", monitor.metrics)
+
+    async def fake_invoke(prompt):
+        return "stub reply"
+    monkeypatch.setattr(api, "ainvoke_claude", fake_invoke)
+    client = TestClient(main.app)
+    client.post("/generate", json={"prompt": "Tell me a joke"})
+    response = client.get("/metrics")
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'week4_requests_total{endpoint="generate"} 1' in response.text
@@ -0,0 +1,35 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import json
+
+from fastapi.testclient import TestClient
+
+import main
+from app import api
+from common import tracing
+
+
+def test_generate_streams_server_sent_events(monkeypatch):
+    monkeypatch.setattr(api, "stream_claude", lambda prompt: iter(["Beep ", "boop"]))
+    client = TestClient(main.app)
+    response = client.post("/generate", json={"prompt": "Tell me a joke about robots", "stream": True})
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [json.loads(line[len("data: "):]) for line in response.text.split("\n\n") if line]
+    assert events[-1] == {"done": True, "response": "Beep boop"}
+    assert [e["delta"] for e in events[:-1]] == ["Beep ", "boop"]
+
+
+def test_streamed_generate_is_traced(monkeypatch):
+    spans = []
+    monkeypatch.setitem(tracing._config, "sample_rate", 1.0)
+    monkeypatch.setitem(tracing._config, "exporter", lambda name, record: spans.append((name, record)))
+    monkeypatch.setattr(api, "stream_claude", lambda prompt: iter(["Beep ", "boop"]))
+    client = TestClient(main.app)
+    client.post("/generate", json={"prompt": "Tell me a joke about robots", "stream": True})
+    records = dict(spans)
+    root, stream = records["POST /generate"], records["llm.stream"]
+    assert root["attributes"]["status_code"] == 200 and root["parent_id"] is None
+    assert stream["parent_id"] == root["span_id"] and stream["trace_id"] == root["trace_id"]
+    assert stream["attributes"]["chunks"] == 3  # two deltas and the "done" event
@@ -2,9 +2,17 @@
 
 import click
 from rich import print
-from q_engine import ask_q
+from q_engine import stream_q
 import memory
 
+def print_answer(query, end="\n"):
+    """Stream Q's answer to the terminal as Claude generates it."""
+    print("\n[white on blue]Q:[/white on blue] ", end="")
+    for chunk in stream_q(query):
+        # click.echo writes chunks verbatim (answers often contain [brackets] rich would parse)
+        click.echo(chunk, nl=False)
+    click.echo(end, nl=False)
+
 @click.group(invoke_without_command=True)
 @click.argument("query", required=False)
 @click.pass_context
@@ -12,8 +20,7 @@ def cli(ctx, query):
     """Amazon Q-style CLI Assistant"""
     if query:
         print("[bold green]Amazon Q is thinking...[/bold green]")
-        response = ask_q(query)
-        print(f"\n[white on blue]Q:[/white on blue] {response}")
+        print_answer(query)
     elif ctx.invoked_subcommand is None:
         print("[bold cyan]🧠 Welcome to Amazon Q CLI (type 'exit' or 'quit' to end)[/bold cyan]\n")
         while True:
@@ -25,8 +32,7 @@ def cli(ctx, query):
                 if not user_input:
                     continue
                 print("[bold green]Amazon Q is thinking...[/bold green]")
-                response = ask_q(user_input)
-                print(f"\n[white on blue]Q:[/white on blue] {response}\n")
+                print_answer(user_input, end="\n\n")
             except KeyboardInterrupt:
                 print("\n[bold red]Interrupted. Exiting...[/bold red]")
                 break
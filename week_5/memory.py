@@ -1,21 +1,217 @@
 # memory.py
-from diskcache import Cache
+"""
+Persistent Q conversation memory.
 
-cache = Cache(".q_memory_cache")
+Turns are rows in an append-only SQLite table, so adding a turn is one INSERT and
+reading the context is an indexed read of the newest rows, no matter how long the
+history gets. Exchanges that fall out of the context window are folded into a running
+summary in the background, and old rows are pruned by a retention policy.
+
+Settings (all optional):
+    Q_MEMORY_DB               database file (default .q_memory.db)
+    Q_MEMORY_MAX_TOKENS       token budget for the context sent with each prompt (default 1500)
+    Q_MEMORY_RETENTION_TURNS  exchanges kept on disk (default 1000)
+    Q_MEMORY_RETENTION_DAYS   age after which turns are deleted (default 30)
+
+History left in the old diskcache store (.q_memory_cache) is imported on first use.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import bedrock_client  # also puts the shared common/ package on sys.path
+from common.memory import Turn, clip, estimate_tokens, summarize_with_claude
+
+DB_PATH = os.getenv("Q_MEMORY_DB", ".q_memory.db")
+LEGACY_CACHE_DIR = ".q_memory_cache"
 HISTORY_KEY = "chat_history"
+SUMMARY_KEY = "chat_summary"
 MAX_TURNS = 5
+# Approximate token budget for the context sent with each prompt
+MAX_CONTEXT_TOKENS = int(os.getenv("Q_MEMORY_MAX_TOKENS", "1500"))
+RETENTION_TURNS = int(os.getenv("Q_MEMORY_RETENTION_TURNS", "1000"))
+RETENTION_DAYS = float(os.getenv("Q_MEMORY_RETENTION_DAYS", "30"))
+PRUNE_EVERY = 100  # rows appended between retention passes
+
+LABELS = {"user": "User", "assistant": "Q"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS turns (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    tokens INTEGER NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS turns_created_at ON turns (created_at);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+
+class HistoryStore:
+    """Append-only turn log with O(1) appends and indexed tail reads."""
+
+    def __init__(self, path=DB_PATH, legacy_dir=LEGACY_CACHE_DIR):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA auto_vacuum = INCREMENTAL")  # only takes effect on a new file
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.executescript(SCHEMA)
+        if legacy_dir:
+            self.migrate(legacy_dir)
+
+    def _write(self, statements):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for sql, params in statements:
+                    self._conn.execute(sql, params)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _read(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def append(self, turns):
+        """Insert (role, content) pairs in one transaction; returns the id of the last one."""
+        now = time.time()
+        self._write([
+            ("INSERT INTO turns (role, content, tokens, created_at) VALUES (?, ?, ?, ?)",
+             (role, content, estimate_tokens(content), now))
+            for role, content in turns
+        ])
+        return self._read("SELECT max(id) FROM turns")[0][0]
+
+    def tail(self, limit):
+        """Newest `limit` turns, oldest first, as (id, role, content, tokens)."""
+        rows = self._read("SELECT id, role, content, tokens FROM turns ORDER BY id DESC LIMIT ?", (limit,))
+        return rows[::-1]
+
+    def between(self, after_id, before_id):
+        return self._read(
+            "SELECT id, role, content, tokens FROM turns WHERE id > ? AND id < ? ORDER BY id", (after_id, before_id)
+        )
+
+    def get_meta(self, key, default=None):
+        rows = self._read("SELECT value FROM meta WHERE key = ?", (key,))
+        return rows[0][0] if rows else default
+
+    def set_meta(self, **values):
+        self._write([("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (k, str(v))) for k, v in values.items()])
+
+    def prune(self, keep_turns=RETENTION_TURNS, max_age_days=RETENTION_DAYS):
+        """Retention: drop turns beyond the newest keep_turns exchanges or older than max_age_days."""
+        newest = self._read("SELECT max(id) FROM turns")[0][0] or 0
+        cutoff = time.time() - max_age_days * 86400
+        self._write([("DELETE FROM turns WHERE id <= ? OR created_at < ?", (newest - keep_turns * 2, cutoff))])
+        with self._lock:
+            self._conn.execute("PRAGMA incremental_vacuum").fetchall()
+
+    def count(self):
+        return self._read("SELECT count(*) FROM turns")[0][0]
+
+    def clear(self):
+        # ids keep growing after a clear, so the summary restarts from the newest one
+        newest = self._read("SELECT max(id) FROM turns")[0][0] or 0
+        self._write([
+            ("DELETE FROM turns", ()),
+            ("INSERT OR REPLACE INTO meta (key, value) VALUES ('summary', '')", ()),
+            ("INSERT OR REPLACE INTO meta (key, value) VALUES ('summary_upto', ?)", (str(newest),))
+        ])
+
+    def migrate(self, legacy_dir):
+        """Import the pickled history list from the old diskcache store, once."""
+        if self.get_meta("migrated") or not os.path.isdir(legacy_dir):
+            return
+        try:
+            from diskcache import Cache
+        except ImportError:  # nothing could have written the old store without it
+            return
+        with Cache(legacy_dir) as legacy:
+            lines = legacy.get(HISTORY_KEY, [])
+            summary = legacy.get(SUMMARY_KEY)
+        turns = []
+        for line in lines:
+            label, _, content = line.partition(": ")
+            turns.append(("user" if label == "User" else "assistant", content))
+        if turns:
+            self.append(turns)
+        if summary:
+            # The old summary covered the first `covered` lines; they are rows 1..covered now
+            text, covered = summary
+            first_id = self.tail(len(turns))[0][0] if turns else 0
+            self.set_meta(summary=text, summary_upto=first_id + covered - 1)
+        self.set_meta(migrated=int(time.time()))
+        with Cache(legacy_dir) as legacy:
+            legacy.delete(HISTORY_KEY)
+            legacy.delete(SUMMARY_KEY)
+
+
+store = HistoryStore()
+
+# Folds turns that fell out of the window into the summary; swap out in tests
+summarize = summarize_with_claude
+
+_compactor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="q-memory-compaction")
+_compaction_lock = threading.Lock()
+
+def _window(rows):
+    """Newest whole exchanges that fit the budget (rows come oldest first)."""
+    start = len(rows)
+    used = 0
+    while start >= 2:
+        cost = rows[start - 2][3] + rows[start - 1][3]
+        if used + cost > MAX_CONTEXT_TOKENS and start < len(rows):
+            break
+        used += cost
+        start -= 2
+    return rows[start:]
+
+def _summary():
+    return store.get_meta("summary", ""), int(store.get_meta("summary_upto", "0"))
 
 def get_context():
     """Retrieve recent Q conversation context."""
-    history = cache.get(HISTORY_KEY, [])
-    return "\n".join(history[-MAX_TURNS * 2:])
+    summary, _ = _summary()
+    lines = [f"Summary of the earlier session: {summary}"] if summary else []
+    # One very long answer is clipped rather than crowding out everything else
+    lines += [clip(f"{LABELS.get(role, role)}: {content}", MAX_CONTEXT_TOKENS // 2)
+              for _, role, content, _ in _window(store.tail(MAX_TURNS * 2))]
+    return "\n".join(lines)
 
 def update(user_input, response):
     """Add a new user-Q turn to memory."""
-    history = cache.get(HISTORY_KEY, [])
-    history.append(f"User: {user_input}")
-    history.append(f"Q: {response}")
-    cache.set(HISTORY_KEY, history)
+    last_id = store.append([("user", user_input), ("assistant", response)])
+    if last_id % PRUNE_EVERY < 2:
+        store.prune()
+    window = _window(store.tail(MAX_TURNS * 2))
+    _, covered = _summary()
+    if window and window[0][0] - 1 > covered:
+        # Summarize in the background so the answer isn't held up by a second Claude call
+        return _compactor.submit(compact)
+
+def compact():
+    """Fold turns that fell out of the context window into the running summary."""
+    with _compaction_lock:
+        window = _window(store.tail(MAX_TURNS * 2))
+        summary, covered = _summary()
+        if not window or window[0][0] - 1 <= covered:
+            return
+        rows = store.between(covered, window[0][0])
+        try:
+            if rows:
+                summary = summarize(summary, [Turn(role, content, tokens) for _, role, content, tokens in rows])
+        except Exception as e:
+            print(f"[ERROR] Memory compaction failed: {e}")
+            return
+        store.set_meta(summary=summary, summary_upto=window[0][0] - 1)
 
 def clear():
-    cache.delete(HISTORY_KEY)
+    store.clear()
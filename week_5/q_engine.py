@@ -1,28 +1,53 @@
-from bedrock_client import invoke_claude
+from bedrock_client import invoke_claude, stream_claude
+from common.bedrock import cached_system
+from common.tracing import span, trace, traced_stream
 import memory
 
-def ask_q(prompt: str) -> str:
-    context = memory.get_context()
+# Static instructions: sent as a cached system block so repeat calls skip re-processing them
+Q_SYSTEM_PROMPT = (
+    "You are Amazon Q, the official and authoritative AWS CLI and cloud architecture assistant.\n"
+    "You support developers and DevOps engineers by answering only AWS-related questions, including:\n"
+    "- AWS CLI syntax and command generation\n"
+    "- Service setup: Lambda, EC2, IAM, S3, Bedrock, etc.\n"
+    "- Debugging AWS errors or permission issues\n"
+    "- Infrastructure advice and secure configurations\n"
+    "- Step-by-step walkthroughs with examples\n\n"
+    "RULES:\n"
+    "- DO NOT answer questions unrelated to AWS.\n"
+    "- ALWAYS give step-by-step, complete answers — from start to finish.\n"
+    "- Format your answers using clear steps, CLI commands, and helpful notes.\n"
+    "- Never say you're an AI or Claude — act as Amazon Q only."
+)
+Q_SYSTEM = cached_system(Q_SYSTEM_PROMPT)
 
-    full_prompt = (
-        "You are Amazon Q, the official and authoritative AWS CLI and cloud architecture assistant.\n"
-        "You support developers and DevOps engineers by answering only AWS-related questions, including:\n"
-        "- AWS CLI syntax and command generation\n"
-        "- Service setup: Lambda, EC2, IAM, S3, Bedrock, etc.\n"
-        "- Debugging AWS errors or permission issues\n"
-        "- Infrastructure advice and secure configurations\n"
-        "- Step-by-step walkthroughs with examples\n\n"
-        "RULES:\n"
-        "- DO NOT answer questions unrelated to AWS.\n"
-        "- ALWAYS give step-by-step, complete answers — from start to finish.\n"
-        "- Format your answers using clear steps, CLI commands, and helpful notes.\n"
-        "- Never say you're an AI or Claude — act as Amazon Q only.\n\n"
+def build_prompt(prompt: str, context: str) -> str:
+    """The per-request part: session context and the question (the rules are in Q_SYSTEM)."""
+    return (
         "Below is the current context of the session:\n\n"
         f"{context}\n\n"
         f"User: {prompt}\n\n"
         "Q:"
     )
 
-    response = invoke_claude(full_prompt)
-    memory.update(prompt, response)
+def ask_q(prompt: str) -> str:
+    with trace("q.ask"):
+        with span("memory.read"):
+            full_prompt = build_prompt(prompt, memory.get_context())
+        with span("llm"):
+            response = invoke_claude(full_prompt, system=Q_SYSTEM)
+        with span("memory.update"):
+            memory.update(prompt, response)
     return response
+
+def stream_q(prompt: str):
+    """Like ask_q, but yields the answer in chunks as Claude generates it."""
+    # The trace stays open across the yields: the CLI consumes the whole answer in one go
+    with trace("q.stream"):
+        with span("memory.read"):
+            full_prompt = build_prompt(prompt, memory.get_context())
+        parts = []
+        for chunk in traced_stream("llm.stream", stream_claude(full_prompt, system=Q_SYSTEM)):
+            parts.append(chunk)
+            yield chunk
+        with span("memory.update"):
+            memory.update(prompt, "".join(parts))
@@ -12,3 +12,66 @@ def test_memory_roundtrip():
     context = get_context()
     assert "What is IAM?" in context
     assert "create a user" in context
+
+
+def test_context_stays_within_budget_and_summarizes(monkeypatch):
+    import memory
+
+    summarized = []
+
+    def summarize(summary, turns):
+        summarized.extend(t.content for t in turns)
+        return f"covered {len(summarized)} lines"
+
+    monkeypatch.setattr(memory, "summarize", summarize)
+    monkeypatch.setattr(memory, "MAX_CONTEXT_TOKENS", 200)
+    clear()
+    update("Explain VPCs", "VPC " * 500)  # one huge answer
+    job = update("What is S3?", "Object storage.")
+    job.result()
+
+    context = get_context()
+    assert context.startswith("Summary of the earlier session: covered 2 lines")
+    assert "VPC VPC" not in context
+    assert context.endswith("User: What is S3?\nQ: Object storage.")
+    assert summarized[0] == "Explain VPCs"
+    clear()
+
+
+def test_store_appends_and_reads_the_tail(tmp_path):
+    from memory import HistoryStore
+
+    store = HistoryStore(str(tmp_path / "q.db"), legacy_dir=None)
+    for i in range(50):
+        store.append([("user", f"q{i}"), ("assistant", f"a{i}")])
+    assert [row[2] for row in store.tail(4)] == ["q48", "a48", "q49", "a49"]
+    assert store.count() == 100
+
+
+def test_retention_prunes_old_turns(tmp_path):
+    from memory import HistoryStore
+
+    store = HistoryStore(str(tmp_path / "q.db"), legacy_dir=None)
+    for i in range(10):
+        store.append([("user", f"q{i}"), ("assistant", f"a{i}")])
+    store.prune(keep_turns=3)
+    assert [row[2] for row in store.tail(100)] == ["q7", "a7", "q8", "a8", "q9", "a9"]
+    store.prune(max_age_days=-1)  # everything is older than "tomorrow"
+    assert store.count() == 0
+
+
+def test_migrates_the_diskcache_history(tmp_path):
+    from diskcache import Cache
+    from memory import HISTORY_KEY, HistoryStore
+
+    legacy = str(tmp_path / ".q_memory_cache")
+    with Cache(legacy) as cache:
+        cache.set(HISTORY_KEY, ["User: What is IAM?", "Q: Identity and Access Management."])
+
+    store = HistoryStore(str(tmp_path / "q.db"), legacy_dir=legacy)
+    assert [row[1:3] for row in store.tail(10)] == [
+        ("user", "What is IAM?"), ("assistant", "Identity and Access Management.")
+    ]
+    # migrated once: reopening does not import it again
+    store = HistoryStore(str(tmp_path / "q.db"), legacy_dir=legacy)
+    assert store.count() == 2
@@ -2,7 +2,7 @@ import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from q_engine import ask_q
+from q_engine import ask_q, stream_q
 from unittest.mock import patch
 
 @patch("q_engine.invoke_claude")
@@ -10,3 +10,36 @@ def test_ask_q(mock_invoke):
     mock_invoke.return_value = "Here's how to launch an EC2 instance..."
     result = ask_q("How do I launch an EC2 instance?")
     assert "EC2" in result
+
+@patch("q_engine.memory")
+@patch("q_engine.stream_claude")
+def test_stream_q(mock_stream, mock_memory):
+    mock_memory.get_context.return_value = ""
+    mock_stream.return_value = iter(["Use ", "aws ec2 run-instances"])
+    chunks = list(stream_q("How do I launch an EC2 instance?"))
+    assert chunks == ["Use ", "aws ec2 run-instances"]
+    mock_memory.update.assert_called_once_with("How do I launch an EC2 instance?", "Use aws ec2 run-instances")
+
+@patch("q_engine.memory")
+@patch("q_engine.stream_claude")
+def test_preamble_is_sent_as_cached_system_prompt(mock_stream, mock_memory):
+    mock_memory.get_context.return_value = "User: hi"
+    mock_stream.return_value = iter(["ok"])
+    list(stream_q("List my buckets"))
+    prompt, kwargs = mock_stream.call_args[0][0], mock_stream.call_args[1]
+    assert "Amazon Q" not in prompt and "List my buckets" in prompt
+    assert kwargs["system"][-1]["cache_control"] == {"type": "ephemeral"}
+
+@patch("q_engine.memory")
+@patch("q_engine.stream_claude")
+def test_stream_q_traces_memory_and_llm_stages(mock_stream, mock_memory):
+    from common import tracing
+    spans = []
+    mock_memory.get_context.return_value = ""
+    mock_stream.return_value = iter(["Use ", "aws s3 ls"])
+    with patch.dict(tracing._config, sample_rate=1.0, exporter=lambda name, record: spans.append((name, record))):
+        list(stream_q("List my buckets"))
+    assert [name for name, _ in spans] == ["memory.read", "llm.stream", "memory.update", "q.stream"]
+    root = spans[-1][1]
+    assert all(record["parent_id"] == root["span_id"] for _, record in spans[:-1])
+    assert tracing.current_span() is None
@@ -1,8 +1,22 @@
 """
 Simple filter to block and mask certain words from prompts.
+
+Both word lists are compiled once into a single case-insensitive regex (each list
+folded into a prefix trie, so matching cost grows with word length, not with the
+number of words). One scan of the prompt finds the first banned word and masks
+sensitive ones at the same time.
+
+Word lists can be replaced at runtime: point FILTER_WORDS_FILE at a JSON file like
+    {"banned": ["hack", ...], "masked": ["password", ...]}
+and edits to it are picked up on the next call (checked at most every
+FILTER_RELOAD_INTERVAL seconds, default 1).
 """
 
+import json
+import os
 import re
+import threading
+import time
 
 # Words that trigger a hard block
 BANNED_WORDS = {"hack", "exploit", "malware", "phish", "attack", "bomb", "kill", "akhil"}
@@ -10,6 +24,110 @@ BANNED_WORDS = {"hack", "exploit", "malware", "phish", "attack", "bomb", "kill",
 # Words to mask in-place (e.g., "password" -> "[MASKED]")
 MASKED_WORDS = {"password", "secret", "token", "ssn"}
 
+MASK = "[MASKED]"
+
+
+def _trie_pattern(words) -> str:
+    """Regex alternation for words, factored by common prefixes ("hack|hacker" -> "hack(?:er)?")."""
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word.lower():
+            node = node.setdefault(ch, {})
+        node[""] = {}  # end of a word
+
+    def build(node):
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        if "" not in node and len(branches) == 1:
+            return branches[0]
+        group = "(?:" + "|".join(branches) + ")"
+        return group + "?" if "" in node else group
+
+    return build(trie) if words else "(?!)"  # (?!) never matches
+
+
+class WordFilter:
+    """Precompiled banned/masked word matcher; rebuild with load() when the lists change."""
+
+    def __init__(self, banned=BANNED_WORDS, masked=MASKED_WORDS):
+        self._lock = threading.Lock()
+        self.path = None
+        self.interval = 1.0
+        self._mtime = None
+        self._next_check = 0.0
+        self.version = 0
+        self.load(banned, masked)
+
+    def load(self, banned, masked):
+        banned = {w.lower() for w in banned if w}
+        masked = {w.lower() for w in masked if w} - banned
+        pattern = re.compile(
+            r"\b(?:(?P<banned>" + _trie_pattern(banned) + r")|(?P<masked>" + _trie_pattern(masked) + r"))\b",
+            re.IGNORECASE
+        )
+        # One assignment, so concurrent check() calls see either the old or the new lists
+        self._compiled = (pattern, frozenset(banned), frozenset(masked))
+        self.version += 1  # lets callers that cache verdicts notice the lists changed
+
+    @property
+    def banned(self):
+        return self._compiled[1]
+
+    @property
+    def masked(self):
+        return self._compiled[2]
+
+    def watch(self, path, interval=1.0):
+        """Load the lists from a JSON file now and whenever it changes."""
+        self.path = path
+        self.interval = interval
+        self._mtime = None
+        self._next_check = 0.0
+        self.reload_if_changed()
+
+    def reload_if_changed(self) -> bool:
+        if self.path is None or time.monotonic() < self._next_check:
+            return False
+        with self._lock:
+            self._next_check = time.monotonic() + self.interval
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+                if mtime == self._mtime:
+                    return False
+                with open(self.path) as f:
+                    lists = json.load(f)
+                self.load(lists.get("banned", []), lists.get("masked", []))
+                self._mtime = mtime
+                return True
+            except (OSError, ValueError) as e:
+                # Keep filtering with the lists we have rather than failing open
+                print(f"[ERROR] Failed to reload filter word lists from {self.path}: {e}")
+                return False
+
+    def check(self, prompt: str):
+        """(allowed, blocked_word, masked_prompt) in one pass over the prompt."""
+        pattern = self._compiled[0]
+        parts = []
+        last = 0
+        for match in pattern.finditer(prompt):
+            if match.lastgroup == "banned":
+                return False, match.group().lower(), prompt
+            parts.append(prompt[last:match.start()])
+            parts.append(MASK)
+            last = match.end()
+        if not parts:
+            return True, None, prompt
+        parts.append(prompt[last:])
+        return True, None, "".join(parts)
+
+
+_filter = WordFilter()
+if os.getenv("FILTER_WORDS_FILE"):
+    _filter.watch(os.getenv("FILTER_WORDS_FILE"), float(os.getenv("FILTER_RELOAD_INTERVAL", "1")))
+
+
 def filter_prompt(prompt: str):
     """
     Filters a user prompt for banned or sensitive words.
@@ -17,18 +135,11 @@ def filter_prompt(prompt: str):
     Returns:
         (allowed: bool, blocked_word: Optional[str], modified_prompt: str)
     """
-    lowered = prompt.lower()
-
-    # --- Blocked Words (exact word match only) ---
-    for word in BANNED_WORDS:
-        pattern = r'\b' + re.escape(word) + r'\b'
-        if re.search(pattern, lowered):
-            return False, word, prompt
+    _filter.reload_if_changed()
+    return _filter.check(prompt)
 
-    # --- Masked Words ---
-    masked_prompt = prompt
-    for word in MASKED_WORDS:
-        pattern = re.compile(r'\b' + re.escape(word) + r'\b', re.IGNORECASE)
-        masked_prompt = pattern.sub("[MASKED]", masked_prompt)
 
-    return True, None, masked_prompt
+def filter_version() -> int:
+    """Changes whenever the word lists do; part of the key for cached verdicts."""
+    _filter.reload_if_changed()
+    return _filter.version
@@ -2,18 +2,24 @@
 FastAPI backend for Streamlit Responsible AI Chatbot 
 
 Features:
-- Exposes /generate endpoint
+- Exposes /generate endpoint (JSON, or Server-Sent Events with {"stream": true})
 - Uses bedrock_client.py for LLM calls
 - No server-side logging or persistent storage
-- Applies banned word filters and masks sensitive terms
+- Applies banned word filters and masks sensitive terms (history turns already seen are served from an in-memory LRU)
 - Returns LLM info and responsible AI disclaimers
+- Optional request tracing (TRACE_SAMPLE): filter, history, LLM and response spans (see common/tracing.py)
 """
 
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from app.bedrock_client import invoke_claude
-from filter import filter_prompt
-from typing import List, Optional, Dict, Any
+from fastapi.responses import StreamingResponse
+from app.bedrock_client import ainvoke_claude, stream_claude
+from common.streaming import SSE_HEADERS, SSE_MEDIA_TYPE, sse_stream, wants_stream
+from common.cache import MemoryCache
+from common.tracing import http_middleware, span, traced_stream
+from filter import filter_prompt, filter_version
+from typing import List, Optional, Dict, Any, Tuple
+import hashlib
 import os
 
 # --- App Init ---
@@ -28,6 +34,9 @@ app.add_middleware(
     allow_headers=["*"]
 )
 
+# --- Tracing: a root span per request (TRACE_SAMPLE), stages as child spans ---
+app.middleware("http")(http_middleware)
+
 # --- Helper: LLM Info ---
 def get_llm_info() -> Dict[str, Any]:
     return {
@@ -39,22 +48,83 @@ def get_llm_info() -> Dict[str, Any]:
     }
 
 # --- Helper: Sanitize Conversation History ---
-def sanitize_history(history: List[Dict[str, str]]) -> List[Dict[str, str]]:
-    sanitized = []
+# The client resends the whole history on every request. Filtered user turns are
+# cached by content hash, and sanitized prefixes by a chained digest of the raw turns
+# that the client can send back as "history_digest", so each request only scans
+# turns it hasn't seen before. The digest is only a cache key: the prefix is reused
+# only if the turns sent now hash to it, so an edited history is never swapped out.
+_turn_cache = MemoryCache(max_entries=int(os.getenv("HISTORY_CACHE_TURNS", "4096")),
+                          ttl=float(os.getenv("HISTORY_CACHE_TTL", "3600")))
+_prefix_cache = MemoryCache(max_entries=int(os.getenv("HISTORY_CACHE_PREFIXES", "1024")),
+                            ttl=float(os.getenv("HISTORY_CACHE_TTL", "3600")))
+
+def chain_digest(digest: str, turn: Dict[str, str]) -> str:
+    raw = f"{digest}\0{turn.get('role')}\0{turn.get('content', '')}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+def history_digest(history: List[Dict[str, str]]) -> str:
+    digest = ""
     for turn in history:
+        digest = chain_digest(digest, turn)
+    return digest
+
+def sanitize_turn(content: str, version: int) -> str:
+    """Masked user turn; raises ValueError("banned:<word>") if it contains a banned word."""
+    key = hashlib.sha256(f"{version}\0{content}".encode("utf-8")).hexdigest()
+    verdict = _turn_cache.get(key)
+    if verdict is None:
+        verdict = filter_prompt(content)
+        _turn_cache.set(key, verdict)
+    allowed, banned_word, masked = verdict
+    if not allowed:
+        raise ValueError(f"banned:{banned_word}")
+    return masked
+
+def sanitize_history(history: List[Dict[str, str]], digest: Optional[str] = None) -> Tuple[List[Dict[str, str]], str]:
+    """Sanitized history plus its digest; turns covered by a known digest are not scanned again."""
+    version = filter_version()
+    start, sanitized, current = 0, [], ""
+    cached = _prefix_cache.get(digest) if digest else None
+    if cached is not None:
+        count, cached_version, prefix = cached
+        if cached_version == version and count <= len(history) and history_digest(history[:count]) == digest:
+            start, sanitized, current = count, list(prefix), digest
+
+    for turn in history[start:]:
+        current = chain_digest(current, turn)
         role = turn.get("role")
         content = turn.get("content", "")
         if not content or role not in ("user", "assistant"):
             continue
         if role == "user":
-            allowed, banned_word, _ = filter_prompt(content)
-            if not allowed:
-                raise ValueError(f"banned:{banned_word}")
-            _, _, masked = filter_prompt(content)
-            sanitized.append({"role": "user", "content": masked})
+            sanitized.append({"role": "user", "content": sanitize_turn(content, version)})
         else:
             sanitized.append({"role": "assistant", "content": content})
-    return sanitized
+
+    _prefix_cache.set(current, (len(history), version, tuple(sanitized)))
+    return sanitized, current
+
+# --- Helper: Shape the LLM result (shared by JSON and streaming responses) ---
+def build_result(result: str, llm_info: Dict[str, Any], final_payload: Dict[str, Any],
+                 error: Optional[str] = None, history_digest: Optional[str] = None) -> Dict[str, Any]:
+    # Catch failed or blocked response from LLM
+    if error or (isinstance(result, str) and "blocked" in result.lower()):
+        return {
+            "blocked": True,
+            "reason": "Your request was blocked due to security or policy reasons.",
+            "details": error or result,
+            "llm_info": llm_info,
+            "final_llm_payload": final_payload
+        }
+
+    return {
+        "result": result,
+        "llm_info": llm_info,
+        "final_llm_payload": final_payload,
+        "data_usage": "Your prompt and chat history are processed securely. No data is stored or used for training. All logs are user-side only.",
+        "logs": "No server-side logs. You control your chat history.",
+        "history_digest": history_digest
+    }
 
 # --- Endpoint: Generate ---
 @app.post("/generate")
@@ -72,8 +142,9 @@ async def generate(request: Request):
             "final_llm_payload": None
         }
 
-    # Filter current prompt
-    allowed, banned_word, _ = filter_prompt(prompt)
+    # Filter and mask current prompt in one pass
+    with span("filter"):
+        allowed, banned_word, masked_prompt = filter_prompt(prompt)
     if not allowed:
         return {
             "blocked": True,
@@ -82,13 +153,12 @@ async def generate(request: Request):
             "final_llm_payload": None
         }
 
-    # Mask current prompt
-    _, _, masked_prompt = filter_prompt(prompt)
-
+    digest = None
     try:
         if history:
             try:
-                sanitized_history = sanitize_history(history)
+                with span("history", turns=len(history)):
+                    sanitized_history, digest = sanitize_history(history, data.get("history_digest"))
             except ValueError as ve:
                 word = str(ve).split(":")[1]
                 return {
@@ -98,29 +168,26 @@ async def generate(request: Request):
                     "final_llm_payload": None
                 }
             messages = sanitized_history + [{"role": "user", "content": masked_prompt}]
-            result = invoke_claude(messages)
+            llm_input = messages
             final_payload = {"messages": messages}
         else:
-            result = invoke_claude(masked_prompt)
+            llm_input = masked_prompt
             final_payload = {"prompt": masked_prompt}
 
-        # Catch blocked response from LLM
-        if isinstance(result, str) and (result.startswith("[ERROR]") or "blocked" in result.lower()):
-            return {
-                "blocked": True,
-                "reason": "Your request was blocked due to security or policy reasons.",
-                "details": result,
-                "llm_info": llm_info,
-                "final_llm_payload": final_payload
-            }
+        if wants_stream(data, request.headers.get("accept", "")):
+            # A failure can come after some text was streamed, so record it apart from the text
+            failure = {}
+            events = sse_stream(
+                traced_stream("llm.stream", stream_claude(llm_input, on_error=lambda error: failure.update(error=error))),
+                lambda result: build_result(result, llm_info, final_payload, failure.get("error"), digest)
+            )
+            return StreamingResponse(events, media_type=SSE_MEDIA_TYPE, headers=SSE_HEADERS)
 
-        return {
-            "result": result,
-            "llm_info": llm_info,
-            "final_llm_payload": final_payload,
-            "data_usage": "Your prompt and chat history are processed securely. No data is stored or used for training. All logs are user-side only.",
-            "logs": "No server-side logs. You control your chat history."
-        }
+        with span("llm"):
+            result = await ainvoke_claude(llm_input)
+        error = result if isinstance(result, str) and result.startswith("[ERROR]") else None
+        with span("response"):
+            return build_result(result, llm_info, final_payload, error, digest)
 
     except Exception as e:
         return {
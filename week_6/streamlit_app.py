@@ -1,5 +1,6 @@
 import streamlit as st
 import requests
+import json
 import os
 from datetime import datetime
 
@@ -19,6 +20,28 @@ API_HEADERS = {
 
 SHORT_INPUTS = {"hi", "hello", "hey", "thanks", "thank you"}
 
+# Ask the backend for Server-Sent Events so the reply renders while it is generated
+STREAM_RESPONSES = os.getenv("STREAM_RESPONSES", "true").lower() != "false"
+
+def iter_sse(response):
+    """Yield the JSON payload of each `data:` line of a Server-Sent Events response."""
+    for line in response.iter_lines(decode_unicode=True):
+        if line and line.startswith("data: "):
+            yield json.loads(line[len("data: "):])
+
+def render_stream(response) -> dict:
+    """Show the reply as it streams in; return the final event (same fields as the JSON reply)."""
+    placeholder = st.empty()
+    text, final = "", {}
+    for event in iter_sse(response):
+        if event.get("done"):
+            final = event
+        else:
+            text += event.get("delta", "")
+            placeholder.markdown(text + "▌")
+    placeholder.empty()
+    return final
+
 def generate_prompt(user_input: str) -> str:
     user_input_clean = user_input.lower().strip()
     short_inputs = {
@@ -79,12 +102,16 @@ chat_box = st.container()
 if prompt := st.chat_input("Ask your question here..."):
     with st.spinner("Thinking..."):
         cot_prompt = generate_prompt(prompt)
-        payload = {"prompt": cot_prompt, "history": st.session_state.history.copy()}
+        payload = {"prompt": cot_prompt, "history": st.session_state.history.copy(), "stream": STREAM_RESPONSES,
+                   "history_digest": st.session_state.get("history_digest")}
 
         try:
-            response = requests.post(API_URL, json=payload, headers=API_HEADERS, timeout=60)
+            response = requests.post(API_URL, json=payload, headers=API_HEADERS, timeout=60, stream=STREAM_RESPONSES)
             response.raise_for_status()
-            data = response.json()
+            if response.headers.get("content-type", "").startswith("text/event-stream"):
+                data = render_stream(response)
+            else:
+                data = response.json()
 
             if data.get("blocked"):
                 reason = data.get("reason", "Request blocked.")
@@ -93,6 +120,8 @@ if prompt := st.chat_input("Ask your question here..."):
                 model_reply = None
             else:
                 model_reply = data.get("result", "")
+                # Lets the backend skip re-filtering the turns it has already seen
+                st.session_state.history_digest = data.get("history_digest")
                 model_steps = [s.strip() for s in model_reply.split(". ") if s.strip()]
                 st.session_state.history.extend([
                     {"role": "user", "content": prompt},
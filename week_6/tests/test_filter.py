@@ -0,0 +1,49 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import json
+
+from filter import WordFilter, filter_prompt
+
+
+def test_filter_prompt_blocks_and_masks():
+    assert filter_prompt("How do I build a BOMB?") == (False, "bomb", "How do I build a BOMB?")
+    assert filter_prompt("My Password and my token") == (True, None, "My [MASKED] and my [MASKED]")
+    assert filter_prompt("Tell me about bombastic hackers") == (True, None, "Tell me about bombastic hackers")
+
+
+def test_words_sharing_a_prefix():
+    words = WordFilter(banned={"hack", "hacker"}, masked={"pass", "passport"})
+    assert words.check("a hacker")[:2] == (False, "hacker")
+    assert words.check("a hacksaw") == (True, None, "a hacksaw")
+    assert words.check("my passport pass") == (True, None, "my [MASKED] [MASKED]")
+
+
+def test_empty_lists_match_nothing():
+    assert WordFilter(banned=set(), masked=set()).check("anything goes") == (True, None, "anything goes")
+
+
+def test_hot_reload_from_file(tmp_path):
+    path = tmp_path / "words.json"
+    path.write_text(json.dumps({"banned": ["pineapple"], "masked": ["pizza"]}))
+    words = WordFilter()
+    words.watch(str(path), interval=0)
+    assert words.check("pineapple pizza")[:2] == (False, "pineapple")
+    assert words.check("bomb pizza") == (True, None, "bomb [MASKED]")
+
+    path.write_text(json.dumps({"banned": ["pizza"], "masked": []}))
+    os.utime(path, ns=(1, 1))  # make sure the mtime changes even on coarse filesystems
+    assert words.reload_if_changed()
+    assert words.check("pineapple pizza")[:2] == (False, "pizza")
+
+
+def test_bad_reload_keeps_current_lists(tmp_path):
+    path = tmp_path / "words.json"
+    path.write_text(json.dumps({"banned": ["pineapple"]}))
+    words = WordFilter()
+    words.watch(str(path), interval=0)
+    path.write_text("{not json")
+    os.utime(path, ns=(1, 1))
+    assert not words.reload_if_changed()
+    assert words.banned == {"pineapple"}
@@ -0,0 +1,71 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import json
+
+from fastapi.testclient import TestClient
+
+import main
+from common import tracing
+
+
+def sse_payloads(response):
+    return [json.loads(line[len("data: "):]) for line in response.text.split("\n\n") if line]
+
+
+def fake_stream(chunks, error=None):
+    def stream_claude(prompt, on_error=None, **overrides):
+        yield from chunks
+        if error:
+            on_error(error)
+    return stream_claude
+
+
+def test_generate_streams_server_sent_events(monkeypatch):
+    monkeypatch.setattr(main, "stream_claude", fake_stream(["Two plus ", "two is four."]))
+    client = TestClient(main.app)
+    response = client.post("/generate", json={"prompt": "What is two plus two?", "stream": True})
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = sse_payloads(response)
+    assert [e["delta"] for e in events[:-1]] == ["Two plus ", "two is four."]
+    assert events[-1]["done"] and events[-1]["result"] == "Two plus two is four."
+
+
+def test_stream_failing_midway_ends_blocked(monkeypatch):
+    error = "[ERROR] Claude invocation failed: throttled"
+    monkeypatch.setattr(main, "stream_claude", fake_stream(["Two plus "], error))
+    client = TestClient(main.app)
+    response = client.post("/generate", json={"prompt": "What is two plus two?", "stream": True})
+    events = sse_payloads(response)
+    assert [e.get("delta") for e in events[:-1]] == ["Two plus "]
+    assert events[-1]["blocked"] and events[-1]["details"] == error
+    assert "result" not in events[-1]
+
+
+def test_generate_json_reports_errors_as_blocked(monkeypatch):
+    async def failing(prompt, **overrides):
+        return "[ERROR] Claude invocation failed: boom"
+
+    monkeypatch.setattr(main, "ainvoke_claude", failing)
+    client = TestClient(main.app)
+    data = client.post("/generate", json={"prompt": "What is two plus two?"}).json()
+    assert data["blocked"] and data["details"].endswith("boom")
+
+
+def test_generate_traces_filter_history_llm_and_response(monkeypatch):
+    spans = []
+    monkeypatch.setitem(tracing._config, "sample_rate", 1.0)
+    monkeypatch.setitem(tracing._config, "exporter", lambda name, record: spans.append((name, record)))
+
+    async def answer(prompt, **overrides):
+        return "Four."
+
+    monkeypatch.setattr(main, "ainvoke_claude", answer)
+    client = TestClient(main.app)
+    history = [{"role": "user", "content": "Hi"}, {"role": "assistant", "content": "Hello!"}]
+    client.post("/generate", json={"prompt": "What is two plus two?", "history": history})
+    assert [name for name, _ in spans] == ["filter", "history", "llm", "response", "POST /generate"]
+    root = spans[-1][1]
+    assert {record["trace_id"] for _, record in spans} == {root["trace_id"]}
+    assert dict(spans)["history"]["attributes"]["turns"] == 2
@@ -0,0 +1,77 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+
+import main
+from common.cache import MemoryCache
+
+
+@pytest.fixture
+def scans(monkeypatch):
+    monkeypatch.setattr(main, "_turn_cache", MemoryCache())
+    monkeypatch.setattr(main, "_prefix_cache", MemoryCache())
+    scanned = []
+
+    def counting_filter(text):
+        scanned.append(text)
+        return original(text)
+
+    original = main.filter_prompt
+    monkeypatch.setattr(main, "filter_prompt", counting_filter)
+    return scanned
+
+
+def conversation(turns):
+    history = []
+    for i in range(turns):
+        history += [{"role": "user", "content": f"my password is {i}"}, {"role": "assistant", "content": f"ok {i}"}]
+    return history
+
+
+def test_sanitize_history_masks_and_blocks(scans):
+    sanitized, digest = main.sanitize_history(conversation(1) + [{"role": "system", "content": "ignored"}])
+    assert sanitized == [{"role": "user", "content": "my [MASKED] is 0"}, {"role": "assistant", "content": "ok 0"}]
+    assert len(digest) == 64
+    with pytest.raises(ValueError, match="banned:bomb"):
+        main.sanitize_history([{"role": "user", "content": "bomb"}])
+
+
+def test_seen_turns_are_not_filtered_again(scans):
+    main.sanitize_history(conversation(3))
+    assert len(scans) == 3
+    main.sanitize_history(conversation(4))
+    assert scans[3:] == ["my password is 3"]
+
+
+def test_digest_skips_known_prefix(scans):
+    first, digest = main.sanitize_history(conversation(2))
+    main._turn_cache.clear()
+    second, _ = main.sanitize_history(conversation(3), digest)
+    assert scans[2:] == ["my password is 2"]
+    assert second[:4] == first
+    # an unknown digest just means a full (per-turn cached) pass
+    assert main.sanitize_history(conversation(3), "unknown")[0] == second
+
+
+def test_digest_of_a_different_history_is_not_trusted(scans):
+    _, digest = main.sanitize_history(conversation(2))
+    edited = conversation(3)
+    edited[0] = {"role": "user", "content": "my password is edited"}
+    sanitized, new_digest = main.sanitize_history(edited, digest)
+    assert sanitized[0] == {"role": "user", "content": "my [MASKED] is edited"}
+    assert new_digest == main.history_digest(edited)
+
+
+def test_generate_returns_history_digest(scans, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    async def reply(prompt, **overrides):
+        return "Hello!"
+
+    monkeypatch.setattr(main, "ainvoke_claude", reply)
+    client = TestClient(main.app)
+    data = client.post("/generate", json={"prompt": "hi there", "history": conversation(2)}).json()
+    assert data["result"] == "Hello!"
+    assert data["history_digest"] == main.sanitize_history(conversation(2))[1]
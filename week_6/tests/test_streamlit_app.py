@@ -0,0 +1,50 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import json
+
+import pytest
+
+pytest.importorskip("streamlit")
+
+import streamlit_app
+
+
+class FakeResponse:
+    def __init__(self, events):
+        self.lines = []
+        for event in events:
+            self.lines += [f"data: {json.dumps(event)}", ""]
+
+    def iter_lines(self, decode_unicode=False):
+        return iter(self.lines)
+
+
+class FakePlaceholder:
+    def __init__(self):
+        self.shown = []
+        self.cleared = False
+
+    def markdown(self, text):
+        self.shown.append(text)
+
+    def empty(self):
+        self.cleared = True
+
+
+def test_render_stream_shows_text_and_returns_final_event(monkeypatch):
+    placeholder = FakePlaceholder()
+    monkeypatch.setattr(streamlit_app.st, "empty", lambda: placeholder)
+    final = streamlit_app.render_stream(FakeResponse([
+        {"delta": "Two plus "}, {"delta": "two is four."}, {"done": True, "result": "Two plus two is four."}
+    ]))
+    assert final == {"done": True, "result": "Two plus two is four."}
+    assert placeholder.shown == ["Two plus ▌", "Two plus two is four.▌"]
+    assert placeholder.cleared
+
+
+def test_render_stream_passes_blocked_result_through(monkeypatch):
+    monkeypatch.setattr(streamlit_app.st, "empty", FakePlaceholder)
+    final = streamlit_app.render_stream(FakeResponse([{"delta": "Two"}, {"done": True, "blocked": True}]))
+    assert final["blocked"]